@@ -0,0 +1,82 @@
+# kohd_translator/benchmarks/recognizer_accuracy.py
+#
+# Accuracy and throughput of kohd_core.raster_recognizer on glyphs rendered by
+# the real KohdCanvasWidget under the offscreen QPA platform. Words are drawn
+# finalized at a few canvas sizes and zoom levels, grabbed as images and
+# decoded again; a word counts as recognized only on an exact match. Misses
+# whose decoded word draws exactly the same glyph (the builder drops dots that
+# don't fit on a short trace) are counted separately: no reader could tell.
+# Run from the repository root:
+#   python -m benchmarks.recognizer_accuracy --words 200 --save renders/
+import os
+import time
+import random
+import string
+import argparse
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+
+from PyQt6.QtWidgets import QApplication # type: ignore
+from PyQt6.QtGui import QImage # type: ignore
+
+from gui.kohd_canvas import KohdCanvasWidget
+from kohd_core.glyph_builder import build_glyph
+from kohd_core.glyph_layout import GlyphStyle, layout_glyph, layout_items
+from kohd_core.raster_recognizer import RasterGlyphRecognizer
+
+# (canvas width, canvas height, zoom) the words are rendered at, in turn
+RENDER_SETTINGS = ((600, 600, 1.0), (400, 400, 1.0), (800, 500, 1.0))
+
+
+def render_word(canvas: KohdCanvasWidget, word: str, width: int, height: int, zoom: float) -> np.ndarray:
+    """RGB uint8 screenshot of the canvas showing `word` finalized."""
+    canvas.resize(width, height); canvas.set_zoom(zoom)
+    canvas.update_display_data(list(build_glyph(word).elements), None, True)
+    image = canvas.grab().toImage().convertToFormat(QImage.Format.Format_RGB888)
+    bits = image.constBits(); bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * 3].reshape(image.height(), image.width(), 3).copy()
+
+
+def same_glyph(word: str, other: str, style: GlyphStyle) -> bool:
+    if not other: return False
+    return (layout_items(layout_glyph(list(build_glyph(word).elements), None, True, style), style)
+            == layout_items(layout_glyph(list(build_glyph(other).elements), None, True, style), style))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recognizer accuracy on canvas renders.")
+    parser.add_argument('--words', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--save', metavar='DIR', help="also write the renders as PNGs, e.g. for raster_recognizer's folder CLI")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    canvas = KohdCanvasWidget(); canvas.progressive_rendering = False
+    rng = random.Random(args.seed)
+    words = [''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(1, 10))) for _ in range(args.words)]
+    if args.save: os.makedirs(args.save, exist_ok=True)
+
+    recognizer = RasterGlyphRecognizer()
+    correct = 0; indistinguishable = 0; elapsed = 0.0; misses = []
+    for index, word in enumerate(words):
+        width, height, zoom = RENDER_SETTINGS[index % len(RENDER_SETTINGS)]
+        image = render_word(canvas, word, width, height, zoom)
+        if args.save: canvas.grab().save(os.path.join(args.save, f"{index:04d}_{word}.png"))
+        start = time.perf_counter()
+        recognition = recognizer.recognize(image)
+        elapsed += time.perf_counter() - start
+        if recognition.text == word: correct += 1
+        elif same_glyph(word, recognition.text, recognizer.style): indistinguishable += 1
+        else: misses.append((word, recognition.text, recognition.score))
+    for word, text, score in misses[:20]:
+        print(f"  {word} -> {text or '?'} (score {score:.3f})")
+    print(f"{correct}/{len(words)} exact ({correct / len(words):.1%}), {indistinguishable} drawn the same as the word decoded, "
+          f"{elapsed / len(words) * 1e3:.1f} ms per image ({len(words) / elapsed:.1f} images/s, one process)")
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# kohd_translator/benchmarks/route_quality.py
+#
+# Builds a batch of words and reports build speed together with the routing
+# quality totals from Glyph.quality_metrics, as one JSON object, so benchmark
+# runs can track both. --quality picks the routing level; --refine-ms adds an
+# anytime refinement pass per word. Run from the repository root:
+#   python -m benchmarks.route_quality --wordlist words.txt --quality draft --refine-ms 20
+import sys
+import json
+import time
+import random
+import string
+import argparse
+
+from kohd_core.glyph_builder import build_glyph, refine_glyph
+from kohd_core.trace_router import ROUTE_QUALITIES, ROUTE_QUALITY_STANDARD
+
+QUALITY_TOTAL_KEYS = ('traces', 'unscored_traces', 'wire_length', 'bends', 'crossings', 'node_intrusions', 'candidates_scored', 'alternative_shapes')
+
+
+def random_words(count: int, seed: int = 0, min_len: int = 3, max_len: int = 10) -> list[str]:
+    rng = random.Random(seed)
+    return [''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(min_len, max_len))) for _ in range(count)]
+
+def _percentile(ordered: list[float], p: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+def run(words: list[str], route_quality: str = ROUTE_QUALITY_STANDARD, refine_ms: float = 0.0) -> dict:
+    build_us = []; totals = dict.fromkeys(QUALITY_TOTAL_KEYS, 0); min_clearance = None
+    for word in words:
+        start = time.perf_counter()
+        glyph = build_glyph(word, quality=route_quality)
+        if refine_ms: glyph = refine_glyph(glyph, time_budget_s=refine_ms / 1e3)
+        build_us.append((time.perf_counter() - start) * 1e6)
+        quality = glyph.quality_metrics
+        for key in QUALITY_TOTAL_KEYS: totals[key] += quality[key]
+        if quality['min_clearance'] is not None:
+            min_clearance = quality['min_clearance'] if min_clearance is None else min(min_clearance, quality['min_clearance'])
+    ordered = sorted(build_us)
+    traces = totals['traces'] or 1
+    return {
+        'words': len(words),
+        'route_quality': route_quality, 'refine_ms': refine_ms,
+        'build_seconds': sum(build_us) / 1e6,
+        'words_per_second': len(words) / (sum(build_us) / 1e6) if build_us else 0.0,
+        'build_us': {'p50': _percentile(ordered, 50), 'p95': _percentile(ordered, 95), 'p99': _percentile(ordered, 99)} if ordered else {},
+        'quality': dict(totals, min_clearance=min_clearance,
+                        wire_length_per_trace=totals['wire_length'] / traces, bends_per_trace=totals['bends'] / traces,
+                        crossings_per_trace=totals['crossings'] / traces),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Report glyph build speed and routing quality as JSON.")
+    parser.add_argument('--wordlist', help="one word per line; random words are used if omitted")
+    parser.add_argument('--random', type=int, default=2000, help="number of random words (default 2000)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--quality', choices=ROUTE_QUALITIES, default=ROUTE_QUALITY_STANDARD, help="route quality level")
+    parser.add_argument('--refine-ms', type=float, default=0.0, help="anytime refinement budget per word, after the build")
+    args = parser.parse_args()
+    if args.wordlist:
+        with open(args.wordlist, encoding='utf-8') as wordlist_file:
+            words = [line.strip() for line in wordlist_file if line.strip()]
+    else:
+        words = random_words(args.random, args.seed)
+    json.dump(run(words, args.quality, args.refine_ms), sys.stdout, indent=2); print()
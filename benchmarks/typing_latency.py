@@ -0,0 +1,165 @@
+# kohd_translator/benchmarks/typing_latency.py
+#
+# End-to-end typing latency for the real MainWindow under the offscreen QPA
+# platform: each replayed event is timed from the moment it is delivered to the
+# text field until the canvas has finished painting (progressive renders and
+# route refinement after finalizing included). Sessions are synthetic or
+# loaded from a JSON event list:
+#   [{"type": "key", "text": "a"}, {"type": "backspace"}, {"type": "paste", "text": "..."},
+#    {"type": "finalize"}, {"type": "clear"}]
+# Run from the repository root:
+#   python -m benchmarks.typing_latency --output latency.json
+import os
+import io
+import sys
+import json
+import time
+import random
+import string
+import argparse
+import platform
+import contextlib
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtWidgets import QApplication # type: ignore
+from PyQt6.QtCore import Qt, QT_VERSION_STR, PYQT_VERSION_STR # type: ignore
+from PyQt6.QtTest import QTest # type: ignore
+
+from gui.main_window import MainWindow
+
+# Stop waiting for paints once the event loop has been idle this long
+SETTLE_IDLE_S = 0.002
+
+
+def synthetic_sessions(seed: int = 0, words: int = 40) -> dict[str, list[dict]]:
+    rng = random.Random(seed)
+    def random_word(min_len: int, max_len: int) -> str:
+        return ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(min_len, max_len)))
+
+    fast_typing = []
+    for _ in range(words):
+        fast_typing += [{'type': 'key', 'text': letter} for letter in random_word(3, 12)]
+        fast_typing += [{'type': 'finalize'}, {'type': 'clear'}]
+
+    backspacing = []
+    for _ in range(words):
+        word = random_word(5, 14)
+        backspacing += [{'type': 'key', 'text': letter} for letter in word]
+        backspacing += [{'type': 'backspace'}] * rng.randint(1, len(word))
+        backspacing += [{'type': 'key', 'text': letter} for letter in random_word(1, 4)]
+        backspacing.append({'type': 'clear'})
+
+    pasting = []
+    for _ in range(words):
+        pasting += [{'type': 'paste', 'text': random_word(20, 64)}, {'type': 'finalize'}, {'type': 'clear'}]
+
+    return {'fast_typing': fast_typing, 'backspacing': backspacing, 'pasting': pasting}
+
+def _percentiles(samples_ms: list[float]) -> dict:
+    if not samples_ms:
+        return {'count': 0}
+    ordered = sorted(samples_ms)
+    def nearest_rank(p: float) -> float:
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+    return {'count': len(ordered), 'mean': sum(ordered) / len(ordered), 'p50': nearest_rank(50),
+            'p95': nearest_rank(95), 'p99': nearest_rank(99), 'max': ordered[-1]}
+
+
+class TypingLatencyHarness:
+    def __init__(self, window: MainWindow):
+        self.window = window
+        self.app = QApplication.instance()
+        canvas = window.kohd_canvas
+        self.last_paint_end = None
+        self.all_samples_ms = []
+        original_paint_event = canvas.paintEvent
+        def timed_paint_event(event):
+            original_paint_event(event)
+            self.last_paint_end = time.perf_counter()
+        canvas.paintEvent = timed_paint_event
+
+    def _deliver(self, event: dict):
+        text_input = self.window.text_input
+        kind = event['type']
+        if kind == 'key': QTest.keyClicks(text_input, event['text'])
+        elif kind == 'backspace': QTest.keyClick(text_input, Qt.Key.Key_Backspace)
+        elif kind == 'paste': text_input.insert(event['text'])
+        elif kind == 'finalize': self.window.finalize_button.click()
+        elif kind == 'clear': text_input.clear()
+        else: raise ValueError(f"unknown event type {kind!r}")
+
+    def _settle(self):
+        """Runs the event loop until paints (and any progressive render) are done."""
+        canvas = self.window.kohd_canvas
+        idle_since = time.perf_counter()
+        while True:
+            paints_before = self.last_paint_end
+            self.app.processEvents()
+            now = time.perf_counter()
+            if self.last_paint_end != paints_before or canvas.is_rendering() or self.window.is_refining():
+                idle_since = now
+            elif now - idle_since >= SETTLE_IDLE_S:
+                return
+
+    def measure(self, event: dict) -> float:
+        """Milliseconds from delivering `event` to the end of the last paint it caused."""
+        self._settle()
+        self.last_paint_end = None
+        start = time.perf_counter()
+        self._deliver(event)
+        handled = time.perf_counter()
+        self._settle()
+        return ((self.last_paint_end or handled) - start) * 1e3
+
+    def run_session(self, events: list[dict]) -> dict:
+        self.window.text_input.clear(); self._settle()
+        by_kind = {}
+        for event in events:
+            by_kind.setdefault(event['type'], []).append(self.measure(event))
+        all_samples = [sample for samples in by_kind.values() for sample in samples]
+        self.all_samples_ms += all_samples
+        return dict(_percentiles(all_samples), by_event_type={kind: _percentiles(samples) for kind, samples in by_kind.items()})
+
+
+def run(sessions: dict[str, list[dict]], window_size: tuple[int, int] = (800, 800), speculative: bool = False) -> dict:
+    app = QApplication.instance() or QApplication([sys.argv[0]])
+    window = MainWindow(speculative=speculative); window.resize(*window_size); window.show(); app.processEvents()
+    harness = TypingLatencyHarness(window)
+    with contextlib.redirect_stdout(io.StringIO()): # MainWindow prints elements on finalize
+        results = {name: harness.run_session(events) for name, events in sessions.items()}
+    window.close()
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'platform': {'python': platform.python_version(), 'qt': QT_VERSION_STR, 'pyqt': PYQT_VERSION_STR,
+                     'qpa': os.environ.get('QT_QPA_PLATFORM'), 'machine': platform.machine()},
+        'window_size': list(window_size),
+        'speculative': speculative,
+        'speculation': dict(window.glyph_builder.speculation_stats),
+        'sessions': results,
+        'overall_ms': _percentiles(harness.all_samples_ms),
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Replay typing sessions against MainWindow and report keystroke-to-paint latency.")
+    parser.add_argument('--session', action='append', default=[], help="JSON event list to replay (may be repeated); synthetic sessions if omitted")
+    parser.add_argument('--words', type=int, default=40, help="words per synthetic session")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--speculative', action='store_true', help="prebuild likely next letters while idle")
+    parser.add_argument('--output', help="write JSON here instead of stdout")
+    args = parser.parse_args()
+
+    if args.session:
+        sessions = {}
+        for path in args.session:
+            with open(path, encoding='utf-8') as session_file:
+                sessions[os.path.splitext(os.path.basename(path))[0]] = json.load(session_file)
+    else:
+        sessions = synthetic_sessions(args.seed, args.words)
+    report = run(sessions, speculative=args.speculative)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2); print()
@@ -0,0 +1,157 @@
+# kohd_translator/gui/booklet_export.py
+#
+# Streams a text passage into a multi-page PDF booklet. Every stage is a
+# generator: words are tokenized from the text as it is read, each glyph is
+# built with KohdGlyphBuilder, laid out, painted into the current QPdfWriter
+# page and then dropped. QPdfWriter writes a page out on newPage(), so only
+# the page being filled is ever held and memory stays flat however long the
+# document is. Glyphs are drawn as vectors through KohdGlyphPainter, so they
+# match the canvas at any zoom.
+import os
+import re
+import sys
+import time
+
+try:
+    import resource
+except ImportError: # Not available on Windows; peak RSS is then not reported
+    resource = None
+
+from PyQt6.QtGui import QPdfWriter, QPainter, QPageSize, QPageLayout, QColor, QFont # type: ignore
+from PyQt6.QtCore import Qt, QRectF, QMarginsF # type: ignore
+
+from kohd_core.glyph_builder import KohdGlyphBuilder
+from kohd_core.glyph_layout import CONCEPTUAL_SIZE
+from .glyph_painter import KohdGlyphPainter
+
+# Device units per inch of the PDF. Output is vector, so this only sets the coordinate scale; at the
+# screen's 96 the painter's point-sized node names keep the same proportions as on the canvas
+PDF_RESOLUTION = 96
+DEFAULT_COLUMNS = 5
+DEFAULT_ROWS = 7
+PAGE_MARGIN_MM = 12.0
+# Fraction of each cell reserved for the word label under the glyph
+CELL_LABEL_FRACTION = 0.15
+WORD_PATTERN = re.compile(r"[A-Za-z]+")
+
+
+def tokenize_text(lines):
+    """Yields the words of an iterable of text lines, in order."""
+    for line in lines:
+        for match in WORD_PATTERN.finditer(line):
+            yield match.group()
+
+def iter_text_file(path: str):
+    with open(path, encoding='utf-8') as text_file:
+        yield from text_file
+
+def build_glyphs(words, builder: KohdGlyphBuilder):
+    """Yields (word, glyph) for each word, built letter by letter and finalized."""
+    for word in words:
+        builder.reset()
+        for letter in word: builder.add_letter(letter)
+        builder.finalize_word()
+        yield word, builder.glyph
+
+def lay_out_glyphs(glyphs, glyph_painter: KohdGlyphPainter):
+    """Yields (word, layout) for each (word, glyph)."""
+    for word, glyph in glyphs:
+        yield word, glyph.layout(glyph_painter.style)
+
+def peak_rss_bytes() -> int | None:
+    if resource is None: return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024 # ru_maxrss is bytes on macOS, KiB elsewhere
+
+
+def export_booklet(
+    words,
+    output_path: str,
+    page_size: QPageSize.PageSizeId = QPageSize.PageSizeId.A5,
+    columns: int = DEFAULT_COLUMNS,
+    rows: int = DEFAULT_ROWS,
+    progress_callback: callable = None
+) -> dict:
+    """Writes `words` (any iterable, consumed lazily) to a PDF, columns x rows glyphs per page in reading order.
+
+    Needs a QGuiApplication. Returns a stats dict with pages_per_second and
+    peak RSS, both at the end and after the first page, so flat memory use can
+    be checked on long documents.
+    """
+    writer = QPdfWriter(output_path)
+    writer.setResolution(PDF_RESOLUTION)
+    writer.setPageLayout(QPageLayout(QPageSize(page_size), QPageLayout.Orientation.Portrait,
+                                     QMarginsF(PAGE_MARGIN_MM, PAGE_MARGIN_MM, PAGE_MARGIN_MM, PAGE_MARGIN_MM), QPageLayout.Unit.Millimeter))
+    glyph_painter = KohdGlyphPainter()
+    builder = KohdGlyphBuilder(node_radius=glyph_painter.node_radius, get_ring_radius_method=glyph_painter.get_radius_for_specific_ring_level)
+
+    painter = QPainter()
+    stats = {'pages': 0, 'words': 0, 'peak_rss_bytes': None, 'first_page_peak_rss_bytes': None}
+    start_time = time.perf_counter()
+    words_per_page = columns * rows
+    cell_index = 0
+    for word, layout in lay_out_glyphs(build_glyphs(words, builder), glyph_painter):
+        if cell_index == 0:
+            if not painter.isActive():
+                painter.begin(writer)
+                painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+                page_rect = writer.pageLayout().paintRectPixels(PDF_RESOLUTION)
+                cell_w = page_rect.width() / columns; cell_h = page_rect.height() / rows
+                glyph_h = cell_h * (1.0 - CELL_LABEL_FRACTION)
+                scale = min(cell_w, glyph_h) / CONCEPTUAL_SIZE
+                label_font = QFont(); label_font.setPixelSize(max(6, int(cell_h * CELL_LABEL_FRACTION * 0.6)))
+            else:
+                writer.newPage() # The finished page is written out here
+                _page_done(stats, start_time, progress_callback)
+
+        row, col = divmod(cell_index, columns)
+        cell_x = col * cell_w; cell_y = row * cell_h
+        painter.save()
+        painter.translate(cell_x + (cell_w - CONCEPTUAL_SIZE * scale) / 2, cell_y)
+        painter.scale(scale, scale)
+        glyph_painter.paint_layout(painter, layout)
+        painter.restore()
+        painter.setFont(label_font); painter.setPen(QColor(Qt.GlobalColor.black))
+        painter.drawText(QRectF(cell_x, cell_y + glyph_h, cell_w, cell_h - glyph_h), Qt.AlignmentFlag.AlignCenter, word)
+
+        stats['words'] += 1
+        cell_index = (cell_index + 1) % words_per_page
+
+    if painter.isActive():
+        painter.end()
+        _page_done(stats, start_time, progress_callback)
+
+    stats['elapsed_s'] = time.perf_counter() - start_time
+    stats['pages_per_second'] = stats['pages'] / stats['elapsed_s'] if stats['elapsed_s'] > 0 else 0.0
+    stats['peak_rss_bytes'] = peak_rss_bytes()
+    stats['bytes_written'] = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+    return stats
+
+def _page_done(stats: dict, start_time: float, progress_callback: callable):
+    stats['pages'] += 1
+    if stats['pages'] == 1: stats['first_page_peak_rss_bytes'] = peak_rss_bytes()
+    if progress_callback:
+        progress_callback(stats['pages'], time.perf_counter() - start_time)
+
+
+if __name__ == '__main__':
+    import argparse
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtGui import QGuiApplication # type: ignore
+
+    parser = argparse.ArgumentParser(description="Export a text passage as a PDF booklet of Kohd glyphs.")
+    parser.add_argument('text_file', help="UTF-8 text; every run of letters becomes one glyph")
+    parser.add_argument('output_pdf')
+    parser.add_argument('--columns', type=int, default=DEFAULT_COLUMNS)
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS)
+    args = parser.parse_args()
+
+    app = QGuiApplication([sys.argv[0]])
+    def report(pages_done, elapsed):
+        print(f"  {pages_done} pages, {pages_done / elapsed:.2f} pages/s, peak RSS {(peak_rss_bytes() or 0) / 1e6:.1f} MB")
+
+    result = export_booklet(tokenize_text(iter_text_file(args.text_file)), args.output_pdf,
+                            columns=args.columns, rows=args.rows, progress_callback=report)
+    print(f"Exported {result['words']} words on {result['pages']} pages in {result['elapsed_s']:.1f}s "
+          f"({result['pages_per_second']:.2f} pages/s, peak RSS {(result['peak_rss_bytes'] or 0) / 1e6:.1f} MB, "
+          f"{result['bytes_written'] / 1e6:.1f} MB)")
@@ -0,0 +1,230 @@
+# kohd_translator/gui/glyph_browser.py
+#
+# Side panel listing a vocabulary with a glyph thumbnail per word.
+# The view only asks the model about rows it is showing, so thumbnails are
+# requested lazily; they render on a QThreadPool into QImage (safe off the GUI
+# thread), are converted to QPixmap on arrival and kept in a byte-budgeted LRU
+# cache. Requests for rows that scroll out of view are taken back off the pool.
+import threading
+from collections import OrderedDict
+
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QListView, QAbstractItemView # type: ignore
+from PyQt6.QtGui import QImage, QPainter, QPixmap, QColor # type: ignore
+from PyQt6.QtCore import (Qt, QObject, QRunnable, QThreadPool, QAbstractListModel, QModelIndex, # type: ignore
+                          QSize, QPoint, pyqtSignal)
+
+from kohd_core.glyph_builder import build_glyph, GlyphConfig
+from kohd_core.glyph_layout import CONCEPTUAL_SIZE
+from .glyph_painter import KohdGlyphPainter
+
+DEFAULT_THUMBNAIL_SIZE = 48
+DEFAULT_CACHE_BUDGET_BYTES = 64 * 1024 * 1024
+# Rows kept around the visible range whose pending renders are not cancelled
+VISIBLE_ROW_SLACK = 8
+
+# One KohdGlyphPainter per pool thread: its route polygon and symbol path caches are not thread-safe
+_worker_painters = threading.local()
+
+
+def _worker_painter(node_radius: float) -> KohdGlyphPainter:
+    painter = getattr(_worker_painters, 'painter', None)
+    if painter is None or painter.node_radius != node_radius:
+        painter = _worker_painters.painter = KohdGlyphPainter(node_radius)
+    return painter
+
+
+class GlyphPixmapCache:
+    """LRU cache of thumbnails keyed by (word, size, device pixel ratio), bounded by total pixel bytes."""
+    def __init__(self, budget_bytes: int = DEFAULT_CACHE_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self._entries = OrderedDict() # key -> (QPixmap, bytes)
+
+    @staticmethod
+    def _pixmap_bytes(pixmap: QPixmap) -> int:
+        return pixmap.width() * pixmap.height() * max(1, pixmap.depth() // 8)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None: return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, pixmap: QPixmap):
+        if key in self._entries:
+            self.used_bytes -= self._entries.pop(key)[1]
+        size = self._pixmap_bytes(pixmap)
+        self._entries[key] = (pixmap, size); self.used_bytes += size
+        while self.used_bytes > self.budget_bytes and len(self._entries) > 1:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.used_bytes -= evicted_size
+
+    def clear(self):
+        self._entries.clear(); self.used_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _ThumbnailSignals(QObject):
+    # key, row, rendered image (None if the task was cancelled before it started)
+    finished = pyqtSignal(object, int, object)
+
+
+class _ThumbnailTask(QRunnable):
+    def __init__(self, key, row: int, config: GlyphConfig, signals: _ThumbnailSignals):
+        super().__init__()
+        self.setAutoDelete(False) # The model owns the task until its result is delivered
+        self.key = key; self.row = row
+        self.config = config; self.signals = signals
+        self.cancelled = False
+
+    def run(self):
+        if self.cancelled:
+            self.signals.finished.emit(self.key, self.row, None); return
+        word, size, dpr = self.key
+        pixel_size = max(1, round(size * dpr))
+        image = QImage(pixel_size, pixel_size, QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(QColor(Qt.GlobalColor.white))
+        painter = QPainter(image)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        scale = pixel_size / CONCEPTUAL_SIZE
+        painter.scale(scale, scale)
+        _worker_painter(self.config.node_radius).paint_glyph(painter, build_glyph(word, self.config))
+        painter.end()
+        image.setDevicePixelRatio(dpr)
+        self.signals.finished.emit(self.key, self.row, image)
+
+
+class GlyphListModel(QAbstractListModel):
+    def __init__(self, words=(), thumbnail_size: int = DEFAULT_THUMBNAIL_SIZE, cache: GlyphPixmapCache | None = None,
+                 thread_pool: QThreadPool | None = None, parent=None):
+        super().__init__(parent)
+        self.words = list(words)
+        self.thumbnail_size = thumbnail_size
+        self.device_pixel_ratio = 1.0
+        self.cache = cache if cache is not None else GlyphPixmapCache()
+        self.thread_pool = thread_pool or QThreadPool.globalInstance()
+        self.glyph_config = GlyphConfig() # Painters are made per pool thread with its node_radius
+        self._pending = {} # key -> _ThumbnailTask, queued or running
+        self._visible_rows = None # (first, last) shown by the view, None until it reports them
+        self._signals = _ThumbnailSignals()
+        self._signals.finished.connect(self._on_thumbnail_finished)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.words)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid(): return None
+        word = self.words[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return word
+        if role == Qt.ItemDataRole.DecorationRole:
+            key = self.thumbnail_key(word)
+            pixmap = self.cache.get(key)
+            if pixmap is None:
+                self._request_thumbnail(key, index.row())
+            return pixmap
+        return None
+
+    def thumbnail_key(self, word: str):
+        return (word, self.thumbnail_size, self.device_pixel_ratio)
+
+    def set_words(self, words):
+        self.beginResetModel()
+        self.cancel_pending()
+        self.words = list(words)
+        self.endResetModel()
+
+    def set_device_pixel_ratio(self, device_pixel_ratio: float):
+        if device_pixel_ratio != self.device_pixel_ratio:
+            self.cancel_pending() # Old-ratio renders are still cached, so switching back costs nothing
+            self.device_pixel_ratio = device_pixel_ratio
+            if self.words:
+                self.dataChanged.emit(self.index(0), self.index(len(self.words) - 1), [Qt.ItemDataRole.DecorationRole])
+
+    def _request_thumbnail(self, key, row: int):
+        task = self._pending.get(key)
+        if task is not None:
+            task.cancelled = False; task.row = row # Scrolled back before a cancelled render finished: keep it
+            return
+        task = _ThumbnailTask(key, row, self.glyph_config, self._signals)
+        self._pending[key] = task
+        self.thread_pool.start(task)
+
+    def _cancel_task(self, key):
+        task = self._pending.get(key)
+        if task is None: return
+        if self.thread_pool.tryTake(task):
+            del self._pending[key]
+        else:
+            task.cancelled = True # Already dequeued; its result is discarded on arrival
+
+    def cancel_pending(self):
+        for key in list(self._pending):
+            self._cancel_task(key)
+
+    def set_visible_rows(self, first_row: int, last_row: int):
+        """Cancels queued renders for rows outside [first_row, last_row] plus some slack."""
+        self._visible_rows = (first_row, last_row)
+        first_row -= VISIBLE_ROW_SLACK; last_row += VISIBLE_ROW_SLACK
+        for key, task in list(self._pending.items()):
+            if not first_row <= task.row <= last_row:
+                self._cancel_task(key)
+
+    def _is_row_visible(self, row: int) -> bool:
+        return self._visible_rows is None or self._visible_rows[0] <= row <= self._visible_rows[1]
+
+    def _on_thumbnail_finished(self, key, row: int, image):
+        task = self._pending.pop(key, None)
+        if task is None: return
+        row = task.row # Reused tasks may have moved rows since they started
+        if image is None: # Saw the cancel flag before rendering; render again if the row came back into view
+            if not task.cancelled: self._request_thumbnail(key, row)
+            return
+        self.cache.put(key, QPixmap.fromImage(image))
+        if (task.cancelled and not self._is_row_visible(row)) or key != self.thumbnail_key(key[0]): return
+        if row < len(self.words) and self.words[row] == key[0]:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+
+class GlyphBrowserWidget(QWidget):
+    word_activated = pyqtSignal(str)
+
+    def __init__(self, words=(), thumbnail_size: int = DEFAULT_THUMBNAIL_SIZE,
+                 cache_budget_bytes: int = DEFAULT_CACHE_BUDGET_BYTES, parent=None):
+        super().__init__(parent)
+        self.model = GlyphListModel(words, thumbnail_size, GlyphPixmapCache(cache_budget_bytes), parent=self)
+        self.list_view = QListView(self)
+        self.list_view.setModel(self.model)
+        self.list_view.setUniformItemSizes(True) # Row geometry never depends on the data, so huge lists scroll in O(1)
+        self.list_view.setIconSize(QSize(thumbnail_size, thumbnail_size))
+        self.list_view.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.list_view.setVerticalScrollMode(QAbstractItemView.ScrollMode.ScrollPerPixel)
+        layout = QVBoxLayout(self); layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.list_view)
+
+        self.list_view.verticalScrollBar().valueChanged.connect(self._update_visible_rows)
+        self.list_view.verticalScrollBar().rangeChanged.connect(self._update_visible_rows)
+        self.list_view.activated.connect(self._on_activated)
+        self.list_view.clicked.connect(self._on_activated)
+
+    def set_words(self, words):
+        self.model.set_words(words)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.model.set_device_pixel_ratio(self.list_view.viewport().devicePixelRatioF())
+
+    def _update_visible_rows(self, *_):
+        viewport = self.list_view.viewport()
+        first = self.list_view.indexAt(QPoint(0, 0))
+        last = self.list_view.indexAt(QPoint(0, viewport.height() - 1))
+        first_row = first.row() if first.isValid() else 0
+        last_row = last.row() if last.isValid() else len(self.model.words) - 1
+        self.model.set_visible_rows(first_row, last_row)
+
+    def _on_activated(self, index):
+        if index.isValid():
+            self.word_activated.emit(self.model.words[index.row()])
@@ -0,0 +1,170 @@
+# kohd_translator/gui/glyph_painter.py
+#
+# Draws a glyph element list onto any QPainter. Kept separate from the canvas
+# widget so offscreen renderers (QImage under QGuiApplication) can share the
+# exact drawing code without needing a QApplication or a QWidget.
+# Placement comes from kohd_core.glyph_layout; this module only issues draw calls.
+import weakref
+
+from PyQt6.QtGui import QPainter, QColor, QPen, QBrush, QFont, QPainterPath, QPolygonF # type: ignore
+from PyQt6.QtCore import Qt, QRectF, QPointF # type: ignore
+
+from kohd_core.glyph_layout import GlyphStyle, layout_glyph, symbol_templates
+
+class KohdGlyphPainter:
+    def __init__(self, node_radius: float = 20.0):
+        self.style = GlyphStyle(node_radius)
+        self.node_radius = self.style.node_radius
+        # RouteBuffer -> {span: QPolygonF}; entries go away with the layout that owns the buffer
+        self._route_polygons = weakref.WeakKeyDictionary()
+        self._symbol_paths = {} # Template name -> (stroke QPainterPath, fill QPainterPath)
+
+    def get_radius_for_specific_ring_level(self, ring_level: int) -> float:
+        return self.style.ring_radius(ring_level)
+
+    def route_polygon(self, routes, span: tuple[int, int]) -> QPolygonF:
+        """QPolygonF for a span of a RouteBuffer, filled by one buffer copy and memoized per layout."""
+        polygons = self._route_polygons.setdefault(routes, {})
+        polygon = polygons.get(span)
+        if polygon is None:
+            coords = routes.view(span)
+            polygon = QPolygonF(); polygon.resize(len(coords) // 2)
+            if len(coords):
+                data = polygon.data(); data.setsize(coords.nbytes) # QPointF is two packed doubles
+                memoryview(data).cast('B')[:] = coords.cast('B')
+            polygons[span] = polygon
+        return polygon
+
+    def symbol_paths(self, name: str) -> tuple[QPainterPath, QPainterPath]:
+        """Stroked and filled QPainterPaths of a symbol template, built once per painter."""
+        paths = self._symbol_paths.get(name)
+        if paths is None:
+            template = symbol_templates(self.style)[name]
+            stroke_path = QPainterPath(); fill_path = QPainterPath()
+            for path, polylines in ((stroke_path, template.strokes), (fill_path, template.fills)):
+                for polyline in polylines:
+                    path.moveTo(*polyline[0])
+                    for point in polyline[1:]: path.lineTo(*point)
+            paths = self._symbol_paths[name] = (stroke_path, fill_path)
+        return paths
+
+    def stamp_symbol(self, painter: QPainter, name: str, anchor, angle_deg: float = 0.0):
+        """Draws a cached symbol rotated by angle_deg (counter-clockwise) about anchor, with the painter's current pen and brush for fills."""
+        stroke_path, fill_path = self.symbol_paths(name)
+        painter.save()
+        painter.translate(*anchor)
+        if angle_deg: painter.rotate(-angle_deg)
+        if not fill_path.isEmpty(): painter.drawPath(fill_path)
+        painter.setBrush(Qt.BrushStyle.NoBrush); painter.drawPath(stroke_path)
+        painter.restore()
+
+    def paint(self, painter: QPainter, glyph_elements: list, active_node_name: str = None, is_finalized: bool = False):
+        """Draws the glyph in conceptual coordinates; the caller owns the painter's transform and background."""
+        self.paint_layout(painter, layout_glyph(glyph_elements, active_node_name, is_finalized, self.style))
+
+    def paint_glyph(self, painter: QPainter, glyph):
+        """paint() for a built Glyph, drawing its traces straight from the glyph's route buffer."""
+        self.paint_layout(painter, glyph.layout(self.style))
+
+    def paint_layout(self, painter: QPainter, layout: dict):
+        for op in self.paint_ops(layout):
+            op(painter)
+
+    def paint_ops(self, layout: dict):
+        """Yields one draw call per primitive, coarse shapes first (nodes and their rings, trace lines) and
+        fine detail (subnode dots, indicators, names) last. Every op sets its own pen and brush, so the
+        sequence can be split across several painters, e.g. a time-sliced back buffer."""
+        style = self.style
+        node_radius = style.node_radius
+        black = QColor(Qt.GlobalColor.black); dark_gray = QColor(Qt.GlobalColor.darkGray)
+
+        def node_rect(center):
+            cx, cy = center; return QRectF(cx - node_radius, cy - node_radius, 2 * node_radius, 2 * node_radius)
+
+        # --- Coarse: node discs, rings and trace lines ---
+        for data in layout['nodes']:
+            fill_color = QColor(Qt.GlobalColor.yellow) if data['is_active'] else QColor(Qt.GlobalColor.lightGray)
+            def fill_node(painter, rect=node_rect(data['center']), brush=QBrush(fill_color)):
+                painter.setBrush(brush); painter.setPen(Qt.PenStyle.NoPen); painter.drawEllipse(rect) # Fill first
+            yield fill_node
+        outline_pen = QPen(black, style.node_outline_pen_width)
+        for data in layout['nodes']:
+            def outline_node(painter, rect=node_rect(data['center'])):
+                painter.setBrush(Qt.BrushStyle.NoBrush); painter.setPen(outline_pen); painter.drawEllipse(rect) # Outline
+            yield outline_node
+        # Rings go under the traces, so trace ends stay on top of them
+        ring_pen = QPen(QColor(Qt.GlobalColor.darkBlue), style.ring_pen_width)
+        for data in layout['nodes']:
+            if not data['ring_radii']: continue
+            def draw_rings(painter, center=data['center'], ring_radii=data['ring_radii']):
+                painter.setBrush(Qt.BrushStyle.NoBrush); painter.setPen(ring_pen)
+                cx, cy = center
+                for ring_r in ring_radii:
+                    painter.drawEllipse(QRectF(cx - ring_r, cy - ring_r, 2 * ring_r, 2 * ring_r))
+            yield draw_rings
+
+        trace_pen = QPen(black, style.trace_pen_width)
+        traces = layout['traces'] + ([layout['ground_trace']] if layout['ground_trace'] else [])
+        for trace in layout['traces']:
+            if len(trace['points']) < 2: continue
+            def draw_trace(painter, polygon=self.route_polygon(layout['routes'], trace['span'])):
+                painter.setPen(trace_pen); painter.drawPolyline(polygon)
+            yield draw_trace
+        if layout['ground_trace']: # A single segment, not in the route buffer
+            def draw_ground_trace(painter, line=(QPointF(*layout['ground_trace']['points'][0]), QPointF(*layout['ground_trace']['points'][1]))):
+                painter.setPen(trace_pen); painter.drawLine(*line)
+            yield draw_ground_trace
+
+        # --- Fine: subnode dots, indicators ---
+        for trace in traces:
+            if len(trace['points']) >= 2 and trace['subnode_dots']:
+                yield lambda painter, dots=trace['subnode_dots']: self._draw_subnode_dots(painter, dots)
+
+        indicator_pen = QPen(black, style.trace_pen_width * 0.8)
+        charge = layout['charge_indicator']
+        if charge:
+            def draw_charge(painter):
+                painter.setPen(indicator_pen); painter.setBrush(QBrush(Qt.GlobalColor.black)) # Zigzag is drawn filled
+                self.stamp_symbol(painter, 'charge', charge['anchor'], charge['angle_deg'])
+            yield draw_charge
+
+        ground = layout['ground_indicator']
+        if ground:
+            def draw_ground(painter):
+                painter.setPen(indicator_pen)
+                self.stamp_symbol(painter, 'ground', ground['attach_point'], ground['angle_deg'])
+            yield draw_ground
+
+        # --- Null Modifier ---
+        null_modifier = layout['null_modifier']
+        if null_modifier:
+            def draw_null_modifier(painter):
+                mod_center = QPointF(*null_modifier['center'])
+                painter.setPen(QPen(dark_gray, style.node_outline_pen_width)); painter.setBrush(Qt.BrushStyle.NoBrush)
+                painter.drawEllipse(mod_center, node_radius, node_radius) # Outer circle
+                painter.setPen(QPen(dark_gray, style.trace_pen_width * 0.9))
+                self.stamp_symbol(painter, 'null_modifier_cross', null_modifier['center']) # Cross
+                if null_modifier['pointer_line']:
+                    painter.setPen(QPen(dark_gray, style.ring_pen_width * 0.7))
+                    painter.drawLine(QPointF(*null_modifier['pointer_line'][0]), QPointF(*null_modifier['pointer_line'][1]))
+                if null_modifier['pointer_circle_center']:
+                    painter.setPen(QPen(dark_gray, style.ring_pen_width * 0.6))
+                    pointer_radius = style.null_modifier_pointer_line_radius
+                    painter.drawEllipse(QPointF(*null_modifier['pointer_circle_center']), pointer_radius, pointer_radius) # Small circle
+            yield draw_null_modifier
+
+        # --- Node Names ---
+        font = QFont(); font.setPointSize(style.font_size)
+        name_pen = QPen(black)
+        for data in layout['nodes']:
+            def draw_name(painter, rect=node_rect(data['center']), name=data['name']):
+                painter.setFont(font); painter.setPen(name_pen)
+                painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, name) # Draw node names last
+            yield draw_name
+
+    def _draw_subnode_dots(self, painter: QPainter, dot_positions: list):
+        painter.setPen(QPen(Qt.GlobalColor.black, 1))
+        painter.setBrush(QBrush(Qt.GlobalColor.black))
+        dot_radius = self.style.subnode_dot_radius
+        for dot_pos in dot_positions:
+            painter.drawEllipse(QPointF(*dot_pos), dot_radius, dot_radius)
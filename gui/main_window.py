@@ -1,13 +1,26 @@
 # gui/main_window.py
 from PyQt6.QtWidgets import ( 
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-    QLineEdit, QPushButton, QLabel
+    QLineEdit, QPushButton, QLabel, QDockWidget
 )
+from PyQt6.QtCore import Qt, QTimer, QElapsedTimer # type: ignore
 from .kohd_canvas import KohdCanvasWidget 
+from .glyph_browser import GlyphBrowserWidget
 from kohd_core.glyph_builder import KohdGlyphBuilder 
+from kohd_core.trace_router import ROUTE_QUALITY_DRAFT
+from kohd_core.tokenizer import tokenize_string, TOKEN_WORD, TOKEN_PUNCTUATION
+from kohd_core.kohd_rules import LETTER_TO_NODE_INFO
+from kohd_core.letter_model import LetterBigramModel
+
+# Route refinement after finalizing runs in slices of this long on the GUI thread, so input stays responsive
+REFINE_SLICE_BUDGET_S = 0.008
+# Refinement stops after this long in total; whatever was found by then stays
+REFINE_TOTAL_BUDGET_S = 0.25
+# Idle-time prebuilding of likely next letters (speculative mode) runs in slices this long
+SPECULATE_SLICE_BUDGET_S = 0.004
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    def __init__(self, vocabulary=None, speculative: bool = False):
         super().__init__()
 
         self.setWindowTitle("Kohd Translator")
@@ -19,8 +32,18 @@ class MainWindow(QMainWindow):
         # Pass canvas properties to GlyphBuilder
         self.glyph_builder = KohdGlyphBuilder(
             node_radius=self.kohd_canvas.node_radius, # Or a more direct way to get this
-            get_ring_radius_method=self.kohd_canvas._get_radius_for_specific_ring_level # Pass the method
+            get_ring_radius_method=self.kohd_canvas._get_radius_for_specific_ring_level, # Pass the method
+            typing_quality=ROUTE_QUALITY_DRAFT, # Fast routes while typing; refined after finalizing
+            # Speculative mode: next-letter guesses from the vocabulary, then from the words typed
+            letter_model=LetterBigramModel.from_words(vocabulary or ()) if speculative else None
         )
+        self._refine_timer = QTimer(self)
+        self._refine_timer.setInterval(0)
+        self._refine_timer.timeout.connect(self._refine_slice)
+        self._refine_elapsed = QElapsedTimer()
+        self._speculate_timer = QTimer(self)
+        self._speculate_timer.setInterval(0)
+        self._speculate_timer.timeout.connect(self._speculate_slice)
 
         central_widget = QWidget(self)
         self.setCentralWidget(central_widget)
@@ -30,37 +53,105 @@ class MainWindow(QMainWindow):
         input_layout = QHBoxLayout()
         self.input_label = QLabel("Enter English Text:")
         self.text_input = QLineEdit()
-        self.text_input.setPlaceholderText("Type a word (e.g., MOTHERBOARD)...")
+        self.text_input.setPlaceholderText("Type text (e.g., there is a MOTHERBOARD)...")
         self.finalize_button = QPushButton("Finalize Word")
+        self.edit_nodes_button = QPushButton("Edit Nodes") # Drag nodes on the canvas; typing discards the edits
+        self.edit_nodes_button.setCheckable(True)
 
         input_layout.addWidget(self.input_label)
         input_layout.addWidget(self.text_input)
         input_layout.addWidget(self.finalize_button)
+        input_layout.addWidget(self.edit_nodes_button)
         
         main_layout.addLayout(input_layout)
         main_layout.addWidget(self.kohd_canvas) # Add canvas to layout
 
         self.text_input.textChanged.connect(self._on_text_changed)
         self.finalize_button.clicked.connect(self._on_finalize_clicked)
+        self.edit_nodes_button.toggled.connect(self._on_edit_nodes_toggled)
 
-    def _on_text_changed(self, current_text: str):
-        self.glyph_builder.reset() 
-        if current_text:
-            for letter_char in current_text.upper(): 
-                if not self.glyph_builder.add_letter(letter_char):
-                    break 
-        
+        # Optional vocabulary browser; clicking a word loads it into the input
+        self.glyph_browser = None
+        if vocabulary is not None:
+            self.glyph_browser = GlyphBrowserWidget(vocabulary)
+            self.glyph_browser.word_activated.connect(self.text_input.setText)
+            browser_dock = QDockWidget("Vocabulary", self)
+            browser_dock.setWidget(self.glyph_browser)
+            self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, browser_dock)
+
+    def is_refining(self) -> bool:
+        return self._refine_timer.isActive()
+
+    def _show_glyph(self):
         self.kohd_canvas.update_display_data(
             glyph_elements=self.glyph_builder.get_glyph_elements(),
             active_node_name=self.glyph_builder.active_node_name, 
-            is_finalized=self.glyph_builder.is_finalized
+            is_finalized=self.glyph_builder.is_finalized,
+            board=self.glyph_builder.config.board,
+            routes=self.glyph_builder.glyph.routes,
+            route_spans=self.glyph_builder.glyph.route_spans
         )
 
+    def _refine_slice(self):
+        if self.glyph_builder.refine_step(REFINE_SLICE_BUDGET_S):
+            self._show_glyph() # The canvas repaints only the traces that moved
+        if not self.glyph_builder.is_refining or self._refine_elapsed.elapsed() >= REFINE_TOTAL_BUDGET_S * 1e3:
+            self._refine_timer.stop()
+
+    def _speculate_slice(self):
+        if self._refine_timer.isActive(): return # Refinement of a finished word goes first
+        self.glyph_builder.speculate_step(SPECULATE_SLICE_BUDGET_S)
+        if not self.glyph_builder.is_speculating:
+            self._speculate_timer.stop()
+
+    def _on_text_changed(self, current_text: str):
+        self._refine_timer.stop(); self._speculate_timer.stop()
+        tokens = tokenize_string(current_text) if current_text else []
+        # The canvas shows the last word, article or lexicon entry typed (trailing punctuation keeps the one before it),
+        # spelled without apostrophes or other characters that have no node, e.g. DON'T -> DONT
+        last = next((token for token in reversed(tokens) if token.kind != TOKEN_PUNCTUATION), None)
+        spelling = "" if last is None else last.key if last.kind == TOKEN_WORD else last.text.upper()
+        word = ''.join(letter for letter in spelling if letter in LETTER_TO_NODE_INFO)
+        builder = self.glyph_builder
+        if word == builder.current_word_string:
+            pass # Only punctuation or spacing changed: keep the glyph, finalized or not
+        elif not builder.is_finalized and len(word) == len(builder.current_word_string) + 1 and word.startswith(builder.current_word_string):
+            builder.add_letter(word[-1]) # One more letter: extend the glyph (a cache hit if it was prebuilt)
+        else:
+            builder.reset() 
+            for letter_char in word:
+                builder.add_letter(letter_char)
+        self.statusBar().showMessage('  '.join(f"{token.key} <{token.kind}>" for token in tokens))
+        
+        self._show_glyph()
+        if builder.is_speculating: self._speculate_timer.start()
+
+    def _on_edit_nodes_toggled(self, checked: bool):
+        if checked: # Refinement would replace the glyph under the node being dragged
+            self._refine_timer.stop(); self._speculate_timer.stop()
+        self.kohd_canvas.set_node_editing(checked)
+
     def _on_finalize_clicked(self):
         self.glyph_builder.finalize_word()
-        self.kohd_canvas.update_display_data(
-            glyph_elements=self.glyph_builder.get_glyph_elements(),
-            active_node_name=self.glyph_builder.active_node_name, 
-            is_finalized=self.glyph_builder.is_finalized
-        )
-        print("Word finalized. Glyph elements:", self.glyph_builder.get_glyph_elements())
\ No newline at end of file
+        self._show_glyph()
+        if self.glyph_builder.is_refining:
+            self._refine_elapsed.start(); self._refine_timer.start()
+        print("Word finalized. Glyph elements:", self.glyph_builder.get_glyph_elements())
+
+
+if __name__ == '__main__':
+    import os
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication # type: ignore
+    app = QApplication([])
+    window = MainWindow()
+    print("--- Typed text keeps a glyph on the canvas ---")
+    # Words, articles, lexicon entries and trailing punctuation: (text, word expected on the canvas)
+    typing_tests = [("A", "A"), ("I", "I"), ("SO", "SO"), ("THE", "THE"), ("HELLO", "HELLO"), ("HELLO,", "HELLO"),
+                    ("DON'T", "DONT"), ("there is", "THEREIS")]
+    for text, expected_word in typing_tests:
+        window.text_input.clear()
+        for end in range(1, len(text) + 1): window.text_input.setText(text[:end]) # Keystroke by keystroke
+        elements = window.kohd_canvas.glyph_elements_to_draw
+        status = "PASS" if window.glyph_builder.current_word_string == expected_word and elements else "FAIL"
+        print(f"Text: {text!r}, Word: {window.glyph_builder.current_word_string!r}, Elements: {len(elements)} -> {status}")
@@ -0,0 +1,167 @@
+# kohd_translator/gui/sheet_renderer.py
+#
+# Offscreen contact-sheet renderer for print material.
+# Pages are rendered in worker processes, each running its own offscreen
+# QGuiApplication and drawing through KohdGlyphPainter, so sheets match the
+# interactive canvas exactly. Workers PNG-compress finished pages and the
+# parent writes them to disk while the next pages are still rendering.
+import os
+import sys
+import time
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# Letter size page at 300 DPI, 12 x 16 = 192 glyphs per page
+DEFAULT_PAGE_SIZE_IN = (8.5, 11.0)
+DEFAULT_DPI = 300
+DEFAULT_COLUMNS = 12
+DEFAULT_ROWS = 16
+PAGE_MARGIN_IN = 0.25
+# Fraction of each cell reserved for the word label under the glyph
+CELL_LABEL_FRACTION = 0.15
+
+# Per-process state, created once by _init_worker
+_worker_app = None
+_worker_painter = None
+
+
+def _init_worker():
+    global _worker_app, _worker_painter
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtGui import QGuiApplication # type: ignore
+    from .glyph_painter import KohdGlyphPainter
+
+    _worker_app = QGuiApplication.instance() or QGuiApplication([sys.argv[0]])
+    _worker_painter = KohdGlyphPainter()
+
+
+def _render_page(page_index: int, words: list[str], page_size_px: tuple[int, int], columns: int, rows: int, margin_px: int) -> tuple[int, bytes]:
+    """Renders one sheet and returns it PNG-encoded, so compression happens in the worker."""
+    from PyQt6.QtGui import QImage, QPainter, QColor, QFont # type: ignore
+    from PyQt6.QtCore import Qt, QRectF, QBuffer, QByteArray, QIODevice # type: ignore
+    from kohd_core.glyph_layout import CONCEPTUAL_SIZE
+    from kohd_core.glyph_builder import build_glyph, GlyphConfig
+
+    page_w, page_h = page_size_px
+    image = QImage(page_w, page_h, QImage.Format.Format_RGB32)
+    image.fill(QColor(Qt.GlobalColor.white))
+    cell_w = (page_w - 2 * margin_px) / columns
+    cell_h = (page_h - 2 * margin_px) / rows
+    glyph_h = cell_h * (1.0 - CELL_LABEL_FRACTION)
+    scale = min(cell_w, glyph_h) / CONCEPTUAL_SIZE
+
+    painter = QPainter(image)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    label_font = QFont(); label_font.setPixelSize(max(6, int(cell_h * CELL_LABEL_FRACTION * 0.6)))
+    glyph_config = GlyphConfig(node_radius=_worker_painter.node_radius)
+    for cell_idx, word in enumerate(words):
+        row, col = divmod(cell_idx, columns)
+        cell_x = margin_px + col * cell_w
+        cell_y = margin_px + row * cell_h
+
+        glyph = build_glyph(word, glyph_config)
+        painter.save()
+        painter.translate(cell_x + (cell_w - CONCEPTUAL_SIZE * scale) / 2, cell_y)
+        painter.scale(scale, scale)
+        _worker_painter.paint_glyph(painter, glyph)
+        painter.restore()
+
+        painter.setFont(label_font); painter.setPen(QColor(Qt.GlobalColor.black))
+        painter.drawText(QRectF(cell_x, cell_y + glyph_h, cell_w, cell_h - glyph_h), Qt.AlignmentFlag.AlignCenter, word)
+    painter.end()
+
+    encoded = QByteArray()
+    buffer = QBuffer(encoded)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    image.save(buffer, "PNG")
+    buffer.close()
+    return page_index, bytes(encoded)
+
+
+def iter_wordlist(path: str):
+    """Yields words from a one-word-per-line file without loading it whole."""
+    with open(path, encoding='utf-8') as wordlist_file:
+        for line in wordlist_file:
+            word = line.strip()
+            if word:
+                yield word
+
+
+def render_contact_sheets(
+    words,
+    output_dir: str,
+    page_size_in: tuple[float, float] = DEFAULT_PAGE_SIZE_IN,
+    dpi: int = DEFAULT_DPI,
+    columns: int = DEFAULT_COLUMNS,
+    rows: int = DEFAULT_ROWS,
+    workers: int | None = None,
+    max_pending_pages: int | None = None,
+    progress_callback: callable = None
+) -> dict:
+    """Renders `words` (any iterable, consumed lazily) into numbered PNG sheets.
+
+    At most `max_pending_pages` pages are queued or in flight at once, so memory
+    stays bounded however long the wordlist is. Returns a stats dict including
+    pages_per_second.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    max_pending_pages = max_pending_pages or workers * 2
+    page_size_px = (int(page_size_in[0] * dpi), int(page_size_in[1] * dpi))
+    margin_px = int(PAGE_MARGIN_IN * dpi)
+    words_per_page = columns * rows
+
+    word_iter = iter(words)
+    pages = enumerate(iter(lambda: list(itertools.islice(word_iter, words_per_page)), []))
+
+    stats = {'pages': 0, 'words': 0, 'bytes_written': 0}
+    start_time = time.perf_counter()
+    # Spawn, not fork: Qt state must not be inherited across processes
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=_init_worker) as executor:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending_pages:
+                next_page = next(pages, None)
+                if next_page is None:
+                    exhausted = True; break
+                page_index, page_words = next_page
+                stats['words'] += len(page_words)
+                pending.add(executor.submit(_render_page, page_index, page_words, page_size_px, columns, rows, margin_px))
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                page_index, png_bytes = future.result()
+                with open(os.path.join(output_dir, f"sheet_{page_index + 1:04d}.png"), 'wb') as sheet_file:
+                    sheet_file.write(png_bytes)
+                stats['pages'] += 1
+                stats['bytes_written'] += len(png_bytes)
+                if progress_callback:
+                    progress_callback(stats['pages'], time.perf_counter() - start_time)
+
+    stats['elapsed_s'] = time.perf_counter() - start_time
+    stats['pages_per_second'] = stats['pages'] / stats['elapsed_s'] if stats['elapsed_s'] > 0 else 0.0
+    return stats
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Render Kohd glyph contact sheets to PNG.")
+    parser.add_argument('wordlist', help="Text file with one word per line")
+    parser.add_argument('output_dir')
+    parser.add_argument('--dpi', type=int, default=DEFAULT_DPI)
+    parser.add_argument('--columns', type=int, default=DEFAULT_COLUMNS)
+    parser.add_argument('--rows', type=int, default=DEFAULT_ROWS)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    def report(pages_done, elapsed):
+        print(f"  {pages_done} pages, {pages_done / elapsed:.2f} pages/s")
+
+    result = render_contact_sheets(iter_wordlist(args.wordlist), args.output_dir, dpi=args.dpi,
+                                   columns=args.columns, rows=args.rows, workers=args.workers, progress_callback=report)
+    print(f"Rendered {result['words']} words on {result['pages']} pages in {result['elapsed_s']:.1f}s "
+          f"({result['pages_per_second']:.2f} pages/s, {result['bytes_written'] / 1e6:.1f} MB)")
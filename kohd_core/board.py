@@ -0,0 +1,194 @@
+# kohd_translator/kohd_core/board.py
+#
+# The node board as data. A Board is a rectangular grid of named nodes (cells
+# may be empty) with the letters each node carries, conceptual positions, and
+# the tables routing and rule code need, all O(1) to query: name <-> index,
+# grid cell, per-row/column node masks and, per trace, the "corridor" of nodes
+# a route between two nodes can come near. Node sets are int bitmasks over
+# node indices, so they work for any board size; the null-modifier decision is
+# memoized per mask. DEFAULT_BOARD is the 3x3 Kohd board from kohd_rules.
+import math
+
+import numpy as np
+
+from .kohd_rules import NODE_LAYOUT, NODE_LETTERS, NODE_POSITIONS
+
+DEFAULT_NODE_SPACING = 100.0
+DEFAULT_BOARD_MARGIN = 50.0
+# Grid cells around the two endpoints' cells that a trace's corridor includes. Routes,
+# detours included, stay within about one node radius of that box, well inside one cell
+CORRIDOR_MARGIN_CELLS = 1
+# Letter groups placed on generated boards, as on the Kohd board
+DEFAULT_LETTER_GROUPS = tuple(letters for letters in NODE_LETTERS.values())
+
+
+class Board:
+    """A grid of named nodes. `layout` is a list of rows of node names, None for an empty cell;
+    node indices are row-major over the non-empty cells. Without `positions`, node centers are
+    laid out on a regular grid starting at `margin` with `spacing` between nodes."""
+    def __init__(self, layout, node_letters: dict | None = None, positions: dict | None = None,
+                 spacing: float = DEFAULT_NODE_SPACING, margin: float = DEFAULT_BOARD_MARGIN):
+        self.layout = tuple(tuple(row) for row in layout)
+        self.rows = len(self.layout); self.cols = max((len(row) for row in self.layout), default=0)
+        cells = [(r, c, name) for r, row in enumerate(self.layout) for c, name in enumerate(row) if name is not None]
+        self.node_names: tuple[str, ...] = tuple(name for _, _, name in cells)
+        self.node_id: dict[str, int] = {name: i for i, name in enumerate(self.node_names)}
+        if len(self.node_id) != len(self.node_names): raise ValueError("node names must be unique")
+        self.row_col: tuple[tuple[int, int], ...] = tuple((r, c) for r, c, _ in cells)
+        self.cell_node_id: dict[tuple[int, int], int] = {rc: i for i, rc in enumerate(self.row_col)}
+        self.positions: dict[str, tuple[float, float]] = dict(positions) if positions else \
+            {name: (margin + c * spacing, margin + r * spacing) for r, c, name in cells}
+        self.position_array = np.array([self.positions[name] for name in self.node_names], dtype=float).reshape(-1, 2)
+        self.extent = (float(self.position_array[:, 0].max() + margin), float(self.position_array[:, 1].max() + margin)) if cells else (0.0, 0.0)
+
+        self.node_letters = {name: tuple(letters) for name, letters in (node_letters or {}).items()}
+        self.letter_to_node_info = {}
+        for node_name, letters_in_node in self.node_letters.items():
+            for i, letter in enumerate(letters_in_node):
+                if letter: self.letter_to_node_info[letter] = {'node_name': node_name, 'subnodes': i + 1}
+
+        self.num_nodes = len(self.node_names)
+        self.full_mask = (1 << self.num_nodes) - 1
+        self.row_masks = tuple(sum(1 << i for i, (r, _) in enumerate(self.row_col) if r == row) for row in range(self.rows))
+        self.col_masks = tuple(sum(1 << i for i, (_, c) in enumerate(self.row_col) if c == col) for col in range(self.cols))
+        diagonal = min(self.rows, self.cols)
+        self.main_diag_mask = sum(1 << self.cell_node_id[(i, i)] for i in range(diagonal) if (i, i) in self.cell_node_id)
+        self.anti_diag_mask = sum(1 << self.cell_node_id[(i, self.cols - 1 - i)] for i in range(diagonal) if (i, self.cols - 1 - i) in self.cell_node_id)
+        # Null modifier corner preference: bottom-right, bottom-left, top-right, top-left (existing cells only)
+        corner_cells = ((self.rows - 1, self.cols - 1), (self.rows - 1, 0), (0, self.cols - 1), (0, 0))
+        self.null_modifier_corner_ids = tuple(dict.fromkeys(self.cell_node_id[rc] for rc in corner_cells if rc in self.cell_node_id))
+        center_id = self.cell_node_id.get((self.rows // 2, self.cols // 2))
+        self.center_node_name = self.node_names[center_id] if center_id is not None else None
+
+        self._key = (self.layout, tuple(sorted(self.node_letters.items())), tuple(sorted(self.positions.items())))
+        self._hash = hash(self._key)
+        self._corridors: dict[tuple[str, str], list[tuple[float, float]]] = {}
+        self._null_modifier_nodes: dict[int, str | None] = {}
+
+    @classmethod
+    def grid(cls, rows: int, cols: int, letter_groups=DEFAULT_LETTER_GROUPS, spacing: float = DEFAULT_NODE_SPACING,
+             margin: float = DEFAULT_BOARD_MARGIN) -> 'Board':
+        """A full rows x cols board with nodes named 'R<row>C<col>' and the letter groups spread evenly over it,
+        one group per node. Raises ValueError if the board has fewer nodes than letter groups."""
+        layout = [[f"R{r}C{c}" for c in range(cols)] for r in range(rows)]
+        names = [name for row in layout for name in row]
+        if len(names) < len(letter_groups): raise ValueError(f"a {rows}x{cols} board has fewer nodes than the {len(letter_groups)} letter groups")
+        node_letters = {names[(2 * k + 1) * len(names) // (2 * len(letter_groups))]: letters for k, letters in enumerate(letter_groups)}
+        return cls(layout, node_letters, spacing=spacing, margin=margin)
+
+    def moved(self, node_name: str, position: tuple[float, float]) -> 'Board':
+        """A copy of the board with one node at a new conceptual position (same grid cells and letters)."""
+        positions = dict(self.positions); positions[node_name] = (float(position[0]), float(position[1]))
+        return Board(self.layout, self.node_letters, positions)
+
+    def __eq__(self, other) -> bool:
+        return self is other or (isinstance(other, Board) and self._key == other._key)
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __getstate__(self) -> dict:
+        state = dict(self.__dict__); state['_corridors'] = {}; state['_null_modifier_nodes'] = {} # Caches are rebuilt on demand
+        return state
+
+    def __repr__(self) -> str:
+        return f"Board({self.rows}x{self.cols}, {self.num_nodes} nodes)"
+
+    # --- Node lookups ---
+    def node_rc(self, node_name: str) -> tuple[int, int] | None:
+        node_index = self.node_id.get(node_name)
+        return self.row_col[node_index] if node_index is not None else None
+
+    def node_mask(self, node_names) -> int:
+        mask = 0
+        for name in node_names: mask |= 1 << self.node_id[name]
+        return mask
+
+    def mask_to_node_names(self, mask: int) -> list[str]:
+        return [self.node_names[i] for i in range(self.num_nodes) if mask >> i & 1]
+
+    def corridor(self, start_node_name: str, end_node_name: str) -> list[tuple[float, float]]:
+        """Centers of the nodes a trace between the two nodes may pass near: every node, the endpoints excluded,
+        whose cell is within CORRIDOR_MARGIN_CELLS of the endpoints' bounding box. Memoized per pair."""
+        key = (start_node_name, end_node_name) if start_node_name <= end_node_name else (end_node_name, start_node_name)
+        centers = self._corridors.get(key)
+        if centers is None:
+            (r1, c1), (r2, c2) = self.node_rc(start_node_name), self.node_rc(end_node_name)
+            min_r = max(0, min(r1, r2) - CORRIDOR_MARGIN_CELLS); max_r = min(self.rows - 1, max(r1, r2) + CORRIDOR_MARGIN_CELLS)
+            min_c = max(0, min(c1, c2) - CORRIDOR_MARGIN_CELLS); max_c = min(self.cols - 1, max(c1, c2) + CORRIDOR_MARGIN_CELLS)
+            centers = self._corridors[key] = [
+                self.positions[self.node_names[self.cell_node_id[(r, c)]]]
+                for r in range(min_r, max_r + 1) for c in range(min_c, max_c + 1)
+                if (r, c) in self.cell_node_id and self.node_names[self.cell_node_id[(r, c)]] not in key]
+        return centers
+
+    # --- Null modifier ---
+    def mask_bounding_box(self, mask: int) -> tuple[int, int, int, int] | None:
+        """Returns (min_row, max_row, min_col, max_col) of the nodes in mask, or None if empty."""
+        if not mask: return None
+        rows = [r for r in range(self.rows) if mask & self.row_masks[r]]
+        cols = [c for c in range(self.cols) if mask & self.col_masks[c]]
+        return rows[0], rows[-1], cols[0], cols[-1]
+
+    def null_modifier_needed(self, mask: int) -> bool:
+        used_count = bin(mask).count('1')
+        if used_count == 0 or used_count >= self.num_nodes:
+            return False
+        if used_count == 1:
+            return True
+        min_r, max_r, min_c, max_c = self.mask_bounding_box(mask)
+        if (max_r - min_r + 1) < self.rows or (max_c - min_c + 1) < self.cols:
+            if used_count == 3:
+                if mask in self.row_masks or mask in self.col_masks:
+                    return True
+                if mask == self.main_diag_mask or mask == self.anti_diag_mask:
+                    return False
+            return True
+        return False
+
+    def null_modifier_placement(self, mask: int) -> int | None:
+        """Node index for the null modifier of a word using `mask`: a free corner outside the word's
+        bounding box if there is one, else any free corner, else None."""
+        bbox = self.mask_bounding_box(mask)
+        min_r, max_r, min_c, max_c = bbox if bbox else (0, self.rows - 1, 0, self.cols - 1)
+        for corner_id in self.null_modifier_corner_ids:
+            r, c = self.row_col[corner_id]
+            is_outside_bbox = not (min_r <= r <= max_r and min_c <= c <= max_c)
+            if not mask >> corner_id & 1 and is_outside_bbox:
+                return corner_id
+        for corner_id in self.null_modifier_corner_ids:
+            if not mask >> corner_id & 1:
+                return corner_id
+        return None
+
+    def null_modifier_node(self, mask: int) -> str | None:
+        """Node name where the null modifier goes for a word using `mask`, or None if not needed. Memoized per mask."""
+        try:
+            return self._null_modifier_nodes[mask]
+        except KeyError:
+            placement = self.null_modifier_placement(mask) if self.null_modifier_needed(mask) else None
+            node_name = self._null_modifier_nodes[mask] = self.node_names[placement] if placement is not None else None
+            return node_name
+
+
+DEFAULT_BOARD = Board(NODE_LAYOUT, NODE_LETTERS, NODE_POSITIONS)
+
+
+if __name__ == '__main__':
+    import time
+    import random
+    import string
+    from .glyph_builder import build_glyph, GlyphConfig
+
+    rng = random.Random(0)
+    words = [''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 10))) for _ in range(300)]
+    for size in (3, 6, 10, 16):
+        board = DEFAULT_BOARD if size == 3 else Board.grid(size, size)
+        config = GlyphConfig(board=board)
+        for word in words[:5]: build_glyph(word, config) # Warm the corridor and null-modifier caches
+        start = time.perf_counter()
+        glyphs = [build_glyph(word, config) for word in words]
+        elapsed = time.perf_counter() - start
+        print(f"{board!r}: {elapsed / len(words) * 1e6:.0f} us/word, "
+              f"{sum(g.quality_metrics['node_intrusions'] for g in glyphs)} node intrusions, "
+              f"{math.fsum(1 for g in glyphs if any(el['type'] == 'null_modifier' for el in g.elements)):.0f} null modifiers")
@@ -0,0 +1,111 @@
+# kohd_translator/kohd_core/compiled_rules.py
+#
+# Compiled, integer-indexed form of the tables in kohd_rules, for the default
+# 3x3 board. Nodes are numbered 0-8 in row-major order (DEFAULT_BOARD's node
+# indices), so a set of nodes fits in a 9-bit mask and every per-set question
+# (bounding box, null-modifier need and placement) can be precomputed for all
+# 512 masks and answered for whole batches of words with numpy. Other boards
+# answer the same questions per mask through Board.
+import numpy as np
+
+from .kohd_rules import LETTER_TO_NODE_INFO
+from .board import DEFAULT_BOARD
+
+GRID_ROWS = DEFAULT_BOARD.rows
+GRID_COLS = DEFAULT_BOARD.cols
+NUM_NODES = DEFAULT_BOARD.num_nodes
+NUM_NODE_MASKS = 1 << NUM_NODES
+FULL_NODE_MASK = NUM_NODE_MASKS - 1
+
+# Marks "no node" in the byte tables (letter not in the alphabet, no placement)
+NO_NODE = 0xFF
+
+NODE_NAMES: tuple[str, ...] = DEFAULT_BOARD.node_names
+NODE_ID: dict[str, int] = DEFAULT_BOARD.node_id
+NODE_ROW_COL: tuple[tuple[int, int], ...] = DEFAULT_BOARD.row_col
+
+# 256-entry byte table indexed by character code: column 0 is the node id,
+# column 1 the subnode count. Both cases map; everything else is NO_NODE/0.
+LETTER_TABLE = np.zeros((256, 2), dtype=np.uint8)
+LETTER_TABLE[:, 0] = NO_NODE
+for _letter, _info in LETTER_TO_NODE_INFO.items():
+    for _code in (ord(_letter.upper()), ord(_letter.lower())):
+        LETTER_TABLE[_code, 0] = NODE_ID[_info['node_name']]
+        LETTER_TABLE[_code, 1] = _info['subnodes']
+LETTER_NODE_ID = LETTER_TABLE[:, 0]
+LETTER_SUBNODES = LETTER_TABLE[:, 1]
+
+# Bit i of a node mask is set when node id i is used
+NODE_BIT = np.array([1 << i for i in range(NUM_NODES)], dtype=np.uint16)
+ROW_MASKS = DEFAULT_BOARD.row_masks
+COL_MASKS = DEFAULT_BOARD.col_masks
+MAIN_DIAG_MASK = DEFAULT_BOARD.main_diag_mask
+ANTI_DIAG_MASK = DEFAULT_BOARD.anti_diag_mask
+
+# Null modifier corner preference: bottom-right, bottom-left, top-right, top-left
+NULL_MODIFIER_CORNER_IDS = DEFAULT_BOARD.null_modifier_corner_ids
+
+node_mask = DEFAULT_BOARD.node_mask
+mask_to_node_names = DEFAULT_BOARD.mask_to_node_names
+mask_bounding_box = DEFAULT_BOARD.mask_bounding_box
+
+def _null_modifier_placement(mask: int) -> int:
+    placement = DEFAULT_BOARD.null_modifier_placement(mask)
+    return NO_NODE if placement is None else placement
+
+# 512-entry tables indexed by the word's node mask
+NULL_MODIFIER_NEEDED = np.array([DEFAULT_BOARD.null_modifier_needed(m) for m in range(NUM_NODE_MASKS)], dtype=np.bool_)
+NULL_MODIFIER_PLACEMENT = np.array([_null_modifier_placement(m) for m in range(NUM_NODE_MASKS)], dtype=np.uint8)
+
+
+def null_modifier_node_for_mask(mask: int) -> str | None:
+    """Node name where the null modifier goes for a word using `mask`, or None if not needed."""
+    if not NULL_MODIFIER_NEEDED[mask]:
+        return None
+    placement = NULL_MODIFIER_PLACEMENT[mask]
+    return NODE_NAMES[placement] if placement != NO_NODE else None
+
+
+def words_to_node_sequences(words: list[str]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Converts a batch of words in one vectorized pass.
+
+    Returns (node_ids, subnode_counts, offsets) in CSR form: the letters of
+    word i are node_ids[offsets[i]:offsets[i + 1]]. Characters outside the
+    alphabet are dropped, matching how the builder skips them.
+    """
+    lengths = np.fromiter((len(w) for w in words), dtype=np.int64, count=len(words))
+    raw = np.frombuffer(''.join(words).encode('latin-1', errors='replace'), dtype=np.uint8)
+    node_ids = LETTER_NODE_ID[raw]
+    valid = node_ids != NO_NODE
+
+    # Re-count each word's length after dropping invalid characters
+    char_offsets = np.zeros(len(words) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=char_offsets[1:])
+    valid_prefix = np.zeros(len(raw) + 1, dtype=np.int64)
+    np.cumsum(valid, out=valid_prefix[1:])
+    offsets = valid_prefix[char_offsets]
+
+    return node_ids[valid], LETTER_SUBNODES[raw][valid], offsets
+
+def node_masks_for_sequences(node_ids: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """Per-word 9-bit node masks for CSR node sequences from words_to_node_sequences."""
+    bits = np.append(NODE_BIT[node_ids], np.uint16(0)) # Sentinel keeps reduceat indices in range
+    masks = np.bitwise_or.reduceat(bits, offsets[:-1]) if len(offsets) > 1 else np.zeros(0, dtype=np.uint16)
+    masks[offsets[1:] == offsets[:-1]] = 0 # reduceat yields bits[i] for empty segments
+    return masks
+
+def null_modifiers_for_words(words: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    """Vectorized null modifier decision for a batch: (needed, placement_node_ids)."""
+    node_ids, _, offsets = words_to_node_sequences(words)
+    masks = node_masks_for_sequences(node_ids, offsets)
+    return NULL_MODIFIER_NEEDED[masks], NULL_MODIFIER_PLACEMENT[masks]
+
+
+if __name__ == '__main__':
+    sample_words = ["MOTHERBOARD", "A", "HI", "AEI", "CEG", "", "TWO-PART", "moon"]
+    ids, subnodes, offs = words_to_node_sequences(sample_words)
+    needed, placement = null_modifiers_for_words(sample_words)
+    for i, word in enumerate(sample_words):
+        seq = [NODE_NAMES[n] for n in ids[offs[i]:offs[i + 1]]]
+        place = NODE_NAMES[placement[i]] if needed[i] else None
+        print(f"{word!r}: nodes={seq}, subnodes={subnodes[offs[i]:offs[i + 1]].tolist()}, null_modifier={place}")
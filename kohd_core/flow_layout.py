@@ -0,0 +1,190 @@
+# kohd_translator/kohd_core/flow_layout.py
+#
+# Flows a passage of word glyphs into lines on one large board, in conceptual
+# units. Each distinct word is built and measured once (bounding box plus its
+# charge/ground connection ports) and cached. Edits reflow from the line before
+# the edit only until the new line breaks line up with the old ones again; the
+# rest of the passage is reused and just shifted. A width change reflows from
+# the first line whose breaking actually changes.
+from bisect import bisect_right
+from dataclasses import dataclass, field
+
+from .glyph_builder import build_glyph, Glyph, GlyphConfig, DEFAULT_GLYPH_CONFIG
+from .glyph_layout import GlyphStyle, layout_bounds
+
+DEFAULT_WORD_GAP = 20.0
+DEFAULT_LINE_GAP = 30.0
+
+
+@dataclass(frozen=True)
+class WordBox:
+    """A built word glyph with its extent and ports, relative to the glyph's own conceptual origin."""
+    word: str
+    glyph: Glyph
+    layout: dict = field(compare=False)
+    bounds: tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)
+    # 'charge' (where the word is entered) and 'ground' (where it leaves); None when not drawn
+    ports: dict = field(default_factory=dict, compare=False)
+
+    @property
+    def width(self) -> float:
+        return self.bounds[2] - self.bounds[0]
+
+    @property
+    def height(self) -> float:
+        return self.bounds[3] - self.bounds[1]
+
+
+@dataclass
+class FlowLine:
+    start: int # First word index
+    end: int   # One past the last word index
+    y: float
+    height: float
+    width: float
+    x_offsets: list[float] # Left edge of each word's box, relative to the line
+
+
+def measure_word(word: str, config: GlyphConfig = DEFAULT_GLYPH_CONFIG, style: GlyphStyle | None = None) -> WordBox:
+    style = style or GlyphStyle(config.node_radius)
+    glyph = build_glyph(word, config)
+    layout = glyph.layout(style)
+    charge = layout['charge_indicator']; ground = layout['ground_indicator']
+    ports = {'charge': charge['zigzag_points'][-1] if charge else None,
+             'ground': ground['attach_point'] if ground else None}
+    return WordBox(word=word, glyph=glyph, layout=layout, bounds=layout_bounds(layout, style), ports=ports)
+
+
+class FlowLayout:
+    def __init__(self, max_line_width: float, word_gap: float = DEFAULT_WORD_GAP, line_gap: float = DEFAULT_LINE_GAP,
+                 config: GlyphConfig = DEFAULT_GLYPH_CONFIG):
+        self.max_line_width = max_line_width
+        self.word_gap = word_gap; self.line_gap = line_gap
+        self.config = config; self.style = GlyphStyle(config.node_radius)
+        self.words: list[str] = []; self.boxes: list[WordBox] = []
+        self.lines: list[FlowLine] = []
+        self._box_cache: dict[str, WordBox] = {}
+        self.last_reflow_words = 0 # Words placed by the most recent edit, for checking reflow cost
+
+    # --- Word measurement ---
+    def word_box(self, word: str) -> WordBox:
+        box = self._box_cache.get(word)
+        if box is None:
+            box = self._box_cache[word] = measure_word(word, self.config, self.style)
+        return box
+
+    # --- Edits ---
+    def set_words(self, words):
+        self.words = list(words); self.boxes = [self.word_box(word) for word in self.words]
+        self.lines = []; self.last_reflow_words = 0
+        self._reflow_tail(0, 0.0, reusable_lines={}, index_shift=0)
+
+    def replace_word(self, index: int, word: str):
+        self.words[index] = word; self.boxes[index] = self.word_box(word)
+        self._reflow_after_edit(index, 0)
+
+    def insert_word(self, index: int, word: str):
+        self.words.insert(index, word); self.boxes.insert(index, self.word_box(word))
+        self._reflow_after_edit(index, 1)
+
+    def remove_word(self, index: int):
+        del self.words[index]; del self.boxes[index]
+        self._reflow_after_edit(index, -1)
+
+    def set_max_line_width(self, max_line_width: float):
+        self.max_line_width = max_line_width; self.last_reflow_words = 0
+        for line_index, line in enumerate(self.lines):
+            if not self._line_still_valid(line):
+                self._reflow_from_line(line_index, reusable_lines={}, index_shift=0)
+                return
+
+    # --- Placement queries ---
+    def line_of_word(self, index: int) -> int:
+        return max(0, bisect_right([line.start for line in self.lines], index) - 1)
+
+    def word_origin(self, index: int) -> tuple[float, float]:
+        """Board position of word `index`'s conceptual origin (translate its glyph by this to draw it)."""
+        line = self.lines[self.line_of_word(index)]
+        bounds = self.boxes[index].bounds
+        return (line.x_offsets[index - line.start] - bounds[0], line.y - bounds[1])
+
+    def word_ports(self, index: int) -> dict:
+        origin_x, origin_y = self.word_origin(index)
+        return {name: (origin_x + point[0], origin_y + point[1]) if point else None for name, point in self.boxes[index].ports.items()}
+
+    def placements(self):
+        """Yields (index, word_box, origin) for every word, in reading order."""
+        for line in self.lines:
+            for index in range(line.start, line.end):
+                bounds = self.boxes[index].bounds
+                yield index, self.boxes[index], (line.x_offsets[index - line.start] - bounds[0], line.y - bounds[1])
+
+    @property
+    def height(self) -> float:
+        return self.lines[-1].y + self.lines[-1].height if self.lines else 0.0
+
+    # --- Line breaking ---
+    def _break_line(self, start: int, y: float) -> FlowLine:
+        """Greedily fills one line from word `start`; a line always takes at least one word."""
+        x_offsets = []; width = 0.0; height = 0.0
+        index = start
+        while index < len(self.boxes):
+            box = self.boxes[index]
+            next_width = width + (self.word_gap if x_offsets else 0.0) + box.width
+            if x_offsets and next_width > self.max_line_width: break
+            x_offsets.append(next_width - box.width); width = next_width; height = max(height, box.height)
+            index += 1
+        self.last_reflow_words += len(x_offsets)
+        return FlowLine(start=start, end=index, y=y, height=height, width=width, x_offsets=x_offsets)
+
+    def _line_still_valid(self, line: FlowLine) -> bool:
+        """Whether greedy breaking at the current width would produce this same line."""
+        if line.width > self.max_line_width and line.end - line.start > 1: return False
+        if line.end < len(self.boxes) and line.width + self.word_gap + self.boxes[line.end].width <= self.max_line_width: return False
+        return True
+
+    def _reflow_after_edit(self, edit_index: int, index_shift: int):
+        self.last_reflow_words = 0
+        if not self.lines:
+            self._reflow_tail(0, 0.0, reusable_lines={}, index_shift=0); return
+        # Old lines wholly after the edit keep their words (shifted by index_shift) and can be reused as-is
+        reusable_lines = {line.start + index_shift: line for line in self.lines
+                          if line.start > edit_index or (index_shift > 0 and line.start == edit_index)}
+        # Start one line early: a word that got shorter (or removed) may let words move up
+        self._reflow_from_line(max(0, self.line_of_word(edit_index) - 1), reusable_lines, index_shift)
+
+    def _reflow_from_line(self, line_index: int, reusable_lines: dict, index_shift: int):
+        first_line = self.lines[line_index]
+        del self.lines[line_index:] # Reusable old lines stay reachable through reusable_lines
+        self._reflow_tail(first_line.start, first_line.y, reusable_lines, index_shift)
+
+    def _reflow_tail(self, start: int, y: float, reusable_lines: dict, index_shift: int):
+        while start < len(self.boxes):
+            reusable = reusable_lines.get(start)
+            if reusable is not None: # Breaks line up with the old layout again: shift the rest and stop
+                dy = y - reusable.y
+                for line in sorted(reusable_lines.values(), key=lambda old_line: old_line.start):
+                    if line.start + index_shift < start: continue
+                    line.start += index_shift; line.end += index_shift; line.y += dy
+                    self.lines.append(line)
+                return
+            line = self._break_line(start, y)
+            self.lines.append(line)
+            start = line.end; y += line.height + self.line_gap
+
+
+if __name__ == '__main__':
+    import time
+    import random
+    import string
+    rng = random.Random(0)
+    passage = [''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(2, 9))) for _ in range(5000)]
+    flow = FlowLayout(max_line_width=3000.0)
+    start_time = time.perf_counter(); flow.set_words(passage)
+    print(f"initial flow: {len(flow.words)} words, {len(flow.lines)} lines, {time.perf_counter() - start_time:.2f}s (builds included)")
+    for label, edit in [("replace word 2500", lambda: flow.replace_word(2500, "KOHD")),
+                        ("insert at 100", lambda: flow.insert_word(100, "WORD")),
+                        ("remove 4000", lambda: flow.remove_word(4000)),
+                        ("width 3000 -> 2600", lambda: flow.set_max_line_width(2600.0))]:
+        start_time = time.perf_counter(); edit()
+        print(f"{label}: {flow.last_reflow_words} words reflowed in {(time.perf_counter() - start_time) * 1e3:.2f} ms")
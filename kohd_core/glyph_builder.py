@@ -1,332 +1,604 @@
 # kohd_translator/kohd_core/glyph_builder.py
-from .kohd_rules import LETTER_TO_NODE_INFO, NODE_POSITIONS, NODE_LAYOUT
-from .trace_router import calculate_trace_path 
-import math
+#
+# build_glyph() is the pure entry point: word + GlyphConfig in, immutable
+# Glyph out, with no shared state, so it is safe to call from thread pools and
+# cheap to ship to process pools. It runs in two phases: plan_word() decides all
+# structure (node sequence, subnodes, rings, offsets) without any geometry, and
+# routing turns a WordPlan into a Glyph. Jobs that only need structure can stop
+# at the plan. Traces are routed at a quality level (trace_router): cheap
+# drafts while typing, and iter_refined_glyphs()/refine_glyph() improve a
+# finished glyph as far as a time budget allows. KohdGlyphBuilder is the
+# stateful wrapper the GUI uses for letter-by-letter input: each letter is
+# added with extend_glyph(), and with a letter model it can prebuild the
+# likely next letters while the user is idle.
+import time
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+from .board import Board, DEFAULT_BOARD
+from .trace_router import (route_trace, refined_route_candidates, pick_route, score_route_candidates,
+                           ROUTE_QUALITY_STANDARD, ROUTE_QUALITY_REFINED)
+from .glyph_layout import GlyphStyle, MAX_RINGS_TO_DRAW, layout_glyph
+from .route_buffer import RouteBuffer
+from .letter_model import LetterBigramModel
+
+# Ring levels sampled when converting a legacy get_ring_radius_method callback
+RING_LEVELS_SAMPLED_FROM_CALLBACK = 16
+# Default time allowed to refine_glyph
+REFINE_TIME_BUDGET_S = 0.05
+# Default time allowed to one KohdGlyphBuilder.speculate_step
+SPECULATE_TIME_BUDGET_S = 0.004
+# Most likely next letters KohdGlyphBuilder prebuilds after each keystroke
+SPECULATION_MAX_LETTERS = 8
+
+
+@dataclass(frozen=True)
+class GlyphConfig:
+    """Geometry parameters for building a glyph. Plain data, so it pickles cheaply.
+
+    ring_radii[k] is the connection radius for ring level k; deeper levels
+    reuse the last entry. Left empty, it is derived from GlyphStyle.
+    board is the node board glyphs are built on.
+    """
+    node_radius: float = 20.0
+    ring_radii: tuple[float, ...] = ()
+    board: Board = DEFAULT_BOARD
+
+    def __post_init__(self):
+        if not self.ring_radii:
+            style = GlyphStyle(self.node_radius)
+            object.__setattr__(self, 'ring_radii', tuple(style.ring_radius(level) for level in range(MAX_RINGS_TO_DRAW + 1)))
+
+    def ring_radius(self, ring_level: int) -> float:
+        if ring_level <= 0: return self.ring_radii[0]
+        return self.ring_radii[min(ring_level, len(self.ring_radii) - 1)]
+
+    @classmethod
+    def from_ring_radius_method(cls, node_radius: float, get_ring_radius_method: callable, board: Board = DEFAULT_BOARD) -> 'GlyphConfig':
+        """Samples a ring-radius callback into a config, trimming the constant tail."""
+        ring_radii = [get_ring_radius_method(level) for level in range(RING_LEVELS_SAMPLED_FROM_CALLBACK)]
+        while len(ring_radii) > 1 and ring_radii[-1] == ring_radii[-2]:
+            ring_radii.pop()
+        return cls(node_radius=node_radius, ring_radii=tuple(ring_radii), board=board)
+
+DEFAULT_GLYPH_CONFIG = GlyphConfig()
+
+
+@dataclass(frozen=True)
+class Glyph:
+    """Result of build_glyph. `elements` are the drawable element dicts, in draw order."""
+    word: str
+    elements: tuple = ()
+    active_node_name: str | None = None
+    first_node_name: str | None = None
+    subnode_queue: tuple = ()
+    used_node_mask: int = 0
+    is_finalized: bool = False
+    # (node_name, face) -> offset indices handed out by _next_offset_idx, in order
+    node_connection_manager: dict = field(default_factory=dict, compare=False)
+    # One route_trace metrics dict per trace element, in order
+    route_metrics: tuple = field(default=(), compare=False)
+    board: Board = field(default=DEFAULT_BOARD, compare=False, repr=False)
+    # Every trace path packed into one float64 buffer, shared with the glyphs this one was extended or
+    # refined from, and the (start, end) point span of each trace element's path in it, in order
+    routes: RouteBuffer = field(default_factory=RouteBuffer, compare=False, repr=False)
+    route_spans: tuple = field(default=(), compare=False, repr=False)
+
+    @property
+    def used_node_names(self) -> set[str]:
+        return set(self.board.mask_to_node_names(self.used_node_mask))
+
+    def layout(self, style: GlyphStyle | None = None) -> dict:
+        """layout_glyph of this glyph, its traces referring to their spans in the glyph's own route buffer."""
+        return layout_glyph(list(self.elements), self.active_node_name, self.is_finalized, style, self.board, self.routes, self.route_spans)
+
+    @property
+    def quality_metrics(self) -> dict:
+        """Routing quality totals for the glyph, for tracking alongside build speed. Draft traces are
+        not scored, so the geometric totals cover scored traces only."""
+        scored = [m for m in self.route_metrics if 'cost' in m]
+        return {
+            'traces': len(self.route_metrics),
+            'unscored_traces': len(self.route_metrics) - len(scored),
+            'wire_length': sum(m['length'] for m in scored),
+            'bends': sum(m['bends'] for m in scored),
+            'crossings': sum(m['crossings'] for m in scored),
+            'node_intrusions': sum(1 for m in scored if m['min_clearance'] < 0),
+            'min_clearance': min((m['min_clearance'] for m in scored), default=None),
+            'candidates_scored': sum(m['candidates'] for m in scored),
+            'alternative_shapes': sum(1 for m in self.route_metrics if m['chosen'] != 0),
+        }
+
+
+def _determine_connection_face(from_node_coords: tuple[float, float], to_node_coords: tuple[float, float]) -> str:
+    dx = to_node_coords[0] - from_node_coords[0]
+    dy = to_node_coords[1] - from_node_coords[1] 
+
+    if abs(dx) < 1e-6 and abs(dy) < 1e-6: 
+        return 'E' 
+
+    if abs(dx) >= abs(dy): 
+        return 'E' if dx > 0 else 'W'
+    else:  
+        return 'S' if dy > 0 else 'N'
+
+def _next_offset_idx(node_connection_manager: dict, node_name: str, face_key: str) -> int:
+    used_indices_for_face = node_connection_manager.setdefault((node_name, face_key), [])
+    
+    offset_idx_to_try = 0
+    if 0 not in used_indices_for_face:
+        offset_idx_to_try = 0
+    else:
+        i = 1
+        max_offset_magnitude = 5 
+        found = False
+        while i <= max_offset_magnitude:
+            if i not in used_indices_for_face:
+                offset_idx_to_try = i
+                found = True; break
+            if -i not in used_indices_for_face:
+                offset_idx_to_try = -i
+                found = True; break
+            i += 1
+        if not found: 
+            offset_idx_to_try = i 
+            while offset_idx_to_try in used_indices_for_face:
+                offset_idx_to_try +=1
+    
+    used_indices_for_face.append(offset_idx_to_try)
+    return offset_idx_to_try
+
+
+@dataclass(frozen=True)
+class TracePlan:
+    """Structure of one trace: which nodes and ring levels it joins, its face offsets and the subnodes it carries."""
+    from_node_name: str
+    to_node_name: str
+    subnodes: tuple = () # ({'letter', 'count'} dicts), as in a trace element's subnodes_on_trace
+    connect_from_ring_level: int = 0
+    connect_to_ring_level: int = 0
+    start_offset_idx: int = 0
+    end_offset_idx: int = 0
+
+
+@dataclass(frozen=True)
+class WordPlan:
+    """Everything about a word's glyph except path geometry. Cheap to compute and to keep around;
+    glyph() routes the traces on first use and memoizes the result per GlyphConfig."""
+    word: str
+    traces: tuple = ()           # TracePlan per trace, in order
+    node_ring_counts: tuple = () # (node_name, ring_count) per visited node, in first-visit order
+    first_node_name: str | None = None
+    active_node_name: str | None = None
+    subnode_queue: tuple = ()    # Subnodes after the last trace, carried by the trace to ground
+    used_node_mask: int = 0
+    node_connection_manager: dict = field(default_factory=dict, compare=False)
+    board: Board = field(default=DEFAULT_BOARD, compare=False, repr=False)
+    _glyphs: dict = field(default_factory=dict, compare=False, repr=False)
+
+    @property
+    def node_sequence(self) -> tuple[str, ...]:
+        """Nodes in visiting order, consecutive repeats collapsed."""
+        if not self.first_node_name: return ()
+        return (self.first_node_name,) + tuple(trace.to_node_name for trace in self.traces)
+
+    @property
+    def subnode_groups(self) -> tuple[tuple, ...]:
+        """Subnodes per trace, then the trailing group carried to ground."""
+        return tuple(trace.subnodes for trace in self.traces) + ((self.subnode_queue,) if self.subnode_queue else ())
+
+    @property
+    def null_modifier_node_name(self) -> str | None:
+        return self.board.null_modifier_node(self.used_node_mask)
+
+    @property
+    def charge_node_name(self) -> str | None:
+        return self.first_node_name
+
+    @property
+    def ground_node_name(self) -> str | None:
+        return self.active_node_name
+
+    def glyph(self, config: GlyphConfig = DEFAULT_GLYPH_CONFIG, finalize: bool = True, quality: str = ROUTE_QUALITY_STANDARD) -> 'Glyph':
+        if config.board != self.board: raise ValueError("config is for a different board than this plan")
+        key = (config, finalize, quality)
+        glyph = self._glyphs.get(key)
+        if glyph is None:
+            glyph = self._glyphs[key] = _route_plan(self, config, finalize, quality)
+        return glyph
+
+
+def _plan_trace(board: Board, node_connection_manager: dict, node_ring_counts: dict, departed_node_names,
+                from_node_name_for_trace: str, target_node_name_for_letter: str, subnodes: tuple) -> TracePlan:
+    """Plans the trace from the active node to the next letter's node. Hands out face offsets from
+    node_connection_manager and raises the target's ring count on a return, updating both in place."""
+    node_positions = board.positions
+    is_return_to_target_node = target_node_name_for_letter in departed_node_names
+
+    # Determine connection ring levels
+    origin_connect_ring_level = node_ring_counts[from_node_name_for_trace]
+    current_rings_on_target_node = node_ring_counts[target_node_name_for_letter]
+    # A return connects to the next conceptual ring layer (base -> ring 1 -> ring 2 ...);
+    # otherwise the trace connects to the target's current highest established ring level.
+    effective_target_connect_ring_level = current_rings_on_target_node + 1 if is_return_to_target_node else current_rings_on_target_node
+
+    from_node_coords = node_positions[from_node_name_for_trace]
+    to_node_coords = node_positions[target_node_name_for_letter]
+    exit_face = _determine_connection_face(from_node_coords, to_node_coords)
+    entry_face = _determine_connection_face(to_node_coords, from_node_coords)
+
+    start_offset_idx = _next_offset_idx(node_connection_manager, from_node_name_for_trace, exit_face)
+
+    dx_trace = to_node_coords[0] - from_node_coords[0]
+    dy_trace = to_node_coords[1] - from_node_coords[1]
+    align_tolerance = 0.1
+    if abs(dy_trace) < align_tolerance or abs(dx_trace) < align_tolerance:
+        # Aligned traces keep the same offset at both ends when the target face allows it
+        target_node_face_tuple = (target_node_name_for_letter, entry_face)
+        used_indices_on_target_face = node_connection_manager.get(target_node_face_tuple, [])
+        if not used_indices_on_target_face or start_offset_idx not in used_indices_on_target_face:
+            end_offset_idx = start_offset_idx
+            node_connection_manager.setdefault(target_node_face_tuple, []).append(end_offset_idx)
+        else: # start_offset_idx is already taken on target face
+            end_offset_idx = _next_offset_idx(node_connection_manager, target_node_name_for_letter, entry_face)
+    else:
+        end_offset_idx = _next_offset_idx(node_connection_manager, target_node_name_for_letter, entry_face)
+
+    # Update the target node's ring count if this trace connected to a new, higher ring level
+    if is_return_to_target_node and effective_target_connect_ring_level > current_rings_on_target_node:
+        node_ring_counts[target_node_name_for_letter] = effective_target_connect_ring_level
+
+    return TracePlan(
+        from_node_name=from_node_name_for_trace, to_node_name=target_node_name_for_letter, subnodes=subnodes,
+        connect_from_ring_level=origin_connect_ring_level, connect_to_ring_level=effective_target_connect_ring_level,
+        start_offset_idx=start_offset_idx, end_offset_idx=end_offset_idx
+    )
+
+def plan_word(word: str, board: Board = DEFAULT_BOARD) -> WordPlan:
+    """Structural phase of build_glyph: no geometry is computed. Characters outside the board's alphabet are skipped."""
+    letter_to_node_info = board.letter_to_node_info
+    letters = [letter for letter in word.upper() if letter in letter_to_node_info]
+    traces = []
+    node_connection_manager = {}
+    node_ring_counts = {} # Insertion order is first-visit order
+    _current_processing_active_node_name = None
+    _first_node_name_for_this_word = None
+    _subnode_queue_for_current_trace = []
+    _nodes_that_have_been_departed_from = set()
+    used_node_mask = 0
+
+    for i, letter in enumerate(letters):
+        letter_info = letter_to_node_info[letter]
+        target_node_name_for_letter = letter_info['node_name']
+        subnode_info_for_letter = {'letter': letter, 'count': letter_info['subnodes']}
+        used_node_mask |= 1 << board.node_id[target_node_name_for_letter]
+        node_ring_counts.setdefault(target_node_name_for_letter, 0)
+
+        if i == 0:
+            _first_node_name_for_this_word = target_node_name_for_letter
+            _current_processing_active_node_name = target_node_name_for_letter
+            _subnode_queue_for_current_trace.append(subnode_info_for_letter)
+        elif target_node_name_for_letter == _current_processing_active_node_name:
+            _subnode_queue_for_current_trace.append(subnode_info_for_letter)
+        else:
+            from_node_name_for_trace = _current_processing_active_node_name
+            _nodes_that_have_been_departed_from.add(from_node_name_for_trace)
+            traces.append(_plan_trace(board, node_connection_manager, node_ring_counts, _nodes_that_have_been_departed_from,
+                                      from_node_name_for_trace, target_node_name_for_letter, tuple(_subnode_queue_for_current_trace)))
+            _subnode_queue_for_current_trace.clear()
+            _current_processing_active_node_name = target_node_name_for_letter
+            _subnode_queue_for_current_trace.append(subnode_info_for_letter)
+
+    return WordPlan(
+        word=''.join(letters), traces=tuple(traces), node_ring_counts=tuple(node_ring_counts.items()),
+        first_node_name=_first_node_name_for_this_word, active_node_name=_current_processing_active_node_name,
+        subnode_queue=tuple(_subnode_queue_for_current_trace), used_node_mask=used_node_mask,
+        node_connection_manager=node_connection_manager, board=board
+    )
+
+def extend_plan(plan: WordPlan, letter: str) -> WordPlan:
+    """plan_word(plan.word + letter) from `plan`: only the step for the new letter is planned, seeded
+    from the plan's node_connection_manager. The plan itself is left untouched."""
+    board = plan.board
+    letter_info = board.letter_to_node_info.get(letter.upper())
+    if letter_info is None: return plan
+    if not plan.word: return plan_word(letter, board)
+    letter = letter.upper()
+    target_node_name = letter_info['node_name']
+    subnode_info = {'letter': letter, 'count': letter_info['subnodes']}
+    if target_node_name == plan.active_node_name:
+        return replace(plan, word=plan.word + letter, subnode_queue=plan.subnode_queue + (subnode_info,), _glyphs={})
+    node_connection_manager = {face: list(offsets) for face, offsets in plan.node_connection_manager.items()}
+    node_ring_counts = dict(plan.node_ring_counts); node_ring_counts.setdefault(target_node_name, 0)
+    departed = {trace.from_node_name for trace in plan.traces} | {plan.active_node_name}
+    trace = _plan_trace(board, node_connection_manager, node_ring_counts, departed, plan.active_node_name, target_node_name, plan.subnode_queue)
+    return replace(plan, word=plan.word + letter, traces=plan.traces + (trace,), node_ring_counts=tuple(node_ring_counts.items()),
+                   active_node_name=target_node_name, subnode_queue=(subnode_info,),
+                   used_node_mask=plan.used_node_mask | 1 << board.node_id[target_node_name],
+                   node_connection_manager=node_connection_manager, _glyphs={})
+
+def _route_plan(plan: WordPlan, config: GlyphConfig, finalize: bool, quality: str = ROUTE_QUALITY_STANDARD,
+                reuse: 'Glyph | None' = None) -> 'Glyph':
+    """Geometry phase of build_glyph: routes every planned trace and assembles the element list.
+    The traces of `reuse`, a glyph routed with the same config and quality for a prefix of the
+    plan's traces, are kept as they are; each trace is only routed against the ones before it."""
+    board = plan.board
+    glyph_elements = [el for el in reuse.elements if el['type'] == 'trace'] if reuse else []
+    routed_paths = [el['path_points'] for el in glyph_elements]; route_metrics = list(reuse.route_metrics) if reuse else []
+    routes = reuse.routes if reuse else RouteBuffer(); route_spans = list(reuse.route_spans) if reuse else []
+    for trace in plan.traces[len(glyph_elements):]:
+        calculated_path, trace_metrics = route_trace(
+            start_node_name=trace.from_node_name,
+            end_node_name=trace.to_node_name,
+            start_ring_level=trace.connect_from_ring_level,
+            end_ring_level=trace.connect_to_ring_level,
+            all_node_positions=board.positions,
+            node_layout=board,
+            node_radius=config.node_radius,
+            get_ring_radius_method=config.ring_radius,
+            start_offset_idx=trace.start_offset_idx,
+            end_offset_idx=trace.end_offset_idx,
+            existing_paths=routed_paths,
+            quality=quality
+        )
+        routed_paths.append(calculated_path); route_metrics.append(trace_metrics); route_spans.append(routes.append(calculated_path))
+        glyph_elements.append({
+            'type': 'trace',
+            'from_node_name': trace.from_node_name,
+            'to_node_name': trace.to_node_name,
+            'subnodes_on_trace': list(trace.subnodes),
+            'connect_from_ring_level': trace.connect_from_ring_level,
+            'connect_to_ring_level': trace.connect_to_ring_level, # Store effective level
+            'path_points': calculated_path,
+            'start_offset_idx': trace.start_offset_idx,
+            'end_offset_idx': trace.end_offset_idx
+        })
+
+    for node_name, ring_count in plan.node_ring_counts:
+        glyph_elements.append({
+            'type': 'node', 'name': node_name, 'coords': board.positions[node_name],
+            'is_active': node_name == plan.active_node_name, 'ring_count': ring_count
+        })
+
+    glyph = Glyph(
+        word=plan.word, elements=tuple(glyph_elements),
+        active_node_name=plan.active_node_name, first_node_name=plan.first_node_name,
+        subnode_queue=plan.subnode_queue, used_node_mask=plan.used_node_mask,
+        node_connection_manager=plan.node_connection_manager, route_metrics=tuple(route_metrics), board=board,
+        routes=routes, route_spans=tuple(route_spans)
+    )
+    return finalize_glyph(glyph) if finalize else glyph
+
+def extend_glyph(plan: WordPlan, glyph: Glyph, letter: str, config: GlyphConfig = DEFAULT_GLYPH_CONFIG,
+                 quality: str = ROUTE_QUALITY_STANDARD) -> tuple[WordPlan, Glyph]:
+    """Adds one letter to an unfinalized glyph built from `plan` with the same config and quality.
+    Only the trace to the new letter's node is planned and routed. Returns the new (plan, glyph),
+    equal to plan_word/build_glyph of the longer word; both inputs are left untouched."""
+    extended = extend_plan(plan, letter)
+    if extended is plan: return plan, glyph
+    extended_glyph = extended._glyphs[(config, False, quality)] = _route_plan(extended, config, False, quality, reuse=glyph)
+    return extended, extended_glyph
+
+def build_glyph(word: str, config: GlyphConfig = DEFAULT_GLYPH_CONFIG, finalize: bool = True, quality: str = ROUTE_QUALITY_STANDARD) -> Glyph:
+    """Builds the glyph for `word` with traces routed at `quality` (see trace_router). Characters outside the alphabet are skipped."""
+    return _route_plan(plan_word(word, config.board), config, finalize, quality)
+
+
+def finalize_glyph(glyph: Glyph) -> Glyph:
+    """Adds the ground trace, charge/ground indicators and null modifier. Returns a new Glyph."""
+    if not glyph.word or glyph.is_finalized: return glyph
+
+    glyph_elements = [dict(el, is_active=False) if el['type'] == 'node' else el for el in glyph.elements]
+    active_node_for_ground_trace = glyph.active_node_name
+    if glyph.subnode_queue and active_node_for_ground_trace:
+        active_node_final_data = next((n for n in glyph_elements if n['type']=='node' and n['name'] == active_node_for_ground_trace), None)
+        origin_ring_level_for_ground_trace = active_node_final_data.get('ring_count', 0) if active_node_final_data else 0
+        
+        glyph_elements.append({
+            'type': 'trace_to_ground',
+            'from_node_name': active_node_for_ground_trace,
+            'subnodes_on_trace': list(glyph.subnode_queue),
+            'connect_from_ring_level': origin_ring_level_for_ground_trace
+        }) 
+
+    if active_node_for_ground_trace: 
+        glyph_elements.append({'type': 'ground_indicator', 'node_name': active_node_for_ground_trace })
+    
+    if glyph.first_node_name: 
+        glyph_elements.append({'type': 'charge_indicator', 'node_name': glyph.first_node_name})
+    
+    placement_node_name = glyph.board.null_modifier_node(glyph.used_node_mask)
+    if placement_node_name is not None:
+        glyph_elements.append({
+            'type': 'null_modifier',
+            'node_name': placement_node_name,
+            'coords': glyph.board.positions[placement_node_name]
+        })
+
+    return Glyph(
+        word=glyph.word, elements=tuple(glyph_elements),
+        active_node_name=None, first_node_name=glyph.first_node_name, subnode_queue=(),
+        used_node_mask=glyph.used_node_mask, is_finalized=True, node_connection_manager=glyph.node_connection_manager,
+        route_metrics=glyph.route_metrics, board=glyph.board, routes=glyph.routes, route_spans=glyph.route_spans
+    )
+
+
+def iter_refined_glyphs(glyph: Glyph, config: GlyphConfig = DEFAULT_GLYPH_CONFIG):
+    """Anytime rip-up-and-reroute of a glyph's traces. Each trace in turn is rerouted over the refined
+    candidate set against every other trace (not just the earlier ones); a new Glyph is yielded whenever
+    one gets cheaper, until a full pass changes nothing. Every change lowers the glyph's total cost, so
+    whatever was yielded last is the best route so far and is always a complete, valid glyph."""
+    trace_indices = [i for i, el in enumerate(glyph.elements) if el['type'] == 'trace']
+    if not trace_indices: return
+    board = glyph.board
+    elements = list(glyph.elements)
+    paths = [elements[i]['path_points'] for i in trace_indices]
+    spans = list(glyph.route_spans) if len(glyph.route_spans) == len(trace_indices) else [glyph.routes.append(path) for path in paths]
+    # How each trace's current path was chosen; starts out as whatever built the glyph
+    choices = [{'candidates': m.get('candidates', 1), 'chosen': m.get('chosen', 0), 'quality': m.get('quality', ROUTE_QUALITY_STANDARD)}
+               for m in glyph.route_metrics] if len(glyph.route_metrics) == len(trace_indices) else \
+              [{'candidates': 1, 'chosen': 0, 'quality': ROUTE_QUALITY_STANDARD}] * len(trace_indices)
+    candidate_lists = {}
+    metrics_stale = False # Searched traces whose metrics have not been yielded yet
+    improved = True
+    while improved:
+        improved = False
+        for k, element_index in enumerate(trace_indices):
+            trace = elements[element_index]
+            if k not in candidate_lists:
+                candidate_lists[k] = refined_route_candidates(
+                    trace['from_node_name'], trace['to_node_name'], trace['connect_from_ring_level'], trace['connect_to_ring_level'],
+                    board.positions, board, config.node_radius, config.ring_radius, trace['start_offset_idx'], trace['end_offset_idx'])
+            candidates = candidate_lists[k]
+            if len(candidates[0]) < 2: continue
+            if paths[k] not in candidates: candidates = candidates + [paths[k]]
+            current = candidates.index(paths[k])
+            costs, _ = score_route_candidates(candidates, board.corridor(trace['from_node_name'], trace['to_node_name']), config.node_radius, paths[:k] + paths[k + 1:])
+            best = int(np.argmin(costs))
+            choices[k] = {'candidates': len(candidates), 'chosen': best, 'quality': ROUTE_QUALITY_REFINED}
+            if costs[best] >= costs[current] - 1e-9:
+                choices[k]['chosen'] = current; metrics_stale = True; continue
+            paths[k] = candidates[best]; spans[k] = glyph.routes.append(paths[k])
+            elements[element_index] = dict(trace, path_points=paths[k])
+            improved = True; metrics_stale = False
+            yield replace(glyph, elements=tuple(elements), route_spans=tuple(spans),
+                          route_metrics=_rescored_route_metrics(elements, trace_indices, paths, choices, config, board))
+    if metrics_stale: # Same paths, but now scored at the refined level
+        yield replace(glyph, elements=tuple(elements), route_spans=tuple(spans),
+                      route_metrics=_rescored_route_metrics(elements, trace_indices, paths, choices, config, board))
+
+def _rescored_route_metrics(elements, trace_indices, paths, choices, config: GlyphConfig, board: Board) -> tuple:
+    """route_trace-style metrics for the current paths, crossings counted against earlier traces only as in build_glyph."""
+    route_metrics = []
+    for k, element_index in enumerate(trace_indices):
+        trace = elements[element_index]
+        _, metrics = pick_route([paths[k]], board.corridor(trace['from_node_name'], trace['to_node_name']), config.node_radius, paths[:k])
+        route_metrics.append(dict(metrics, **choices[k]))
+    return tuple(route_metrics)
+
+def refine_glyph(glyph: Glyph, config: GlyphConfig = DEFAULT_GLYPH_CONFIG, time_budget_s: float = REFINE_TIME_BUDGET_S) -> Glyph:
+    """The best refinement of `glyph` found within time_budget_s (the glyph itself if none was)."""
+    deadline = time.perf_counter() + time_budget_s
+    for refined in iter_refined_glyphs(glyph, config):
+        glyph = refined
+        if time.perf_counter() >= deadline: break
+    return glyph
+
 
 class KohdGlyphBuilder:
-    def __init__(self, node_radius: float, get_ring_radius_method: callable): 
+    """Stateful letter-by-letter front end over extend_glyph, used by the GUI. Given a letter_model,
+    speculate_step() prebuilds the most likely next letters in idle time; add_letter() then takes a
+    prebuilt state when the guess was right, and any change of state simply drops the guesses."""
+    def __init__(self, node_radius: float | None = None, get_ring_radius_method: callable = None, config: GlyphConfig | None = None,
+                 typing_quality: str = ROUTE_QUALITY_STANDARD, letter_model: LetterBigramModel | None = None,
+                 speculation_max_letters: int = SPECULATION_MAX_LETTERS):
+        if config is None:
+            if get_ring_radius_method is not None:
+                config = GlyphConfig.from_ring_radius_method(node_radius if node_radius is not None else DEFAULT_GLYPH_CONFIG.node_radius, get_ring_radius_method)
+            elif node_radius is not None:
+                config = GlyphConfig(node_radius=node_radius)
+            else:
+                config = DEFAULT_GLYPH_CONFIG
+        self.config = config
+        self.typing_quality = typing_quality # Route quality used while letters are being added
+        self.letter_model = letter_model
+        self.speculation_max_letters = speculation_max_letters
+        self.speculation_stats = {'prebuilt': 0, 'hits': 0, 'misses': 0}
         self.rules = {
-            'letter_to_node_info': LETTER_TO_NODE_INFO,
-            'node_positions': NODE_POSITIONS,
-            'node_layout': NODE_LAYOUT,
+            'letter_to_node_info': config.board.letter_to_node_info,
+            'node_positions': config.board.positions,
+            'node_layout': config.board.layout,
         }
-        self.node_name_to_row_col = {
-            name: (r, c)
-            for r, row_list in enumerate(self.rules['node_layout'])
-            for c, name in enumerate(row_list)
-        }
-        self.preferred_corner_nodes_for_null_modifier = [
-            self.rules['node_layout'][0][2], 
-            self.rules['node_layout'][2][2], 
-            self.rules['node_layout'][2][0], 
-            self.rules['node_layout'][0][0]  
-        ]
-        
-        self.node_radius_for_router = node_radius
-        self.get_ring_radius_method_for_router = get_ring_radius_method
-        
-        self.node_connection_manager = {} 
         self.reset()
 
     def reset(self):
         self.current_word_string = ""
-        self.active_node_name = None
-        self.first_node_name = None
-        self.subnode_queue = []
-        self.glyph_elements = []
-        self.is_finalized = False
-        self.current_word_used_node_names = set()
-        self.node_connection_manager.clear() 
-
-    def _get_or_create_node_element_data(self, node_name, node_elements_data_map):
-        if node_name not in node_elements_data_map:
-            node_elements_data_map[node_name] = {
-                'type': 'node', 'name': node_name,
-                'coords': self.rules['node_positions'][node_name],
-                'is_active': False, 'ring_count': 0 
-            }
-        return node_elements_data_map[node_name]
-
-    def _determine_connection_face(self, from_node_coords: tuple[float, float], to_node_coords: tuple[float, float]) -> str:
-        dx = to_node_coords[0] - from_node_coords[0]
-        dy = to_node_coords[1] - from_node_coords[1] 
-
-        if abs(dx) < 1e-6 and abs(dy) < 1e-6: 
-            return 'E' 
-
-        if abs(dx) >= abs(dy): 
-            return 'E' if dx > 0 else 'W'
-        else:  
-            return 'S' if dy > 0 else 'N'
-
-    def _get_next_offset_idx(self, node_name: str, face_key: str) -> int:
-        node_face_tuple = (node_name, face_key)
-
-        if node_face_tuple not in self.node_connection_manager:
-            self.node_connection_manager[node_face_tuple] = []
-        
-        used_indices_for_face = self.node_connection_manager[node_face_tuple]
-        
-        offset_idx_to_try = 0
-        if 0 not in used_indices_for_face:
-            offset_idx_to_try = 0
-        else:
-            i = 1
-            max_offset_magnitude = 5 
-            found = False
-            while i <= max_offset_magnitude:
-                if i not in used_indices_for_face:
-                    offset_idx_to_try = i
-                    found = True; break
-                if -i not in used_indices_for_face:
-                    offset_idx_to_try = -i
-                    found = True; break
-                i += 1
-            if not found: 
-                offset_idx_to_try = i 
-                while offset_idx_to_try in used_indices_for_face:
-                    offset_idx_to_try +=1
-        
-        used_indices_for_face.append(offset_idx_to_try)
-        return offset_idx_to_try
-
-    def _rebuild_glyph_elements_for_string(self):
-        self.glyph_elements = []
-        self.node_connection_manager.clear() 
-        
-        current_node_data_map = {}
-        _current_processing_active_node_name = None
-        _first_node_name_for_this_word = None
-        _subnode_queue_for_current_trace = []
-        _nodes_that_have_been_departed_from = set()
-
-        self.current_word_used_node_names.clear()
-        if not self.current_word_string:
-            self.active_node_name = None; self.first_node_name = None; self.subnode_queue = []
-            return
-
-        for char_code_init_pass in self.current_word_string:
-            letter_init_pass = char_code_init_pass.upper()
-            if letter_init_pass in self.rules['letter_to_node_info']:
-                self.current_word_used_node_names.add(self.rules['letter_to_node_info'][letter_init_pass]['node_name'])
-
-        for i, char_code in enumerate(self.current_word_string):
-            letter = char_code.upper()
-            if letter not in self.rules['letter_to_node_info']: continue
-
-            letter_info = self.rules['letter_to_node_info'][letter]
-            target_node_name_for_letter = letter_info['node_name']
-            subnode_info_for_letter = {'letter': letter, 'count': letter_info['subnodes']}
-
-            # Ensure target_node_data is fetched/created before reading its ring_count
-            target_node_data = self._get_or_create_node_element_data(target_node_name_for_letter, current_node_data_map)
-
-
-            if i == 0:
-                _first_node_name_for_this_word = target_node_name_for_letter
-                _current_processing_active_node_name = target_node_name_for_letter
-                _subnode_queue_for_current_trace.append(subnode_info_for_letter)
-            else:
-                if target_node_name_for_letter == _current_processing_active_node_name:
-                    _subnode_queue_for_current_trace.append(subnode_info_for_letter)
-                else:
-                    from_node_name_for_trace = _current_processing_active_node_name
-                    from_node_data = current_node_data_map[from_node_name_for_trace] # Should exist
-
-                    _nodes_that_have_been_departed_from.add(from_node_name_for_trace)
-                    is_return_to_target_node = target_node_name_for_letter in _nodes_that_have_been_departed_from
-                    
-                    # Determine connection ring levels
-                    origin_connect_ring_level = from_node_data.get('ring_count', 0)
-                    current_rings_on_target_node = target_node_data.get('ring_count', 0)
-
-                    effective_target_connect_ring_level: int
-                    if is_return_to_target_node:
-                        # This trace connects to the next conceptual ring layer.
-                        # If target has 0 existing rings (base), this return uses ring_level 1.
-                        # If target has 1 existing ring, this return uses ring_level 2.
-                        effective_target_connect_ring_level = current_rings_on_target_node + 1
-                    else:
-                        # Not a return, connect to its current highest established ring level (or base if 0).
-                        effective_target_connect_ring_level = current_rings_on_target_node
-                    
-                    from_node_coords = self.rules['node_positions'][from_node_name_for_trace]
-                    to_node_coords = self.rules['node_positions'][target_node_name_for_letter]
-
-                    exit_face = self._determine_connection_face(from_node_coords, to_node_coords)
-                    entry_face = self._determine_connection_face(to_node_coords, from_node_coords)
-
-                    start_offset_idx = self._get_next_offset_idx(from_node_name_for_trace, exit_face)
-                    
-                    dx_trace = to_node_coords[0] - from_node_coords[0]
-                    dy_trace = to_node_coords[1] - from_node_coords[1]
-                    align_tolerance = 0.1 
-
-                    is_h_aligned = abs(dy_trace) < align_tolerance
-                    is_v_aligned = abs(dx_trace) < align_tolerance
-
-                    if is_h_aligned or is_v_aligned:
-                        target_node_face_tuple = (target_node_name_for_letter, entry_face)
-                        used_indices_on_target_face = self.node_connection_manager.get(target_node_face_tuple, [])
-                        is_target_face_virgin_for_this_offset = start_offset_idx not in used_indices_on_target_face
-                        
-                        if not used_indices_on_target_face: # If face is completely unused yet
-                             end_offset_idx = start_offset_idx
-                             self.node_connection_manager.setdefault(target_node_face_tuple, []).append(end_offset_idx)
-                        elif is_target_face_virgin_for_this_offset: # Face used, but particular start_offset_idx is free
-                            end_offset_idx = start_offset_idx
-                            self.node_connection_manager.setdefault(target_node_face_tuple, []).append(end_offset_idx)
-                        else: # start_offset_idx is already taken on target face
-                            end_offset_idx = self._get_next_offset_idx(target_node_name_for_letter, entry_face)
-                    else: 
-                        end_offset_idx = self._get_next_offset_idx(target_node_name_for_letter, entry_face)
-                        
-                    calculated_path = calculate_trace_path(
-                        start_node_name=from_node_name_for_trace,
-                        end_node_name=target_node_name_for_letter,
-                        start_ring_level=origin_connect_ring_level,
-                        end_ring_level=effective_target_connect_ring_level, # USE THE NEWLY DETERMINED LEVEL
-                        all_node_positions=self.rules['node_positions'],
-                        node_layout=self.rules['node_layout'],
-                        node_radius=self.node_radius_for_router, 
-                        get_ring_radius_method=self.get_ring_radius_method_for_router,
-                        start_offset_idx=start_offset_idx,
-                        end_offset_idx=end_offset_idx
-                    )
-
-                    self.glyph_elements.append({
-                        'type': 'trace',
-                        'from_node_name': from_node_name_for_trace,
-                        'to_node_name': target_node_name_for_letter,
-                        'subnodes_on_trace': list(_subnode_queue_for_current_trace),
-                        'connect_from_ring_level': origin_connect_ring_level,
-                        'connect_to_ring_level': effective_target_connect_ring_level, # Store effective level
-                        'path_points': calculated_path,
-                        'start_offset_idx': start_offset_idx, 
-                        'end_offset_idx': end_offset_idx    
-                    })
-                    _subnode_queue_for_current_trace.clear()
-
-                    # Update the target node's actual ring_count if this trace connected to a new, higher ring level
-                    if is_return_to_target_node:
-                        if effective_target_connect_ring_level > current_rings_on_target_node:
-                             target_node_data['ring_count'] = effective_target_connect_ring_level
-
-
-                    _current_processing_active_node_name = target_node_name_for_letter
-                    _subnode_queue_for_current_trace.append(subnode_info_for_letter)
-
-        self.active_node_name = _current_processing_active_node_name
-        self.first_node_name = _first_node_name_for_this_word
-        self.subnode_queue = list(_subnode_queue_for_current_trace)
-
-        for node_name, data in current_node_data_map.items():
-            data['is_active'] = (node_name == self.active_node_name and not self.is_finalized)
-            existing_el = next((el for el in self.glyph_elements if el['type'] == 'node' and el['name'] == node_name), None)
-            if not existing_el: self.glyph_elements.append(data)
-            else: existing_el.update(data)
+        self._refinement = None
+        self.plan = plan_word("", self.config.board)
+        self._typing_glyph = Glyph(word="", board=self.config.board) # Latest unfinalized glyph, extended by add_letter
+        self._set_glyph(self._typing_glyph)
+        self._restart_speculation()
+
+    def _set_glyph(self, glyph: Glyph):
+        self.glyph = glyph
+        self.glyph_elements = list(glyph.elements)
+        self.active_node_name = glyph.active_node_name
+        self.first_node_name = glyph.first_node_name
+        self.subnode_queue = list(glyph.subnode_queue)
+        self.is_finalized = glyph.is_finalized
+        self.current_word_used_node_mask = glyph.used_node_mask
+        self.current_word_used_node_names = glyph.used_node_names
+        self.node_connection_manager = glyph.node_connection_manager
 
     def add_letter(self, letter: str):
         letter = letter.upper()
         if letter not in self.rules['letter_to_node_info']: return False
-        self.current_word_string += letter; self.is_finalized = False
-        self._rebuild_glyph_elements_for_string(); return True
+        prebuilt = self._prebuilt.get(letter)
+        if self._speculation is not None or self._prebuilt:
+            self.speculation_stats['hits' if prebuilt else 'misses'] += 1
+        self.plan, self._typing_glyph = prebuilt or extend_glyph(self.plan, self._typing_glyph, letter, self.config, self.typing_quality)
+        self.current_word_string += letter
+        self._refinement = None
+        self._set_glyph(self._typing_glyph)
+        self._restart_speculation(); return True
+
+    # --- Speculation ---
+    def _restart_speculation(self):
+        """Drops all prebuilt states (they only apply to the state they were built from) and queues new guesses."""
+        self._prebuilt: dict[str, tuple[WordPlan, Glyph]] = {}
+        self._speculation = None
+        if self.letter_model is not None:
+            previous_letter = self.current_word_string[-1] if self.current_word_string else None
+            self._speculation = iter(self.letter_model.ranked_next(previous_letter)[:self.speculation_max_letters])
+
+    @property
+    def is_speculating(self) -> bool:
+        return self._speculation is not None
+
+    def speculate_step(self, time_budget_s: float = SPECULATE_TIME_BUDGET_S) -> int:
+        """Prebuilds likely next letters for up to time_budget_s (at least one). Returns how many were built."""
+        if self._speculation is None: return 0
+        deadline = time.perf_counter() + time_budget_s
+        built = 0
+        for letter in self._speculation:
+            self._prebuilt[letter] = extend_glyph(self.plan, self._typing_glyph, letter, self.config, self.typing_quality)
+            built += 1
+            if time.perf_counter() >= deadline: break
+        else:
+            self._speculation = None
+        self.speculation_stats['prebuilt'] += built
+        return built
 
     def _should_add_null_modifier(self) -> bool:
-        if not self.current_word_used_node_names or len(self.current_word_used_node_names) == 0:
-            return False
-        if len(self.current_word_used_node_names) >= 9: 
-             return False
-        if len(self.current_word_used_node_names) == 1: 
-            return True
-        min_r, max_r, min_c, max_c = float('inf'), float('-inf'), float('inf'), float('-inf')
-        for node_name in self.current_word_used_node_names:
-            r, c = self.node_name_to_row_col[node_name]
-            min_r, max_r = min(min_r, r), max(max_r, r)
-            min_c, max_c = min(min_c, c), max(max_c, c)
-        rows_spanned = (max_r - min_r + 1)
-        cols_spanned = (max_c - min_c + 1)
-        if rows_spanned < 3 or cols_spanned < 3:
-            if len(self.current_word_used_node_names) == 3: 
-                is_collinear_h = len(set(self.node_name_to_row_col[name][0] for name in self.current_word_used_node_names)) == 1
-                is_collinear_v = len(set(self.node_name_to_row_col[name][1] for name in self.current_word_used_node_names)) == 1
-                if is_collinear_h or is_collinear_v: 
-                    return True
-
-                is_main_diag = all(self.node_name_to_row_col[name][0] == self.node_name_to_row_col[name][1] for name in self.current_word_used_node_names)
-                is_anti_diag = all(self.node_name_to_row_col[name][0] + self.node_name_to_row_col[name][1] == 2 for name in self.current_word_used_node_names)
-                
-                if is_main_diag or is_anti_diag:
-                    return False 
-            return True 
-        return False
-
+        return self.config.board.null_modifier_needed(self.current_word_used_node_mask)
 
     def _find_null_modifier_placement_node(self) -> str | None:
-        if not self.current_word_used_node_names:
-             pass 
-
-        min_r_used, max_r_used, min_c_used, max_c_used = 0, 2, 0, 2 
-        if self.current_word_used_node_names:
-            min_r_used = min(self.node_name_to_row_col[n][0] for n in self.current_word_used_node_names)
-            max_r_used = max(self.node_name_to_row_col[n][0] for n in self.current_word_used_node_names)
-            min_c_used = min(self.node_name_to_row_col[n][1] for n in self.current_word_used_node_names)
-            max_c_used = max(self.node_name_to_row_col[n][1] for n in self.current_word_used_node_names)
-        
-        preferred_grid_corners = [
-            (2, 2, self.rules['node_layout'][2][2]), (2, 0, self.rules['node_layout'][2][0]),
-            (0, 2, self.rules['node_layout'][0][2]), (0, 0, self.rules['node_layout'][0][0])
-        ]
-
-        for r_corn, c_corn, node_name_corn in preferred_grid_corners:
-            is_outside_bbox = not (min_r_used <= r_corn <= max_r_used and \
-                                   min_c_used <= c_corn <= max_c_used)
-            if node_name_corn not in self.current_word_used_node_names and is_outside_bbox:
-                return node_name_corn
-        
-        for _, _, node_name_corn in preferred_grid_corners:
-            if node_name_corn not in self.current_word_used_node_names:
-                return node_name_corn
-        return None
+        return self.config.board.null_modifier_node(self.current_word_used_node_mask)
 
     def finalize_word(self):
         if not self.current_word_string or self.is_finalized: return
-        
-        active_node_for_ground_trace = self.active_node_name
-        if self.subnode_queue and active_node_for_ground_trace:
-            active_node_final_data = next((n for n in self.glyph_elements if n['type']=='node' and n['name'] == active_node_for_ground_trace), None)
-            origin_ring_level_for_ground_trace = active_node_final_data.get('ring_count', 0) if active_node_final_data else 0
-            
-            self.glyph_elements.append({
-                'type': 'trace_to_ground',
-                'from_node_name': active_node_for_ground_trace,
-                'subnodes_on_trace': list(self.subnode_queue),
-                'connect_from_ring_level': origin_ring_level_for_ground_trace
-            }) 
-
-        if active_node_for_ground_trace: 
-            self.glyph_elements.append({'type': 'ground_indicator', 'node_name': active_node_for_ground_trace })
-        
-        if self.first_node_name: 
-            self.glyph_elements.append({'type': 'charge_indicator', 'node_name': self.first_node_name})
-        
-        if self._should_add_null_modifier():
-            placement_node_name = self._find_null_modifier_placement_node()
-            if placement_node_name and placement_node_name in self.rules['node_positions']:
-                self.glyph_elements.append({
-                    'type': 'null_modifier',
-                    'node_name': placement_node_name,
-                    'coords': self.rules['node_positions'][placement_node_name] 
-                })
-        
-        self.is_finalized = True
-        self.active_node_name = None 
-        self.subnode_queue.clear() 
-        
-        for el in self.glyph_elements:
-            if el.get('type') == 'node':
-                 el['is_active'] = False
-
+        if self.letter_model is not None: self.letter_model.observe(self.current_word_string)
+        self._prebuilt = {}; self._speculation = None
+        self._set_glyph(finalize_glyph(self.glyph))
+        self._refinement = iter_refined_glyphs(self.glyph, self.config) # Advanced by refine_step
+
+    @property
+    def is_refining(self) -> bool:
+        return self._refinement is not None
+
+    def refine_step(self, time_budget_s: float = REFINE_TIME_BUDGET_S) -> bool:
+        """Improves the finalized glyph's routes for up to time_budget_s. Returns whether the glyph changed;
+        is_refining turns False once no further improvement is possible."""
+        if self._refinement is None: return False
+        deadline = time.perf_counter() + time_budget_s
+        refined = None
+        for refined in self._refinement:
+            if time.perf_counter() >= deadline: break
+        else:
+            self._refinement = None
+        if refined is None: return False
+        self._set_glyph(refined); return True
 
     def get_glyph_elements(self):
         return list(self.glyph_elements)
@@ -0,0 +1,401 @@
+# kohd_translator/kohd_core/glyph_layout.py
+#
+# Headless placement of everything drawn for a glyph: node states and rings,
+# trace polylines with their subnode dots, the charge/ground indicators and
+# the null modifier. Everything is in the conceptual coordinate space of
+# the board's node positions (the default Kohd board unless one is passed).
+# The Qt painter and the SVG exporter both draw from this
+# layout, so on-screen and exported glyphs agree. The fixed indicator symbols
+# are SymbolTemplates placed by one rotate+translate, so renderers can cache
+# each symbol once and stamp it instead of rebuilding its points.
+import math
+from dataclasses import dataclass
+
+from .board import Board, DEFAULT_BOARD
+from .kohd_rules import RING_NODE_INSET_FACTOR, SUBNODE_RADIUS
+from .route_buffer import RouteBuffer
+
+MAX_RINGS_TO_DRAW = 2
+PREFERRED_CHARGE_ANGLES_DEG = [180, 225, 135, 270, 90, 315, 45, 0]
+PREFERRED_GROUND_TRACE_ANGLES_DEG = [270, 225, 315, 180, 0, 135, 45, 90]
+MIN_ANGLE_SEPARATION_DEG = 30
+
+# Extent of the conceptual drawing space of the default board
+CONCEPTUAL_SIZE = 300.0
+
+
+class GlyphStyle:
+    """Sizes and pen widths of a rendered glyph, in conceptual units."""
+    def __init__(self, node_radius: float = 20.0):
+        self.node_radius = node_radius; self.font_size = 10; self.trace_pen_width = 1.5
+        self.subnode_dot_radius = float(SUBNODE_RADIUS)
+        self.subnode_trace_start_to_first_dot_center_padding = self.subnode_dot_radius * 4.0
+        self.subnode_intra_group_center_to_center_spacing = self.subnode_dot_radius * 2.5
+        self.subnode_inter_group_center_to_center_spacing = self.subnode_dot_radius * 4.0
+        self.node_outline_pen_width = 2.0; self.ring_pen_width = 1.5; self.indicator_symbol_base_size = self.node_radius * 0.5
+        if MAX_RINGS_TO_DRAW >= 2: self.null_modifier_pointer_line_radius = self.ring_radius(2)
+        elif MAX_RINGS_TO_DRAW == 1: self.null_modifier_pointer_line_radius = self.ring_radius(1)
+        else: self.null_modifier_pointer_line_radius = self.subnode_dot_radius * 1.5
+
+    def ring_radius(self, ring_level: int) -> float:
+        if ring_level == 0: return self.node_radius
+        elif ring_level > 0: actual_ring_to_calc = min(ring_level, MAX_RINGS_TO_DRAW); inset_factor = RING_NODE_INSET_FACTOR - ((actual_ring_to_calc - 1) * 0.25); return self.node_radius * max(0.1, inset_factor)
+        return self.node_radius
+
+    def subnode_start_padding(self, trace_origin_ring_level: int) -> float:
+        """Distance from a trace's start to its first subnode dot, clearing the origin's rings."""
+        effective_start_padding = self.subnode_trace_start_to_first_dot_center_padding
+        if trace_origin_ring_level > 0:
+            radius_of_origin_ring = self.ring_radius(trace_origin_ring_level)
+            min_padding_to_clear = (self.node_radius - radius_of_origin_ring) + self.subnode_dot_radius
+            effective_start_padding = max(self.subnode_trace_start_to_first_dot_center_padding, (min_padding_to_clear if min_padding_to_clear > 0 else 0) + self.subnode_dot_radius * 0.5)
+        return effective_start_padding
+
+
+def _line_angle_deg(p1: tuple[float, float], p2: tuple[float, float]) -> float:
+    """Counter-clockwise angle of p1->p2 with y pointing down, as QLineF.angle() reports it."""
+    theta = math.degrees(math.atan2(-(p2[1] - p1[1]), p2[0] - p1[0]))
+    theta = theta + 360 if theta < 0 else theta
+    return 0.0 if abs(theta - 360) < 1e-12 else theta
+
+def _point_at_angle(center: tuple[float, float], radius: float, angle_deg: float) -> tuple[float, float]:
+    rad_angle = math.radians(angle_deg)
+    return (center[0] + radius * math.cos(rad_angle), center[1] - radius * math.sin(rad_angle))
+
+def _connection_point(line_origin_center, line_target_center, connection_node_center, radius_to_connect: float) -> tuple[float, float]:
+    other_end_of_line = line_target_center if connection_node_center == line_origin_center else line_origin_center
+    vec_x = other_end_of_line[0] - connection_node_center[0]; vec_y = other_end_of_line[1] - connection_node_center[1]
+    if vec_x == 0 and vec_y == 0:
+        if line_origin_center == line_target_center and connection_node_center == line_origin_center: return (connection_node_center[0], connection_node_center[1] + radius_to_connect)
+        return connection_node_center
+    line_length = math.hypot(vec_x, vec_y)
+    if line_length < 1e-3 or line_length < radius_to_connect + 1e-3: return connection_node_center
+    return (connection_node_center[0] + vec_x / line_length * radius_to_connect, connection_node_center[1] + vec_y / line_length * radius_to_connect)
+
+def find_clear_angle_deg(existing_angles_deg: list, preferred_angles_deg: list, min_separation_deg: float) -> float:
+    for pref_angle in preferred_angles_deg:
+        is_clear = True
+        for exist_angle in existing_angles_deg:
+            diff = abs(pref_angle - exist_angle); angle_diff = min(diff, 360 - diff)
+            if angle_diff < min_separation_deg: is_clear = False; break
+        if is_clear: return pref_angle
+    return preferred_angles_deg[0]
+
+
+def subnode_dot_positions(path_points: list[tuple[float, float]], subnode_groups: list, trace_origin_ring_level: int, style: GlyphStyle) -> list[tuple[float, float]]:
+    """Centers of the subnode dots placed sequentially along a polyline."""
+    dot_positions = []
+    if not subnode_groups or not path_points or len(path_points) < 2:
+        return dot_positions
+
+    segment_lengths = [math.hypot(path_points[i + 1][0] - path_points[i][0], path_points[i + 1][1] - path_points[i][1]) for i in range(len(path_points) - 1)]
+    total_path_length = sum(segment_lengths)
+    if total_path_length < 1.0:
+        return dot_positions
+
+    current_distance_along_total_path = style.subnode_start_padding(trace_origin_ring_level)
+    for group_idx, group_info in enumerate(subnode_groups):
+        num_dots_in_group = group_info['count']
+        if num_dots_in_group == 0:
+            continue
+
+        for dot_idx in range(num_dots_in_group):
+            if current_distance_along_total_path + style.subnode_dot_radius > total_path_length + 1e-6:
+                return dot_positions # Not enough space for remaining dots
+
+            # Find which segment this dot falls on
+            cumulative_dist_at_segment_start = 0
+            dot_pos = None
+            for i, seg_len in enumerate(segment_lengths):
+                if current_distance_along_total_path <= cumulative_dist_at_segment_start + seg_len:
+                    seg_start, seg_end = path_points[i], path_points[i + 1]
+                    if seg_len > 0:
+                        t = (current_distance_along_total_path - cumulative_dist_at_segment_start) / seg_len
+                        dot_pos = (seg_start[0] + (seg_end[0] - seg_start[0]) * t, seg_start[1] + (seg_end[1] - seg_start[1]) * t)
+                    else: # Segment has zero length, place at start of segment
+                        dot_pos = seg_start
+                    break
+                cumulative_dist_at_segment_start += seg_len
+
+            if dot_pos is None:
+                return dot_positions
+            dot_positions.append(dot_pos)
+
+            if dot_idx < num_dots_in_group - 1:
+                current_distance_along_total_path += style.subnode_intra_group_center_to_center_spacing
+
+        if group_idx < len(subnode_groups) - 1:
+            current_distance_along_total_path += style.subnode_inter_group_center_to_center_spacing
+    return dot_positions
+
+
+@dataclass(frozen=True)
+class SymbolTemplate:
+    """A fixed symbol in its own frame: anchor at the origin, pointing along +x (y down).
+    Placing it is one rotate+translate, so renderers can cache it once per style and stamp it."""
+    strokes: tuple = () # Open polylines, stroked
+    fills: tuple = ()   # Polylines drawn closed and filled
+
+def _charge_template(style: GlyphStyle) -> SymbolTemplate:
+    """Lead line and zigzag, anchored at the charged node's center."""
+    lead_start = style.ring_radius(0); zigzag_start = lead_start + style.indicator_symbol_base_size * 0.5
+    zigzag_height = style.indicator_symbol_base_size; zigzag_width_total = style.indicator_symbol_base_size * 1.5; num_zig_points = 7 # Must be odd for symmetry if centered
+    zigzag_points = [(zigzag_start, 0.0)]
+    for i in range(1, num_zig_points):
+        # Alternating +- offsets either side of the center line
+        zigzag_points.append((zigzag_start + (i / (num_zig_points - 1)) * zigzag_width_total, (zigzag_height / 2) * ((i % 2) * 2 - 1)))
+    return SymbolTemplate(strokes=(((lead_start, 0.0), (zigzag_start, 0.0)),), fills=(tuple(zigzag_points),))
+
+def _ground_template(style: GlyphStyle) -> SymbolTemplate:
+    """Two-part ground symbol, anchored at the end of the ground trace."""
+    bar_width = style.indicator_symbol_base_size
+    leg_len = bar_width * 0.4 # Legs of the first part go "backwards" along the ground trace
+    gap = style.indicator_symbol_base_size * 0.3 # Gap between two parts of symbol
+    small_bar_w = bar_width * 0.7; small_leg_h = bar_width * 0.3 # Legs of the second part go "forwards"
+    mid_line_len = small_leg_h * 1.4 # Small middle line for second symbol part
+    p1 = (0.0, -bar_width / 2); p2 = (0.0, bar_width / 2)
+    sp1 = (gap, -small_bar_w / 2); sp2 = (gap, small_bar_w / 2)
+    return SymbolTemplate(strokes=(
+        (p1, p2),
+        (p1, (-leg_len, p1[1])), (p2, (-leg_len, p2[1])),
+        (sp1, (gap + small_leg_h, sp1[1])), (sp2, (gap + small_leg_h, sp2[1])),
+        ((gap - mid_line_len / 2, 0.0), (gap + mid_line_len / 2, 0.0)),
+    ))
+
+def _null_modifier_cross_template(style: GlyphStyle) -> SymbolTemplate:
+    offset = style.node_radius * 0.6
+    return SymbolTemplate(strokes=(((-offset, -offset), (offset, offset)), ((-offset, offset), (offset, -offset))))
+
+SYMBOL_TEMPLATE_BUILDERS = {'charge': _charge_template, 'ground': _ground_template, 'null_modifier_cross': _null_modifier_cross_template}
+_symbol_template_cache: dict[tuple, dict[str, SymbolTemplate]] = {}
+
+def symbol_templates(style: GlyphStyle) -> dict[str, SymbolTemplate]:
+    """The indicator symbols for `style`, built once per set of symbol sizes."""
+    key = (style.node_radius, style.ring_radius(0), style.indicator_symbol_base_size)
+    templates = _symbol_template_cache.get(key)
+    if templates is None:
+        templates = _symbol_template_cache[key] = {name: build(style) for name, build in SYMBOL_TEMPLATE_BUILDERS.items()}
+    return templates
+
+def place_points(points, anchor, angle_deg: float = 0.0) -> list[tuple[float, float]]:
+    """Maps template points into conceptual space: rotate by angle_deg (counter-clockwise, y down), then move to anchor."""
+    ax, ay = anchor
+    if not angle_deg: return [(ax + x, ay + y) for x, y in points]
+    rad_angle = math.radians(angle_deg); cos_a = math.cos(rad_angle); sin_a = math.sin(rad_angle)
+    return [(ax + x * cos_a + y * sin_a, ay - x * sin_a + y * cos_a) for x, y in points]
+
+
+def _charge_indicator_geometry(node_center, angle_deg: float, style: GlyphStyle) -> dict:
+    template = symbol_templates(style)['charge']
+    lead_line = place_points(template.strokes[0], node_center, angle_deg)
+    return {'anchor': node_center, 'lead_line': tuple(lead_line), 'zigzag_points': place_points(template.fills[0], node_center, angle_deg)}
+
+def _ground_indicator_segments(attach_point, angle_deg: float, style: GlyphStyle) -> list:
+    """Line segments of the two-part ground symbol at the end of the ground trace."""
+    return [tuple(place_points(stroke, attach_point, angle_deg)) for stroke in symbol_templates(style)['ground'].strokes]
+
+def _null_modifier_geometry(mod_center, pointer_target_center, style: GlyphStyle) -> dict:
+    cx, cy = mod_center
+    geometry = {
+        'center': mod_center,
+        'cross_lines': [tuple(place_points(stroke, mod_center)) for stroke in symbol_templates(style)['null_modifier_cross'].strokes],
+        'pointer_line': None, 'pointer_circle_center': None,
+    }
+    if pointer_target_center is None or mod_center == pointer_target_center:
+        return geometry
+    pointer_start = _connection_point(mod_center, pointer_target_center, mod_center, style.ring_radius(0)) # Starts on circumference of modifier node
+    dist_mod_to_target = math.hypot(pointer_target_center[0] - cx, pointer_target_center[1] - cy)
+    if dist_mod_to_target <= 1e-3:
+        return geometry
+    # Center of the small circle at the end of the pointer, 40% of the way to the target
+    pointer_end_center = (cx + (pointer_target_center[0] - cx) * 0.40, cy + (pointer_target_center[1] - cy) * 0.40)
+    len_to_small_center = math.hypot(pointer_end_center[0] - pointer_start[0], pointer_end_center[1] - pointer_start[1])
+    visual_line_end = pointer_end_center
+    if len_to_small_center > style.null_modifier_pointer_line_radius: # Ensure line doesn't go past small circle's edge
+        ratio = (len_to_small_center - style.null_modifier_pointer_line_radius) / len_to_small_center
+        visual_line_end = (pointer_start[0] + (pointer_end_center[0] - pointer_start[0]) * ratio, pointer_start[1] + (pointer_end_center[1] - pointer_start[1]) * ratio)
+    if math.hypot(visual_line_end[0] - pointer_start[0], visual_line_end[1] - pointer_start[1]) > 1e-2:
+        geometry['pointer_line'] = (pointer_start, visual_line_end)
+    geometry['pointer_circle_center'] = pointer_end_center
+    return geometry
+
+
+def _path_end_angles(path_points) -> tuple[float | None, float | None]:
+    """Angles at which a polyline leaves its first point and enters its last (None where it is degenerate)."""
+    start_angle = end_angle = None
+    if len(path_points) >= 2:
+        if math.hypot(path_points[1][0] - path_points[0][0], path_points[1][1] - path_points[0][1]) > 1e-3:
+            start_angle = _line_angle_deg(path_points[0], path_points[1])
+        if math.hypot(path_points[-2][0] - path_points[-1][0], path_points[-2][1] - path_points[-1][1]) > 1e-3:
+            end_angle = _line_angle_deg(path_points[-1], path_points[-2])
+    return start_angle, end_angle
+
+def _layout_trace(element: dict, node_positions: dict, routes: RouteBuffer, style: GlyphStyle,
+                  span: tuple[int, int] | None = None) -> tuple[dict, float | None, float | None]:
+    """Layout of one trace element, plus the angles at which it leaves its start node and enters its end node
+    (None where the path is degenerate there). With `span`, the path is already packed there in `routes`."""
+    path_points = element['path_points'] if span is not None else [(p[0], p[1]) for p in element.get('path_points', [])]
+    from_name = element['from_node_name']; to_name = element['to_node_name']
+    if not path_points and from_name in node_positions and to_name in node_positions: # If builder hasn't provided a path, create direct one
+        from_node_center = node_positions[from_name]; to_node_center = node_positions[to_name]
+        path_points = [
+            _connection_point(from_node_center, to_node_center, from_node_center, style.ring_radius(element.get('connect_from_ring_level', 0))),
+            _connection_point(to_node_center, from_node_center, to_node_center, style.ring_radius(element.get('connect_to_ring_level', 0)))
+        ]
+    start_angle, end_angle = _path_end_angles(path_points)
+    trace = {
+        'points': path_points, 'span': span if span is not None else routes.append(path_points),
+        'subnode_dots': subnode_dot_positions(path_points, element.get('subnodes_on_trace', []), element.get('connect_from_ring_level', 0), style)
+    }
+    return trace, start_angle, end_angle
+
+def _layout_charge_indicator(charge_node_name: str, center, existing_angles_deg: list, style: GlyphStyle) -> dict:
+    angle_deg = find_clear_angle_deg(existing_angles_deg, PREFERRED_CHARGE_ANGLES_DEG, MIN_ANGLE_SEPARATION_DEG)
+    return dict(node_name=charge_node_name, angle_deg=angle_deg, **_charge_indicator_geometry(center, angle_deg, style))
+
+def _layout_ground(trace_to_ground_element: dict, center, existing_angles_deg: list, with_indicator: bool,
+                   style: GlyphStyle) -> tuple[dict, dict | None]:
+    """The ground trace leaving the last node at the first clear angle, and the ground indicator at its end.
+    It is a single segment, so unlike the traces it has no span in a RouteBuffer."""
+    chosen_ground_trace_angle_deg = find_clear_angle_deg(existing_angles_deg, PREFERRED_GROUND_TRACE_ANGLES_DEG, MIN_ANGLE_SEPARATION_DEG)
+
+    connect_from_ring_level = trace_to_ground_element.get('connect_from_ring_level', 0); subnodes_list = trace_to_ground_element.get('subnodes_on_trace', [])
+    ground_trace_start = _point_at_angle(center, style.ring_radius(connect_from_ring_level), chosen_ground_trace_angle_deg)
+
+    num_final_dots = sum(item['count'] for item in subnodes_list); required_subnode_span = 0
+    if num_final_dots > 0:
+        required_subnode_span = style.subnode_start_padding(connect_from_ring_level)
+        required_subnode_span += (num_final_dots - 1) * style.subnode_intra_group_center_to_center_spacing if num_final_dots > 1 else 0; required_subnode_span += style.subnode_dot_radius
+        if len(subnodes_list) > 1: required_subnode_span += (len(subnodes_list) - 1) * style.subnode_inter_group_center_to_center_spacing
+
+    min_ground_trace_len = style.indicator_symbol_base_size * 1.5; ground_trace_visual_length = max(min_ground_trace_len, required_subnode_span + style.subnode_dot_radius)
+    ground_trace_end = _point_at_angle(ground_trace_start, ground_trace_visual_length, chosen_ground_trace_angle_deg)
+    ground_path_points = [ground_trace_start, ground_trace_end]
+    ground_trace = {
+        'points': ground_path_points, 'angle_deg': chosen_ground_trace_angle_deg,
+        'subnode_dots': subnode_dot_positions(ground_path_points, subnodes_list, connect_from_ring_level, style)
+    }
+    ground_indicator = None
+    if with_indicator:
+        ground_indicator = {'attach_point': ground_trace_end, 'angle_deg': chosen_ground_trace_angle_deg,
+                            'segments': _ground_indicator_segments(ground_trace_end, chosen_ground_trace_angle_deg, style)}
+    return ground_trace, ground_indicator
+
+def _layout_null_modifier(null_modifier_info: dict, node_positions: dict, board: Board, style: GlyphStyle) -> dict:
+    pointer_target = node_positions.get(board.center_node_name) # The pointer aims at the board's center node
+    mod_center = (float(null_modifier_info['coords'][0]), float(null_modifier_info['coords'][1]))
+    return dict(node_name=null_modifier_info.get('node_name'),
+                **_null_modifier_geometry(mod_center, (float(pointer_target[0]), float(pointer_target[1])) if pointer_target else None, style))
+
+
+def layout_glyph(glyph_elements: list, active_node_name: str = None, is_finalized: bool = False, style: GlyphStyle | None = None,
+                 board: Board = DEFAULT_BOARD, routes: RouteBuffer | None = None, route_spans: tuple = ()) -> dict:
+    """Resolves a builder element list into drawable geometry.
+
+    Returns a dict with 'nodes', 'traces', 'ground_trace', 'charge_indicator',
+    'ground_indicator' and 'null_modifier' entries (the last four may be None).
+    Each trace entry's 'span' indexes its polyline in the 'routes' RouteBuffer:
+    the glyph's own when `routes` and `route_spans` (Glyph.routes/route_spans,
+    one span per trace element) are passed, else one packed here.
+    """
+    style = style or GlyphStyle()
+    node_positions = board.positions
+    null_modifier_info = next((el for el in glyph_elements if el['type'] == 'null_modifier'), None)
+    null_modifier_node_name = null_modifier_info.get('node_name') if null_modifier_info else None
+
+    nodes = {}
+    for name, coords in node_positions.items():
+        if name == null_modifier_node_name: continue
+        nodes[name] = {'name': name, 'center': (float(coords[0]), float(coords[1])), 'is_active': False, 'ring_count': 0}
+    for el_node_data in glyph_elements:
+        if el_node_data['type'] == 'node' and el_node_data['name'] in nodes:
+            nodes[el_node_data['name']]['is_active'] = el_node_data.get('is_active', False); nodes[el_node_data['name']]['ring_count'] = el_node_data.get('ring_count', 0)
+    if not is_finalized and active_node_name and active_node_name in nodes:
+        for node_info in nodes.values(): node_info['is_active'] = False
+        nodes[active_node_name]['is_active'] = True
+    elif is_finalized:
+        for node_info in nodes.values(): node_info['is_active'] = False
+    for node_info in nodes.values():
+        node_info['ring_radii'] = [style.ring_radius(i + 1) for i in range(min(node_info['ring_count'], MAX_RINGS_TO_DRAW))]
+
+    # Traces, collecting the angles at which they leave/enter each node for indicator placement
+    node_actual_trace_angles = {name: [] for name in node_positions}
+    traces = []
+    trace_elements = [el for el in glyph_elements if el['type'] == 'trace']
+    if routes is None or len(route_spans) != len(trace_elements) or \
+            any(not 0 < end - start == len(el['path_points']) for el, (start, end) in zip(trace_elements, route_spans)):
+        routes = RouteBuffer(); route_spans = (None,) * len(trace_elements) # Not the glyph's own buffer: pack the paths here
+    for element, span in zip(trace_elements, route_spans):
+        trace, start_angle, end_angle = _layout_trace(element, node_positions, routes, style, span)
+        if start_angle is not None and element['from_node_name'] in node_actual_trace_angles: node_actual_trace_angles[element['from_node_name']].append(start_angle)
+        if end_angle is not None and element['to_node_name'] in node_actual_trace_angles: node_actual_trace_angles[element['to_node_name']].append(end_angle)
+        traces.append(trace)
+
+    layout = {'nodes': list(nodes.values()), 'traces': traces, 'routes': routes, 'ground_trace': None,
+              'charge_indicator': None, 'ground_indicator': None, 'null_modifier': None}
+
+    charge_indicator_element = next((el for el in glyph_elements if el['type'] == 'charge_indicator'), None)
+    if charge_indicator_element and charge_indicator_element['node_name'] in nodes:
+        charge_node_name = charge_indicator_element['node_name']
+        layout['charge_indicator'] = _layout_charge_indicator(charge_node_name, nodes[charge_node_name]['center'], node_actual_trace_angles.get(charge_node_name, []), style)
+
+    trace_to_ground_element = next((el for el in glyph_elements if el['type'] == 'trace_to_ground'), None)
+    if trace_to_ground_element and trace_to_ground_element['from_node_name'] in nodes:
+        from_node_name = trace_to_ground_element['from_node_name']; temp_existing_angles = list(node_actual_trace_angles.get(from_node_name, []))
+        if layout['charge_indicator'] and layout['charge_indicator']['node_name'] == from_node_name: temp_existing_angles.append(layout['charge_indicator']['angle_deg'])
+        layout['ground_trace'], layout['ground_indicator'] = _layout_ground(
+            trace_to_ground_element, nodes[from_node_name]['center'], temp_existing_angles,
+            any(el['type'] == 'ground_indicator' for el in glyph_elements), style)
+
+    if null_modifier_info:
+        layout['null_modifier'] = _layout_null_modifier(null_modifier_info, node_positions, board, style)
+    return layout
+
+def _freeze(value):
+    """Hashable copy of nested layout data (lists/dicts become tuples)."""
+    if isinstance(value, dict): return tuple((key, _freeze(item)) for key, item in value.items() if key != 'span')
+    if isinstance(value, (list, tuple)): return tuple(_freeze(item) for item in value)
+    return value
+
+def _item_points(kind: str, item: dict, style: GlyphStyle) -> list[tuple[float, float]]:
+    """Extreme points of one layout item, before pen padding."""
+    if kind == 'node' or kind == 'null_modifier':
+        cx, cy = item['center']; r = style.node_radius
+        points = [(cx - r, cy - r), (cx + r, cy + r)]
+        if kind == 'null_modifier' and item['pointer_circle_center']:
+            px, py = item['pointer_circle_center']; pr = style.null_modifier_pointer_line_radius
+            points += [(px - pr, py - pr), (px + pr, py + pr)]
+        return points
+    if kind == 'trace' or kind == 'ground_trace':
+        dot_r = style.subnode_dot_radius
+        return list(item['points']) + [(x + d, y + d) for x, y in item['subnode_dots'] for d in (-dot_r, dot_r)]
+    if kind == 'charge_indicator':
+        return list(item['lead_line']) + item['zigzag_points']
+    if kind == 'ground_indicator':
+        return [p for segment in item['segments'] for p in segment]
+    return []
+
+def _points_bounds(points, pad: float) -> tuple[float, float, float, float]:
+    xs = [p[0] for p in points]; ys = [p[1] for p in points]
+    return (min(xs) - pad, min(ys) - pad, max(xs) + pad, max(ys) + pad)
+
+def layout_items(layout: dict, style: GlyphStyle | None = None) -> dict[tuple, tuple[float, float, float, float]]:
+    """Maps a content key for every drawn item of the layout to its bounds. Items whose drawing is
+    unchanged between two layouts get equal keys, so diffing the key sets finds what needs repainting."""
+    style = style or GlyphStyle()
+    entries = [('node', node) for node in layout['nodes']] + [('trace', trace) for trace in layout['traces']]
+    entries += [(kind, layout[kind]) for kind in ('ground_trace', 'charge_indicator', 'ground_indicator', 'null_modifier') if layout[kind]]
+    return {(kind, _freeze(item)): item_bounds(kind, item, style) for kind, item in entries}
+
+def item_bounds(kind: str, item: dict, style: GlyphStyle | None = None) -> tuple[float, float, float, float]:
+    """Bounds of one layout item ('node', 'trace', 'ground_trace', ...), pen widths included."""
+    style = style or GlyphStyle()
+    return _points_bounds(_item_points(kind, item, style), max(style.node_outline_pen_width, style.trace_pen_width))
+
+def layout_bounds(layout: dict, style: GlyphStyle | None = None) -> tuple[float, float, float, float]:
+    """(min_x, min_y, max_x, max_y) of everything layout_glyph placed, pen widths included."""
+    style = style or GlyphStyle()
+    item_bounds = list(layout_items(layout, style).values())
+    if not item_bounds:
+        return (0.0, 0.0, CONCEPTUAL_SIZE, CONCEPTUAL_SIZE)
+    return (min(b[0] for b in item_bounds), min(b[1] for b in item_bounds), max(b[2] for b in item_bounds), max(b[3] for b in item_bounds))
@@ -74,6 +74,29 @@ LEXICON_GLYPHS = {
     "THEIR_THEIRS_PLURAL":   {'glyph_type': 'PRONOUN_THEIR_THEIRS_PLURAL', 'text': "Their/Theirs <plural>"},
 }
 
+# English phrases (lowercase, words separated by single spaces) recognized as each
+# lexicon glyph in running text. Where the lexicon distinguishes singular and plural
+# but English doesn't ("them", "their"), the plural reading is used.
+LEXICON_PHRASES = {
+    "and": "AND",
+    "or": "OR",
+    "true": "TRUE_IS", "is": "TRUE_IS",
+    "false": "FALSE_NOT", "not": "FALSE_NOT",
+    "because": "BECAUSE_SINCE", "since": "BECAUSE_SINCE",
+    "so": "SO_THIS_CAUSING", "this": "SO_THIS_CAUSING", "causing": "SO_THIS_CAUSING",
+    "if": "IF",
+    "if then": "IF_THEN",
+    "there is": "THERE_IS", "there exists": "THERE_IS",
+    "unique": "UNIQUE_EXISTS_ONE", "there exists exactly one": "UNIQUE_EXISTS_ONE",
+    "from to": "FROM_TO", "transition": "FROM_TO",
+    "i": "I_ME", "me": "I_ME",
+    "you": "YOU_SINGULAR",
+    "you all": "YOU_PLURAL",
+    "we": "WE",
+    "them": "THEM_PLURAL",
+    "their": "THEIR_THEIRS_PLURAL", "theirs": "THEIR_THEIRS_PLURAL",
+}
+
 # Articles modify the charge node (PDF page 306) [cite: 4785, 4786]
 ARTICLE_GLYPHS = {
     "THE": {'glyph_type': 'ARTICLE_THE', 'text': "The <definite>"}, # Theta-like symbol
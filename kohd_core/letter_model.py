@@ -0,0 +1,60 @@
+# kohd_translator/kohd_core/letter_model.py
+#
+# Letter-bigram model used to guess the next letter while a word is typed, so
+# the builder can prebuild the likely next glyph states when idle. Counts are
+# kept per previous letter (plus a word-start row) over the board's alphabet
+# and smoothed with English letter frequencies, so an untrained model already
+# ranks sensibly; observe() learns from the words actually typed.
+import numpy as np
+
+from .kohd_rules import LETTER_TO_NODE_INFO
+
+# Relative frequency of each letter in English text (percent)
+ENGLISH_LETTER_FREQUENCIES = {
+    'E': 12.70, 'T': 9.06, 'A': 8.17, 'O': 7.51, 'I': 6.97, 'N': 6.75, 'S': 6.33, 'H': 6.09, 'R': 5.99,
+    'D': 4.25, 'L': 4.03, 'C': 2.78, 'U': 2.76, 'M': 2.41, 'W': 2.36, 'F': 2.23, 'G': 2.02, 'Y': 1.97,
+    'P': 1.93, 'B': 1.29, 'V': 0.98, 'K': 0.77, 'J': 0.15, 'X': 0.15, 'Q': 0.10, 'Z': 0.07,
+}
+# Weight of the frequency prior in each row, in observed bigrams
+DEFAULT_PRIOR_WEIGHT = 2.0
+
+
+class LetterBigramModel:
+    def __init__(self, alphabet=None, prior: dict[str, float] | None = None, prior_weight: float = DEFAULT_PRIOR_WEIGHT):
+        self.alphabet: tuple[str, ...] = tuple(sorted(alphabet if alphabet is not None else LETTER_TO_NODE_INFO))
+        self.letter_index = {letter: i for i, letter in enumerate(self.alphabet)}
+        prior = ENGLISH_LETTER_FREQUENCIES if prior is None else prior
+        weights = np.array([prior.get(letter, 0.0) for letter in self.alphabet], dtype=float) + 1e-3
+        # Row 0 is the start of a word, row i + 1 follows alphabet[i]
+        self.counts = np.tile(weights / weights.sum() * prior_weight, (len(self.alphabet) + 1, 1))
+        self._ranked: dict[str | None, tuple[str, ...]] = {}
+
+    @classmethod
+    def from_words(cls, words, **kwargs) -> 'LetterBigramModel':
+        model = cls(**kwargs)
+        for word in words: model.observe(word)
+        return model
+
+    def _row(self, previous_letter: str | None) -> int:
+        return 0 if previous_letter is None else self.letter_index[previous_letter] + 1
+
+    def observe(self, word: str, weight: float = 1.0):
+        """Counts the bigrams of `word`; letters outside the alphabet are skipped."""
+        previous = None
+        for letter in word.upper():
+            if letter not in self.letter_index: continue
+            self.counts[self._row(previous), self.letter_index[letter]] += weight
+            previous = letter
+        self._ranked.clear()
+
+    def probabilities(self, previous_letter: str | None) -> dict[str, float]:
+        row = self.counts[self._row(previous_letter)]
+        return dict(zip(self.alphabet, (row / row.sum()).tolist()))
+
+    def ranked_next(self, previous_letter: str | None) -> tuple[str, ...]:
+        """The alphabet ordered from the most to the least likely letter after `previous_letter` (None at a word start)."""
+        ranked = self._ranked.get(previous_letter)
+        if ranked is None:
+            order = np.argsort(-self.counts[self._row(previous_letter)], kind='stable')
+            ranked = self._ranked[previous_letter] = tuple(self.alphabet[i] for i in order)
+        return ranked
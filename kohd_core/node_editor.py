@@ -0,0 +1,179 @@
+# kohd_translator/kohd_core/node_editor.py
+#
+# Node dragging for design iteration. A NodeDragSession holds one glyph's
+# element list and its layout, plus an index of the traces that start or end
+# at each node. Moving a node reroutes only the traces in its index entry and
+# lays out again only what depends on them: their subnode dots, and the charge
+# indicator, ground trace/indicator and null modifier of the nodes they touch.
+# Every other layout item is reused unchanged, and the returned dirty bounds
+# let the canvas repaint just that area. As while typing, traces follow the
+# drag as draft routes and settle() routes them properly once it ends.
+import time
+
+from .board import Board
+from .glyph_builder import GlyphConfig, DEFAULT_GLYPH_CONFIG
+from .glyph_layout import (GlyphStyle, layout_glyph, item_bounds, _layout_trace, _path_end_angles, _layout_charge_indicator,
+                           _layout_ground, _layout_null_modifier)
+from .route_buffer import RouteBuffer
+from .trace_router import route_trace, ROUTE_QUALITY_DRAFT, ROUTE_QUALITY_STANDARD
+
+# Quality traces are rerouted at on every move of a drag: the conventional shape, a few microseconds per trace
+DRAG_ROUTE_QUALITY = ROUTE_QUALITY_DRAFT
+# Quality the traces at the dragged nodes are rerouted at by settle(), once the drag ends
+SETTLE_ROUTE_QUALITY = ROUTE_QUALITY_STANDARD
+# The shared route buffer is repacked once it holds this many times the points still in use
+ROUTE_BUFFER_SLACK_FACTOR = 4
+
+
+class NodeDragSession:
+    """Moves nodes of a glyph built on config.board. `elements` and `board` always describe the edited
+    glyph and `layout` is what layout_glyph(elements, ..., board) would return for it."""
+    def __init__(self, glyph_elements, active_node_name: str | None = None, is_finalized: bool = False,
+                 config: GlyphConfig = DEFAULT_GLYPH_CONFIG, style: GlyphStyle | None = None, quality: str = DRAG_ROUTE_QUALITY):
+        self.config = config; self.board: Board = config.board
+        self.style = style or GlyphStyle(config.node_radius)
+        self.quality = quality
+        self.elements = list(glyph_elements)
+        self.trace_indices = [i for i, el in enumerate(self.elements) if el['type'] == 'trace']
+        # Node name -> positions in trace_indices of the traces starting or ending there
+        self.traces_at_node: dict[str, list[int]] = {}
+        for k, element_index in enumerate(self.trace_indices):
+            element = self.elements[element_index]
+            for name in dict.fromkeys((element['from_node_name'], element['to_node_name'])): self.traces_at_node.setdefault(name, []).append(k)
+        self.layout = layout_glyph(self.elements, active_node_name, is_finalized, self.style, self.board)
+        self._trace_angles = [_path_end_angles(trace['points']) for trace in self.layout['traces']]
+        self._node_index = {node['name']: i for i, node in enumerate(self.layout['nodes'])}
+        self._ground_element = next((el for el in self.elements if el['type'] == 'trace_to_ground'), None)
+        self._has_ground_indicator = any(el['type'] == 'ground_indicator' for el in self.elements)
+        self._null_modifier_index = next((i for i, el in enumerate(self.elements) if el['type'] == 'null_modifier'), None)
+        self._unsettled: set[str] = set() # Nodes moved since the last settle()
+        self.last_rerouted = 0 # Traces rerouted by the most recent move or settle, for checking their cost
+
+    def _node_angles(self, node_name: str) -> list[float]:
+        """Angles at which the glyph's traces leave or enter `node_name`, as layout_glyph collects them."""
+        angles = []
+        for k in self.traces_at_node.get(node_name, ()):
+            element = self.elements[self.trace_indices[k]]; start_angle, end_angle = self._trace_angles[k]
+            if element['from_node_name'] == node_name and start_angle is not None: angles.append(start_angle)
+            if element['to_node_name'] == node_name and end_angle is not None: angles.append(end_angle)
+        return angles
+
+    def move_node(self, node_name: str, position: tuple[float, float]) -> tuple[float, float, float, float] | None:
+        """Moves `node_name` to `position` (conceptual units) and updates the layout, rerouting at the session's
+        (draft) quality. Returns the bounds covering every item drawn differently before and after, or None."""
+        if node_name not in self.board.node_id or self.board.positions[node_name] == position: return None
+        self.board = board = self.board.moved(node_name, position)
+        center = board.positions[node_name]
+        layout = self.layout = dict(self.layout)
+        changed = [] # (kind, old item, new item)
+        for i, element in enumerate(self.elements):
+            if element['type'] in ('node', 'null_modifier') and element.get('name', element.get('node_name')) == node_name:
+                self.elements[i] = dict(element, coords=center)
+        node_index = self._node_index.get(node_name)
+        if node_index is not None:
+            nodes = layout['nodes'] = list(layout['nodes'])
+            old_node = nodes[node_index]; nodes[node_index] = dict(old_node, center=center)
+            changed.append(('node', old_node, nodes[node_index]))
+        self._unsettled.add(node_name)
+        return self._reroute(self.traces_at_node.get(node_name, ()), {node_name}, self.quality, changed)
+
+    def settle(self, quality: str = SETTLE_ROUTE_QUALITY) -> tuple[float, float, float, float] | None:
+        """Reroutes the traces at every node moved since the last settle at `quality`, e.g. when a drag ends.
+        Returns the dirty bounds like move_node."""
+        moved = self._unsettled; self._unsettled = set()
+        affected = sorted({k for name in moved for k in self.traces_at_node.get(name, ())})
+        if not affected: return None
+        self.layout = dict(self.layout)
+        return self._reroute(affected, moved, quality, [])
+
+    def _reroute(self, affected, moved: set, quality: str, changed: list) -> tuple[float, float, float, float] | None:
+        """Reroutes traces `affected` (positions in trace_indices, ascending), each against the traces before it
+        as build_glyph does, then lays out again whatever depends on them or on the `moved` nodes."""
+        layout = self.layout; board = self.board
+        touched = set(moved)
+        if affected:
+            traces = layout['traces'] = list(layout['traces'])
+            paths = [self.elements[i]['path_points'] for i in self.trace_indices]
+            routes = layout['routes']
+            for k in affected:
+                element_index = self.trace_indices[k]; element = self.elements[element_index]
+                path, _ = route_trace(
+                    start_node_name=element['from_node_name'], end_node_name=element['to_node_name'],
+                    start_ring_level=element['connect_from_ring_level'], end_ring_level=element['connect_to_ring_level'],
+                    all_node_positions=board.positions, node_layout=board, node_radius=self.config.node_radius,
+                    get_ring_radius_method=self.config.ring_radius, start_offset_idx=element['start_offset_idx'],
+                    end_offset_idx=element['end_offset_idx'], existing_paths=paths[:k], quality=quality)
+                paths[k] = path
+                self.elements[element_index] = element = dict(element, path_points=path)
+                old_trace = traces[k]
+                traces[k], start_angle, end_angle = _layout_trace(element, board.positions, routes, self.style)
+                self._trace_angles[k] = (start_angle, end_angle)
+                changed.append(('trace', old_trace, traces[k]))
+                touched.update((element['from_node_name'], element['to_node_name']))
+        self.last_rerouted = len(affected)
+
+        nodes_by_name = {node['name']: node for node in layout['nodes']}
+        charge = layout['charge_indicator']
+        if charge and charge['node_name'] in touched:
+            layout['charge_indicator'] = _layout_charge_indicator(charge['node_name'], nodes_by_name[charge['node_name']]['center'],
+                                                                  self._node_angles(charge['node_name']), self.style)
+            changed.append(('charge_indicator', charge, layout['charge_indicator']))
+        ground_node_name = self._ground_element['from_node_name'] if self._ground_element else None
+        if layout['ground_trace'] and ground_node_name in touched:
+            existing_angles = self._node_angles(ground_node_name)
+            if layout['charge_indicator'] and layout['charge_indicator']['node_name'] == ground_node_name: existing_angles.append(layout['charge_indicator']['angle_deg'])
+            old_ground_trace, old_ground_indicator = layout['ground_trace'], layout['ground_indicator']
+            layout['ground_trace'], layout['ground_indicator'] = _layout_ground(
+                self._ground_element, nodes_by_name[ground_node_name]['center'], existing_angles, self._has_ground_indicator, self.style)
+            changed.append(('ground_trace', old_ground_trace, layout['ground_trace']))
+            if old_ground_indicator or layout['ground_indicator']: changed.append(('ground_indicator', old_ground_indicator, layout['ground_indicator']))
+        null_modifier = layout['null_modifier']
+        if null_modifier and moved & {null_modifier['node_name'], board.center_node_name}:
+            layout['null_modifier'] = _layout_null_modifier(self.elements[self._null_modifier_index], board.positions, board, self.style)
+            changed.append(('null_modifier', null_modifier, layout['null_modifier']))
+
+        self._compact_routes()
+        dirty = [item_bounds(kind, item, self.style) for kind, old_item, new_item in changed for item in (old_item, new_item) if item]
+        if not dirty: return None
+        return (min(b[0] for b in dirty), min(b[1] for b in dirty), max(b[2] for b in dirty), max(b[3] for b in dirty))
+
+    def _compact_routes(self):
+        """New trace points are appended to the layout's RouteBuffer; repack it once most of it is stale."""
+        layout = self.layout
+        live = sum(trace['span'][1] - trace['span'][0] for trace in layout['traces'])
+        if len(layout['routes']) <= ROUTE_BUFFER_SLACK_FACTOR * max(live, 1): return
+        routes = layout['routes'] = RouteBuffer()
+        layout['traces'] = [dict(trace, span=routes.append(trace['points'])) for trace in layout['traces']]
+
+
+if __name__ == '__main__':
+    import math
+    from .glyph_builder import build_glyph
+    from .glyph_layout import layout_items
+    from .trace_router import ROUTE_QUALITY_DRAFT
+    word = "MOTHERBOARDSANDDAUGHTERBOARDSWITHEXTRACIRCUITRY"
+    glyph = build_glyph(word)
+    session = NodeDragSession(glyph.elements, is_finalized=True)
+    node_name = max(session.traces_at_node, key=lambda name: len(session.traces_at_node[name]))
+    x0, y0 = session.board.positions[node_name]
+    print(f"{word}: {len(session.trace_indices)} traces, dragging {node_name} ({len(session.traces_at_node[node_name])} traces)")
+    move_times = []; full_times = []
+    for step in range(1, 121):
+        position = (x0 + 30 * math.sin(step / 10), y0 + 30 * math.cos(step / 10) - 30)
+        start = time.perf_counter()
+        session.move_node(node_name, position)
+        move_times.append(time.perf_counter() - start)
+        # The same move done by rebuilding the whole glyph (draft routes too) on the moved board and laying it out again
+        start = time.perf_counter()
+        rebuilt = build_glyph(word, GlyphConfig(board=session.board), quality=ROUTE_QUALITY_DRAFT)
+        layout_glyph(list(rebuilt.elements), None, True, session.style, session.board)
+        full_times.append(time.perf_counter() - start)
+    print(f"move: mean {sum(move_times) / len(move_times) * 1e3:.2f} ms, max {max(move_times) * 1e3:.2f} ms; "
+          f"full rebuild: mean {sum(full_times) / len(full_times) * 1e3:.2f} ms")
+    start = time.perf_counter()
+    session.settle()
+    print(f"settle: {(time.perf_counter() - start) * 1e3:.2f} ms for {session.last_rerouted} traces")
+    fresh_layout = layout_glyph(session.elements, None, True, session.style, session.board)
+    print("layout matches a full layout_glyph:", layout_items(fresh_layout, session.style) == layout_items(session.layout, session.style))
+    session.move_node(node_name, (x0, y0)); session.settle()
+    print("dragged back and settled equals the built glyph:", session.elements == list(glyph.elements))
@@ -0,0 +1,264 @@
+# kohd_translator/kohd_core/plotter_export.py
+#
+# Pen-plotter / laser output. A glyph layout (or a sheet of them) is turned
+# into plain polylines: node circles, rings, traces, indicator strokes and the
+# null modifier, with subnode dots as small filled spirals or single points.
+# Node name labels are not plotted. Strokes whose ends touch are chained and
+# collinear points dropped, then stroke order and direction are chosen to cut
+# pen-up travel: nearest neighbour from the pen's home position, improved by
+# 2-opt moves (reverse a run of strokes) until none helps or time runs out.
+# Output is SVG polylines or HPGL, in conceptual units scaled to millimetres.
+import math
+import time
+
+import numpy as np
+
+from .glyph_layout import GlyphStyle, CONCEPTUAL_SIZE
+
+# Largest gap between a circle and its polygon, in conceptual units
+CIRCLE_TOLERANCE = 0.05
+# Stroke ends closer than this are treated as touching
+JOIN_TOLERANCE = 0.01
+# Sine of the largest turn still treated as straight when dropping collinear points
+COLLINEAR_TOLERANCE = 1e-4
+# Space between glyph cells on a sheet, in conceptual units
+SHEET_CELL_GAP = 30.0
+DEFAULT_MM_PER_UNIT = 0.2
+HPGL_UNITS_PER_MM = 40
+DEFAULT_OPTIMIZE_TIME_BUDGET_S = 2.0
+SUBNODE_DOT_SPIRAL = 'spiral'
+SUBNODE_DOT_POINT = 'point'
+
+
+# --- Strokes from layouts ---
+def circle_points(center, radius: float, tolerance: float = CIRCLE_TOLERANCE) -> list[tuple[float, float]]:
+    """Closed polygon (first point repeated) within `tolerance` of the circle."""
+    count = max(8, math.ceil(math.pi / math.acos(max(-1.0, 1.0 - tolerance / radius)))) if radius > tolerance else 8
+    cx, cy = center
+    points = [(cx + radius * math.cos(2 * math.pi * i / count), cy + radius * math.sin(2 * math.pi * i / count)) for i in range(count)]
+    return points + [points[0]]
+
+def spiral_points(center, radius: float, pitch: float) -> list[tuple[float, float]]:
+    """Archimedean spiral from the center out to `radius`, `pitch` apart per turn, then once round the edge: a filled dot."""
+    cx, cy = center
+    turns = max(1.0, radius / pitch)
+    steps = max(12, int(turns * 16))
+    points = [(cx + radius * (i / steps) * math.cos(2 * math.pi * turns * i / steps),
+               cy + radius * (i / steps) * math.sin(2 * math.pi * turns * i / steps)) for i in range(steps + 1)]
+    end_angle = 2 * math.pi * turns
+    return points + [(cx + radius * math.cos(end_angle + 2 * math.pi * i / 16), cy + radius * math.sin(end_angle + 2 * math.pi * i / 16)) for i in range(1, 17)]
+
+def layout_strokes(layout: dict, style: GlyphStyle | None = None, origin=(0.0, 0.0), subnode_dots: str = SUBNODE_DOT_SPIRAL,
+                   pen_width: float | None = None) -> list[list[tuple[float, float]]]:
+    """Every plotted line of a laid-out glyph as polylines, moved by `origin`."""
+    style = style or GlyphStyle()
+    pen_width = pen_width or style.trace_pen_width
+    strokes = []
+    for node in layout['nodes']:
+        strokes.append(circle_points(node['center'], style.node_radius))
+        strokes += [circle_points(node['center'], ring_r) for ring_r in node['ring_radii']]
+    for trace in layout['traces'] + ([layout['ground_trace']] if layout['ground_trace'] else []):
+        if len(trace['points']) >= 2: strokes.append(list(trace['points']))
+        for dot in trace['subnode_dots']:
+            strokes.append(spiral_points(dot, style.subnode_dot_radius, pen_width) if subnode_dots == SUBNODE_DOT_SPIRAL else [dot, dot])
+    charge = layout['charge_indicator']
+    if charge: strokes += [list(charge['lead_line']), list(charge['zigzag_points'])]
+    ground = layout['ground_indicator']
+    if ground: strokes += [list(segment) for segment in ground['segments']]
+    null_modifier = layout['null_modifier']
+    if null_modifier:
+        strokes.append(circle_points(null_modifier['center'], style.node_radius))
+        strokes += [list(segment) for segment in null_modifier['cross_lines']]
+        if null_modifier['pointer_line']: strokes.append(list(null_modifier['pointer_line']))
+        if null_modifier['pointer_circle_center']: strokes.append(circle_points(null_modifier['pointer_circle_center'], style.null_modifier_pointer_line_radius))
+    ox, oy = origin
+    return [[(x + ox, y + oy) for x, y in stroke] for stroke in strokes] if origin != (0.0, 0.0) else strokes
+
+def sheet_strokes(words, columns: int = 6, config=None, style: GlyphStyle | None = None, subnode_dots: str = SUBNODE_DOT_SPIRAL) -> tuple[list, tuple[float, float]]:
+    """Strokes for a grid of finalized word glyphs, `columns` per row. Returns (strokes, (width, height))."""
+    from .glyph_builder import build_glyph, DEFAULT_GLYPH_CONFIG
+    config = config or DEFAULT_GLYPH_CONFIG
+    style = style or GlyphStyle(config.node_radius)
+    cell = CONCEPTUAL_SIZE + SHEET_CELL_GAP
+    strokes = []; count = 0
+    for index, word in enumerate(words):
+        glyph = build_glyph(word, config)
+        layout = glyph.layout(style)
+        row, col = divmod(index, columns)
+        strokes += layout_strokes(layout, style, (col * cell, row * cell), subnode_dots)
+        count += 1
+    rows = max(1, math.ceil(count / columns))
+    return strokes, (min(count, columns) * cell - SHEET_CELL_GAP, rows * cell - SHEET_CELL_GAP)
+
+
+# --- Merging ---
+def _simplify(stroke: list) -> list:
+    """Drops repeated points and points on a straight run between their neighbours."""
+    points = [stroke[0]]
+    for point in stroke[1:]:
+        if abs(point[0] - points[-1][0]) > JOIN_TOLERANCE or abs(point[1] - points[-1][1]) > JOIN_TOLERANCE: points.append(point)
+    if len(points) < 3: return points if len(points) > 1 else [stroke[0], stroke[-1]]
+    kept = [points[0]]
+    for i in range(1, len(points) - 1):
+        (ax, ay), (bx, by), (cx, cy) = kept[-1], points[i], points[i + 1]
+        ux, uy, vx, vy = bx - ax, by - ay, cx - bx, cy - by
+        if abs(ux * vy - uy * vx) <= COLLINEAR_TOLERANCE * math.hypot(ux, uy) * math.hypot(vx, vy) and ux * vx + uy * vy > 0: continue
+        kept.append(points[i])
+    kept.append(points[-1])
+    return kept
+
+def merge_strokes(strokes: list) -> list:
+    """Chains open strokes whose ends touch into single strokes, then drops collinear points."""
+    def key(point): return (round(point[0] / JOIN_TOLERANCE), round(point[1] / JOIN_TOLERANCE))
+    def is_closed(stroke): return len(stroke) > 2 and key(stroke[0]) == key(stroke[-1])
+    ends: dict[tuple, list[int]] = {}
+    for index, stroke in enumerate(strokes):
+        if is_closed(stroke) or stroke[0] == stroke[-1]: continue # Loops and dots stay as they are
+        ends.setdefault(key(stroke[0]), []).append(index); ends.setdefault(key(stroke[-1]), []).append(index)
+    used = [False] * len(strokes)
+
+    def take_next(point):
+        for index in ends.get(key(point), ()):
+            if not used[index]:
+                used[index] = True
+                stroke = strokes[index]
+                return stroke if key(stroke[0]) == key(point) else stroke[::-1]
+        return None
+
+    merged = []
+    for index, stroke in enumerate(strokes):
+        if used[index]: continue
+        used[index] = True
+        chain = list(stroke)
+        if key(chain[0]) in ends or key(chain[-1]) in ends:
+            while (following := take_next(chain[-1])) is not None: chain += following[1:]
+            while (preceding := take_next(chain[0])) is not None: chain = preceding[::-1][:-1] + chain
+        merged.append(_simplify(chain))
+    return merged
+
+
+# --- Ordering ---
+def travel_distance(strokes: list, home=(0.0, 0.0)) -> float:
+    """Pen-up distance to draw `strokes` in order, each from its first to its last point, starting at home."""
+    total = 0.0; position = home
+    for stroke in strokes:
+        total += math.hypot(stroke[0][0] - position[0], stroke[0][1] - position[1]); position = stroke[-1]
+    return total
+
+def _nearest_neighbour_order(strokes: list, home) -> list:
+    starts = np.array([stroke[0] for stroke in strokes], dtype=float); ends = np.array([stroke[-1] for stroke in strokes], dtype=float)
+    remaining = np.ones(len(strokes), dtype=bool)
+    ordered = []; position = np.asarray(home, dtype=float)
+    for _ in range(len(strokes)):
+        to_start = np.where(remaining, np.hypot(*(starts - position).T), np.inf)
+        to_end = np.where(remaining, np.hypot(*(ends - position).T), np.inf)
+        best_start = int(np.argmin(to_start)); best_end = int(np.argmin(to_end))
+        if to_end[best_end] < to_start[best_start]:
+            index = best_end; stroke = strokes[index][::-1]
+        else:
+            index = best_start; stroke = strokes[index]
+        if stroke[0] == stroke[-1] and len(stroke) > 2: # A loop can start at whichever of its points is nearest
+            loop = np.asarray(stroke[:-1], dtype=float)
+            nearest = int(np.argmin(np.hypot(*(loop - position).T)))
+            stroke = stroke[nearest:-1] + stroke[:nearest + 1]
+        remaining[index] = False
+        ordered.append(stroke); position = np.asarray(stroke[-1], dtype=float)
+    return ordered
+
+def _two_opt(strokes: list, home, deadline: float) -> list:
+    """Reverses runs of strokes (order and direction) while that shortens pen-up travel."""
+    strokes = list(strokes)
+    count = len(strokes)
+    home = np.asarray(home, dtype=float)[None]
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False; stale = True
+        i = 0
+        while i < count and time.perf_counter() < deadline:
+            if stale:
+                starts = np.array([stroke[0] for stroke in strokes], dtype=float); ends = np.array([stroke[-1] for stroke in strokes], dtype=float)
+                before = np.vstack((home, ends[:-1])) # Pen position before each stroke
+                current = np.hypot(*(starts - before).T) # Travel into each stroke
+                stale = False
+            # Reversing strokes i..j: travel into i becomes before[i] -> ends[j], travel out of j becomes starts[i] -> starts[j + 1]
+            gain = current[i] + np.append(current[i + 1:], 0.0) - np.hypot(*(ends[i:] - before[i]).T) \
+                - np.append(np.hypot(*(starts[i + 1:] - starts[i]).T), 0.0)
+            best = int(np.argmax(gain))
+            if gain[best] > 1e-9:
+                strokes[i:i + best + 1] = [stroke[::-1] for stroke in reversed(strokes[i:i + best + 1])]
+                improved = stale = True
+            else:
+                i += 1
+    return strokes
+
+def optimize_stroke_order(strokes: list, home=(0.0, 0.0), time_budget_s: float = DEFAULT_OPTIMIZE_TIME_BUDGET_S) -> list:
+    """Orders and orients strokes for little pen-up travel: nearest neighbour, then 2-opt within the time budget."""
+    if len(strokes) < 2: return list(strokes)
+    deadline = time.perf_counter() + time_budget_s
+    return _two_opt(_nearest_neighbour_order(strokes, home), home, deadline)
+
+
+def plot_strokes(strokes: list, home=(0.0, 0.0), time_budget_s: float = DEFAULT_OPTIMIZE_TIME_BUDGET_S) -> tuple[list, dict]:
+    """Merges and orders `strokes`. Returns (plot-ready strokes, stats) with the pen-up travel before and after."""
+    travel_before = travel_distance(strokes, home)
+    merged = merge_strokes(strokes)
+    start = time.perf_counter()
+    ordered = optimize_stroke_order(merged, home, time_budget_s)
+    travel_after = travel_distance(ordered, home)
+    return ordered, {
+        'strokes_in': len(strokes), 'strokes_out': len(ordered),
+        'travel_before': travel_before, 'travel_after': travel_after, 'travel_saved': travel_before - travel_after,
+        'travel_saved_fraction': (travel_before - travel_after) / travel_before if travel_before > 0 else 0.0,
+        'pen_down_length': sum(math.hypot(b[0] - a[0], b[1] - a[1]) for stroke in ordered for a, b in zip(stroke[:-1], stroke[1:])),
+        'optimize_s': time.perf_counter() - start,
+    }
+
+
+# --- Output ---
+def _fmt(value: float) -> str:
+    return f"{value:.3f}".rstrip('0').rstrip('.')
+
+def strokes_to_svg(strokes: list, size: tuple[float, float], mm_per_unit: float = DEFAULT_MM_PER_UNIT, pen_width: float = 1.5) -> str:
+    """One <polyline> per stroke, in plotting order, sized in millimetres."""
+    width, height = size
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {_fmt(width)} {_fmt(height)}" '
+             f'width="{_fmt(width * mm_per_unit)}mm" height="{_fmt(height * mm_per_unit)}mm">',
+             f'<g fill="none" stroke="#000000" stroke-width="{_fmt(pen_width)}" stroke-linecap="round" stroke-linejoin="round">']
+    parts += [f'<polyline points="{" ".join(f"{_fmt(x)},{_fmt(y)}" for x, y in stroke)}"/>' for stroke in strokes]
+    parts.append('</g></svg>')
+    return '\n'.join(parts)
+
+def strokes_to_hpgl(strokes: list, height: float, mm_per_unit: float = DEFAULT_MM_PER_UNIT, pen: int = 1) -> str:
+    """HPGL with one PU/PD pair per stroke. HPGL's y axis points up, so y is flipped within `height`."""
+    scale = mm_per_unit * HPGL_UNITS_PER_MM
+    def plotter_point(point): return f"{round(point[0] * scale)},{round((height - point[1]) * scale)}"
+    commands = ["IN", f"SP{pen}"]
+    for stroke in strokes:
+        commands.append(f"PU{plotter_point(stroke[0])}")
+        commands.append("PD" + ",".join(plotter_point(point) for point in stroke[1:]))
+    commands += ["PU", "SP0"]
+    return ";\n".join(commands) + ";\n"
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Export word glyphs as travel-optimized plotter strokes (SVG and/or HPGL).")
+    parser.add_argument('words', nargs='+')
+    parser.add_argument('--columns', type=int, default=6)
+    parser.add_argument('--svg', help="write SVG polylines here")
+    parser.add_argument('--hpgl', help="write HPGL here")
+    parser.add_argument('--mm-per-unit', type=float, default=DEFAULT_MM_PER_UNIT, help="millimetres per conceptual unit")
+    parser.add_argument('--dots', choices=(SUBNODE_DOT_SPIRAL, SUBNODE_DOT_POINT), default=SUBNODE_DOT_SPIRAL)
+    parser.add_argument('--time-budget', type=float, default=DEFAULT_OPTIMIZE_TIME_BUDGET_S, help="seconds for 2-opt")
+    args = parser.parse_args()
+
+    raw_strokes, sheet_size = sheet_strokes(args.words, args.columns, subnode_dots=args.dots)
+    plotted, stats = plot_strokes(raw_strokes, time_budget_s=args.time_budget)
+    if args.svg:
+        with open(args.svg, 'w', encoding='utf-8') as svg_file: svg_file.write(strokes_to_svg(plotted, sheet_size, args.mm_per_unit))
+    if args.hpgl:
+        with open(args.hpgl, 'w', encoding='ascii') as hpgl_file: hpgl_file.write(strokes_to_hpgl(plotted, sheet_size[1], args.mm_per_unit))
+    print(f"{stats['strokes_in']} strokes merged into {stats['strokes_out']}; pen-up travel "
+          f"{stats['travel_before'] * args.mm_per_unit:.0f} mm -> {stats['travel_after'] * args.mm_per_unit:.0f} mm "
+          f"({stats['travel_saved_fraction']:.0%} saved, {stats['optimize_s']:.2f}s); "
+          f"pen-down {stats['pen_down_length'] * args.mm_per_unit:.0f} mm")
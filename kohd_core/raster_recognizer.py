@@ -0,0 +1,567 @@
+# kohd_translator/kohd_core/raster_recognizer.py
+#
+# Reads a finished glyph back from a raster image (screenshot, scan or an
+# export of the canvas) and decodes it to text. Everything on the pixel side
+# is vectorized NumPy over the whole image or over batches of sample points.
+# The node grid is located from the row/column projections of node fill,
+# eroded so anti-aliased line halos don't count, and fitted to the board's
+# node positions. The fit gives a conceptual -> pixel transform; node states
+# (filled, active, empty) and rings are then read by sampling discs and
+# circles. Traces are not vectorized freehand: decoding walks the builder's
+# own planning rules (extend_plan) as a beam search. Each step hypothesizes
+# the trace to every other node, scores all of the router's candidate shapes
+# for it against the image ink at once, and reads the subnode dot groups
+# along the best one; the dot counts give the letters. Walks that can end
+# (dots on the ground trace) are laid out in full and scored by ink
+# precision/recall against the image, with ring counts and the null modifier
+# as checks. Where dots of different traces touch or overlap the reading is
+# ambiguous: the other readings of the winner's dots are tried against the
+# image, and a dot that coincides with another trace's is given to just one.
+# Axis-aligned images only: rotated or perspective-distorted photos are not
+# rectified.
+import os
+import math
+import time
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+import numpy as np
+
+from .board import Board, DEFAULT_BOARD
+from .glyph_builder import GlyphConfig, DEFAULT_GLYPH_CONFIG, plan_word, extend_plan, build_glyph, WordPlan
+from .glyph_layout import GlyphStyle, layout_glyph, MAX_RINGS_TO_DRAW
+from .similarity import layout_ink_points
+from .trace_router import refined_route_candidates, ROUTE_QUALITY_DRAFT
+
+# Gray level (0 black .. 1 white) below which a pixel is ink
+INK_THRESHOLD = 0.6
+# Node fill is lighter than ink and at least this much darker than the background
+FILL_MIN_GRAY = 0.45
+FILL_CONTRAST = 0.04
+# Pixels of erosion applied to the fill mask, removing anti-aliasing halos of lines
+FILL_EROSION_PX = 2
+# A node disc whose interior is at least this fraction fill is filled; yellowness ((r + g) / 2 - b) above ACTIVE_CHROMA makes it active
+NODE_FILLED_FRACTION = 0.3
+ACTIVE_CHROMA = 0.25
+# Fraction of a ring circle that must be ink for the ring to count
+RING_MIN_COVERAGE = 0.6
+# Fraction of a hypothesized trace's samples that must land on (1 px dilated) ink
+MIN_TRACE_COVERAGE = 0.9
+# Spacing of samples along traces, in conceptual units
+COVERAGE_SAMPLE_STEP = 1.0
+DOT_SAMPLE_STEP = 0.5
+# Subnode dots are where the ink is solid across the trace out to this fraction of the dot radius on both sides,
+# checked at DOT_PROBE_COUNT points
+DOT_PROBE_FACTOR = 0.7
+DOT_PROBE_COUNT = 7
+# Lines that reach this fraction of the dot radius on both sides of the trace are not dots
+DOT_CLEAR_FACTOR = 1.6
+# Shortest stretch of such solid ink taken as a dot, as a fraction of the dot radius
+DOT_MIN_RUN_FACTOR = 0.5
+# Slack allowed on dot positions and spacings, in conceptual units
+DOT_POSITION_TOLERANCE = 2.5
+# Length scanned along the ground trace direction for its dots
+GROUND_SCAN_LENGTH = 100.0
+# Ink within this margin of a node's outline (rings, names, trace ends) is left out of precision/recall
+NODE_EXCLUSION_MARGIN = 3.0
+# Distance at which model ink and image ink count as matching, in conceptual units
+INK_MATCH_TOLERANCE = 2
+# Score multipliers for a decoded glyph whose rings or null modifier disagree with the image
+RING_MISMATCH_PENALTY = 0.9
+NULL_MODIFIER_MISMATCH_PENALTY = 0.8
+# Dots closer than this are drawn on top of each other
+DOT_COINCIDENCE_TOLERANCE = 1.0
+# Dot readings followed per trace
+MAX_DOT_READINGS = 8
+# Partial walks kept per step of the decoding search
+DEFAULT_BEAM_WIDTH = 6
+# Safety bound on traces decoded from one image
+MAX_DECODED_TRACES = 64
+
+NODE_FILLED = 'filled'
+NODE_ACTIVE = 'active'
+NODE_EMPTY = 'empty'
+
+
+@dataclass(frozen=True)
+class GridTransform:
+    """Conceptual -> pixel mapping found by locate_board: pixel = scale * conceptual + offset, per axis."""
+    scale_x: float
+    scale_y: float
+    offset_x: float
+    offset_y: float
+
+    def to_pixels(self, points: np.ndarray) -> np.ndarray:
+        return points * (self.scale_x, self.scale_y) + (self.offset_x, self.offset_y)
+
+    def to_conceptual(self, pixels: np.ndarray) -> np.ndarray:
+        return (pixels - (self.offset_x, self.offset_y)) / (self.scale_x, self.scale_y)
+
+
+@dataclass(frozen=True)
+class Recognition:
+    text: str                       # Decoded word, "" if nothing decoded
+    score: float = 0.0              # F-score of the decoded glyph's ink against the image, after penalties
+    precision: float = 0.0          # Fraction of the decoded glyph's ink found in the image
+    recall: float = 0.0             # Fraction of the image's ink explained by the decoded glyph
+    node_states: dict = field(default_factory=dict) # Node name -> NODE_FILLED, NODE_ACTIVE or NODE_EMPTY
+    ring_counts: dict = field(default_factory=dict) # Node name -> rings seen (at most MAX_RINGS_TO_DRAW)
+    charge_node: str | None = None
+    ground_node: str | None = None
+    traces: tuple = ()              # (from_node, to_node, letters carried) per decoded trace
+    transform: GridTransform | None = None
+
+
+class _DecodeState(NamedTuple):
+    score: float   # Image ink explained so far: covered length of the chosen paths
+    plan: WordPlan
+    paths: tuple   # Chosen path per planned trace
+    visits: tuple  # Readings (letters, best first) for each node visit before the current one
+
+
+# --- Pixel-level helpers ---
+def to_gray(image: np.ndarray) -> np.ndarray:
+    """Float32 gray levels in [0, 1] of an (H, W) gray or (H, W, 3/4) RGB(A) uint8 or float image."""
+    image = np.asarray(image)
+    scale = 255.0 if image.dtype == np.uint8 else 1.0
+    if image.ndim == 2: return image.astype(np.float32) / scale
+    rgb = image[..., :3].astype(np.float32) / scale
+    return rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+def _shift_reduce(mask: np.ndarray, radius: int, reduce) -> np.ndarray:
+    """Separable (2 * radius + 1)^2 min/max filter of a bool mask by shifted slices; the border is padded with the neutral value."""
+    pad_value = reduce is np.logical_and
+    for axis in (0, 1):
+        padded = np.pad(mask, [(radius, radius) if a == axis else (0, 0) for a in (0, 1)], constant_values=pad_value)
+        length = mask.shape[axis]
+        result = padded.take(range(0, length), axis=axis)
+        for offset in range(1, 2 * radius + 1):
+            result = reduce(result, padded.take(range(offset, offset + length), axis=axis))
+        mask = result
+    return mask
+
+def _erode(mask: np.ndarray, radius: int) -> np.ndarray:
+    return _shift_reduce(mask, radius, np.logical_and) if radius > 0 else mask
+
+def _dilate(mask: np.ndarray, radius: int) -> np.ndarray:
+    return _shift_reduce(mask, radius, np.logical_or) if radius > 0 else mask
+
+def locate_board(gray: np.ndarray, board: Board = DEFAULT_BOARD, node_radius: float = DEFAULT_GLYPH_CONFIG.node_radius) -> GridTransform:
+    """Finds the board's node grid in the image. The extent of the node fill gives a first scale and offset
+    per axis; each grid row and column is then re-centered on the fill's projection within a node radius of
+    where that puts it, and a line fitted through them. Raises ValueError if there is no grid to fit."""
+    background = float(np.median(gray))
+    fill = _erode((gray > FILL_MIN_GRAY) & (gray < background - FILL_CONTRAST), FILL_EROSION_PX)
+    if not fill.any(): raise ValueError("no node fill found")
+    fits = []
+    for axis, count, coordinate in ((0, board.cols, 0), (1, board.rows, 1)):
+        profile = fill.sum(axis=axis).astype(float)
+        occupied = np.flatnonzero(profile)
+        # Conceptual coordinate of each grid column (row), from any node in it
+        conceptual = np.array([next(board.positions[board.node_names[i]][coordinate] for i, rc in enumerate(board.row_col) if rc[coordinate ^ 1] == k)
+                               for k in range(count)])
+        low, high = conceptual.min() - node_radius, conceptual.max() + node_radius
+        scale = (occupied[-1] + 1 - occupied[0]) / (high - low); offset = occupied[0] - scale * low
+        positions = np.arange(len(profile), dtype=float)
+        centers = []
+        for value in conceptual:
+            window = slice(max(0, int(scale * value + offset - scale * node_radius)), int(scale * value + offset + scale * node_radius) + 1)
+            mass = profile[window].sum()
+            if not mass: raise ValueError(f"no node fill in grid {'column' if axis == 0 else 'row'} at {value:g}")
+            centers.append(float((positions[window] * profile[window]).sum() / mass))
+        if count > 1:
+            scale, offset = np.polyfit(conceptual, centers, 1)
+            if np.abs(scale * conceptual + offset - centers).max() > scale * node_radius / 2: raise ValueError("node fill doesn't form the board's grid")
+        else:
+            offset = centers[0] - scale * conceptual[0]
+        fits.append((scale, offset))
+    (scale_x, offset_x), (scale_y, offset_y) = fits
+    return GridTransform(float(scale_x), float(scale_y), float(offset_x), float(offset_y))
+
+
+class _ImageSampler:
+    """The image's masks plus lookups of conceptual points into them."""
+    def __init__(self, image: np.ndarray, gray: np.ndarray, transform: GridTransform):
+        image = np.asarray(image)
+        self.gray = gray
+        self.transform = transform
+        self.height, self.width = self.gray.shape
+        self.ink = self.gray < INK_THRESHOLD
+        self.ink_dilated = _dilate(self.ink, 1)
+        background = float(np.median(self.gray))
+        self.fill = (self.gray > FILL_MIN_GRAY) & (self.gray < background - FILL_CONTRAST)
+        if image.ndim == 3:
+            rgb = image[..., :3].astype(np.float32) / (255.0 if image.dtype == np.uint8 else 1.0)
+            self.chroma = (rgb[..., 0] + rgb[..., 1]) / 2 - rgb[..., 2]
+        else:
+            self.chroma = np.zeros_like(self.gray)
+
+    def lookup(self, mask: np.ndarray, points: np.ndarray) -> np.ndarray:
+        """Values of `mask` at conceptual `points` (..., 2), nearest pixel; False outside the image."""
+        pixels = np.rint(self.transform.to_pixels(points)).astype(np.intp)
+        x, y = pixels[..., 0], pixels[..., 1]
+        inside = (x >= 0) & (x < self.width) & (y >= 0) & (y < self.height)
+        values = np.zeros(points.shape[:-1], dtype=mask.dtype)
+        values[inside] = mask[y[inside], x[inside]]
+        return values
+
+
+# --- Geometry sampling ---
+def _sample_paths(paths, step: float) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Evenly spaced samples along each polyline: (points (S, 2), path index (S,), arc length (S,), unit tangent (S, 2))."""
+    points, owners, arcs, tangents = [], [], [], []
+    for index, path in enumerate(paths):
+        travelled = 0.0
+        for (x1, y1), (x2, y2) in zip(path[:-1], path[1:]):
+            length = math.hypot(x2 - x1, y2 - y1)
+            if length < 1e-9: continue
+            t = np.arange(0.0, length, step) / length
+            points.append(np.column_stack((x1 + (x2 - x1) * t, y1 + (y2 - y1) * t)))
+            owners.append(np.full(len(t), index)); arcs.append(travelled + t * length)
+            tangents.append(np.broadcast_to(((x2 - x1) / length, (y2 - y1) / length), (len(t), 2)))
+            travelled += length
+    if not points: return np.empty((0, 2)), np.empty(0, dtype=int), np.empty(0), np.empty((0, 2))
+    return np.concatenate(points), np.concatenate(owners), np.concatenate(arcs), np.concatenate(tangents)
+
+def _path_length(path) -> float:
+    return sum(math.hypot(x2 - x1, y2 - y1) for (x1, y1), (x2, y2) in zip(path[:-1], path[1:]))
+
+
+class RasterGlyphRecognizer:
+    """Decodes glyph images made with `config` (board, node and ring radii) and drawn with `style`."""
+    def __init__(self, config: GlyphConfig = DEFAULT_GLYPH_CONFIG, style: GlyphStyle | None = None, beam_width: int = DEFAULT_BEAM_WIDTH):
+        self.config = config; self.board = config.board
+        self.style = style or GlyphStyle(config.node_radius)
+        self.beam_width = beam_width
+        self.node_centers = np.array([self.board.positions[name] for name in self.board.node_names], dtype=float)
+        # A letter per node for planning walks: which letter doesn't matter to the geometry, only the node
+        self._node_letter = {name: next(letter for letter in letters if letter) for name, letters in self.board.node_letters.items() if any(letters)}
+        radius = self.config.node_radius
+        grid = np.mgrid[-radius:radius:1.5, -radius:radius:1.5].reshape(2, -1).T
+        self._disc_offsets = grid[np.hypot(grid[:, 0], grid[:, 1]) < radius * 0.8]
+        theta = np.linspace(0.0, 2 * math.pi, 72, endpoint=False)
+        self._unit_circle = np.column_stack((np.cos(theta), np.sin(theta)))
+        # Solid ink across the trace, not just at both ends (two traces running side by side would pass that)
+        self._dot_probe_offsets = np.linspace(-1.0, 1.0, DOT_PROBE_COUNT) * self.style.subnode_dot_radius * DOT_PROBE_FACTOR
+        disc = np.mgrid[-1:1:5j, -1:1:5j].reshape(2, -1).T
+        self._dot_disc = disc[np.hypot(disc[:, 0], disc[:, 1]) <= 1.0] * self.style.subnode_dot_radius * DOT_PROBE_FACTOR
+        self._dot_clear_offsets = np.array([-1.0, 1.0]) * self.style.subnode_dot_radius * DOT_CLEAR_FACTOR
+
+    # --- Node states and rings ---
+    def node_states(self, sampler: _ImageSampler) -> dict[str, str]:
+        points = self.node_centers[:, None, :] + self._disc_offsets[None]
+        fill = sampler.lookup(sampler.fill, points)
+        chroma = sampler.lookup(sampler.chroma, points)
+        fill_fraction = fill.mean(axis=1)
+        mean_chroma = np.where(fill.any(axis=1), (chroma * fill).sum(axis=1) / np.maximum(fill.sum(axis=1), 1), 0.0)
+        return {name: NODE_EMPTY if fill_fraction[i] < NODE_FILLED_FRACTION else NODE_ACTIVE if mean_chroma[i] > ACTIVE_CHROMA else NODE_FILLED
+                for i, name in enumerate(self.board.node_names)}
+
+    def ring_counts(self, sampler: _ImageSampler) -> dict[str, int]:
+        radii = np.array([self.style.ring_radius(level) for level in range(1, MAX_RINGS_TO_DRAW + 1)])
+        points = self.node_centers[:, None, None, :] + radii[None, :, None, None] * self._unit_circle[None, None]
+        coverage = sampler.lookup(sampler.ink, points).mean(axis=2) # (nodes, levels)
+        present = coverage >= RING_MIN_COVERAGE
+        counts = np.where(present.all(axis=1), MAX_RINGS_TO_DRAW, np.argmin(present, axis=1)) # Rings are drawn inside out
+        return {name: int(counts[i]) for i, name in enumerate(self.board.node_names)}
+
+    # --- Traces and dots ---
+    def _coverage(self, sampler: _ImageSampler, paths) -> np.ndarray:
+        """Fraction of each path's samples on (dilated) ink, for a batch of paths at once."""
+        points, owners, _, _ = _sample_paths(paths, COVERAGE_SAMPLE_STEP)
+        on_ink = sampler.lookup(sampler.ink_dilated, points)
+        totals = np.bincount(owners, minlength=len(paths))
+        return np.bincount(owners, weights=on_ink, minlength=len(paths)) / np.maximum(totals, 1)
+
+    def _dot_readings(self, sampler: _ImageSampler, path, start_padding: float) -> list[list[int]]:
+        """Plausible dot counts per subnode group along `path`, best first; empty if no dots follow the builder's
+        spacing. The dots are one chain from the start padding on; anything past the first gap wider than the
+        inter-group spacing (traces crossing at a shallow angle, other traces' dots) is not part of it."""
+        points, _, arcs, tangents = _sample_paths([path], DOT_SAMPLE_STEP)
+        # Past the last dot's reach there is only the end node's outline (or, on the ground scan, its symbol)
+        keep = (arcs >= start_padding - DOT_POSITION_TOLERANCE) & (arcs <= _path_length(path) - self.style.subnode_dot_radius)
+        points, arcs, tangents = points[keep], arcs[keep], tangents[keep]
+        if not len(arcs): return []
+        normals = tangents[:, ::-1] * (-1, 1)
+        probes = points[:, None, :] + self._dot_probe_offsets[None, :, None] * normals[:, None, :]
+        beyond = points[:, None, :] + self._dot_clear_offsets[None, :, None] * normals[:, None, :]
+        # Solid across the trace but not past a dot's edge on both sides: crossing traces and the ground symbol's bars are
+        occupied = sampler.lookup(sampler.ink, probes).all(axis=1) & ~sampler.lookup(sampler.ink, beyond).all(axis=1)
+        # A dot must also be solid over a disc around its center, which converging traces are not
+        discs = points[:, None, :] + self._dot_disc[None, :, :1] * tangents[:, None, :] + self._dot_disc[None, :, 1:] * normals[:, None, :]
+        solid = sampler.lookup(sampler.ink, discs).all(axis=1)
+        readings = self._groups_from_spacing(arcs, solid, start_padding) + [self._groups_from_runs(arcs, occupied, solid, start_padding)]
+        return [groups for k, groups in enumerate(readings) if groups and groups not in readings[:k]]
+
+    def _groups_from_runs(self, arcs: np.ndarray, occupied: np.ndarray, solid: np.ndarray, start_padding: float) -> list[int] | None:
+        """Groups from the dots found as separate runs of occupied samples, read off their spacing. Catches dots
+        the builder's exact spacing misses, e.g. on traces whose corners were rounded."""
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], occupied.astype(np.int8), [0]))))
+        # Runs much shorter than a dot are traces crossing this one
+        centers = [(arcs[start] + arcs[end - 1]) / 2 for start, end in zip(edges[::2], edges[1::2])
+                   if arcs[end - 1] - arcs[start] >= self.style.subnode_dot_radius * DOT_MIN_RUN_FACTOR and solid[(start + end - 1) // 2]]
+        if not centers or abs(centers[0] - start_padding) > DOT_POSITION_TOLERANCE: return None
+        intra, inter = self.style.subnode_intra_group_center_to_center_spacing, self.style.subnode_inter_group_center_to_center_spacing
+        groups = [1]
+        for previous, center in zip(centers[:-1], centers[1:]):
+            gap = center - previous
+            if abs(gap - intra) <= DOT_POSITION_TOLERANCE: groups[-1] += 1
+            elif abs(gap - inter) <= DOT_POSITION_TOLERANCE: groups.append(1)
+            elif gap > inter: break
+            else: return None
+        return groups
+
+    def _groups_from_spacing(self, arcs: np.ndarray, solid: np.ndarray, start_padding: float) -> list[list[int]]:
+        """Groups read at the builder's own spacing: a dot is taken wherever the builder would put the next one and
+        the ink there is solid. Holds up where dots touch other ink and don't separate into runs (clusters of
+        dots around a busy node, traces in both directions along one line). Where both the next dot of the group
+        and the first of a new group would be solid, both readings are followed, the former first."""
+        def solid_at(arc: float) -> bool:
+            index = int(round((arc - arcs[0]) / DOT_SAMPLE_STEP))
+            return 0 <= index < len(arcs) and abs(arcs[index] - arc) <= DOT_SAMPLE_STEP and bool(solid[index])
+        if not solid_at(start_padding): return []
+        intra, inter = self.style.subnode_intra_group_center_to_center_spacing, self.style.subnode_inter_group_center_to_center_spacing
+        readings = []; pending = [([1], start_padding)]
+        while pending and len(readings) < MAX_DOT_READINGS:
+            groups, arc = pending.pop()
+            steps = [(groups[:-1] + [groups[-1] + 1], arc + intra)] if solid_at(arc + intra) else []
+            if solid_at(arc + inter): steps.append((groups + [1], arc + inter))
+            if not steps: readings.append(groups)
+            pending.extend(reversed(steps))
+        return readings
+
+    def _letters(self, node_name: str, readings: list[list[int]]) -> tuple[str, ...]:
+        """The letters the dot readings stand for (a group of k dots is the node's k-th letter), in reading order.
+        A reading with more dots than the node has letters (another trace's dots run on along the path) stands
+        for its longest valid beginning."""
+        node_letters = self.board.node_letters.get(node_name, ())
+        options = []
+        for groups in readings:
+            letters = ''
+            for count in groups:
+                valid = [k for k in range(min(count, len(node_letters)), 0, -1) if node_letters[k - 1]]
+                if not valid: break
+                letters += node_letters[valid[0] - 1]
+                if valid[0] < count: break
+            if letters and letters not in options: options.append(letters)
+        return tuple(options)
+
+    def _extensions(self, sampler: _ImageSampler, state: _DecodeState, node_states: dict) -> list[_DecodeState]:
+        """Every next trace from the state's active node that the image supports, as new states."""
+        plan = state.plan; board = self.board
+        hypotheses = []
+        for node_name, letter in self._node_letter.items():
+            if node_name == plan.active_node_name or node_states.get(node_name) == NODE_EMPTY: continue
+            extended = extend_plan(plan, letter); trace = extended.traces[-1]
+            candidates = refined_route_candidates(trace.from_node_name, trace.to_node_name, trace.connect_from_ring_level, trace.connect_to_ring_level,
+                                                  board.positions, board, self.config.node_radius, self.config.ring_radius,
+                                                  trace.start_offset_idx, trace.end_offset_idx)
+            if len(candidates[0]) < 2: continue
+            hypotheses.append((extended, trace, candidates))
+        if not hypotheses: return []
+        # All candidate shapes of all hypotheses scored in one batch
+        coverage = self._coverage(sampler, [path for _, _, candidates in hypotheses for path in candidates])
+        extensions = []; first = 0
+        for extended, trace, candidates in hypotheses:
+            scores = coverage[first:first + len(candidates)]; first += len(candidates)
+            best = int(np.argmax(scores))
+            if scores[best] < MIN_TRACE_COVERAGE: continue
+            path = candidates[best]
+            letters = self._letters(trace.from_node_name, self._dot_readings(sampler, path, self.style.subnode_start_padding(trace.connect_from_ring_level)))
+            if not letters: continue
+            extensions.append(_DecodeState(state.score + float(scores[best]) * _path_length(path), extended, state.paths + (path,), state.visits + (letters,)))
+        return extensions
+
+    # --- Whole glyphs ---
+    def _candidate_layout(self, word: str, paths) -> tuple[dict, list]:
+        """Finalized layout of `word` with its traces on `paths` (as read from the image) instead of routed ones."""
+        glyph = build_glyph(word, self.config, quality=ROUTE_QUALITY_DRAFT)
+        traces = iter(paths)
+        elements = [dict(el, path_points=list(next(traces))) if el['type'] == 'trace' else el for el in glyph.elements]
+        return layout_glyph(elements, None, True, self.style, self.board), elements
+
+    def _finish(self, sampler: _ImageSampler, state: _DecodeState) -> tuple[tuple[str, ...], ...] | None:
+        """The readings of every node visit if the state's walk can end here: dots found along its ground trace."""
+        plan = state.plan
+        placeholder = ''.join(self._node_letter[name] for name in plan.node_sequence)
+        layout, elements = self._candidate_layout(placeholder, state.paths)
+        ground = layout['ground_trace']
+        if ground is None: return None
+        ring_level = next(el for el in elements if el['type'] == 'trace_to_ground').get('connect_from_ring_level', 0)
+        (x1, y1), (x2, y2) = ground['points']
+        length = math.hypot(x2 - x1, y2 - y1)
+        scan_end = (x1 + (x2 - x1) / length * GROUND_SCAN_LENGTH, y1 + (y2 - y1) / length * GROUND_SCAN_LENGTH)
+        letters = self._letters(plan.active_node_name, self._dot_readings(sampler, [(x1, y1), scan_end], self.style.subnode_start_padding(ring_level)))
+        return state.visits + (letters,) if letters else None
+
+    def _trimmed(self, node_name: str, letters: str) -> str | None:
+        """A visit's letters with its last dot removed, or None if that leaves no valid reading."""
+        count = self.board.letter_to_node_info[letters[-1]]['subnodes']
+        if count > 1:
+            shorter = self.board.node_letters[node_name][count - 2]
+            return letters[:-1] + shorter if shorter else None
+        return letters[:-1] or None
+
+    def _dots(self, word: str, paths) -> np.ndarray:
+        """(D, 2) centers of all subnode dots of `word` drawn with `paths`."""
+        layout, _ = self._candidate_layout(word, paths)
+        traces = layout['traces'] + ([layout['ground_trace']] if layout['ground_trace'] else [])
+        return np.array([dot for trace in traces for dot in trace['subnode_dots']], dtype=float).reshape(-1, 2)
+
+    def _score(self, sampler: _ImageSampler, word: str, paths, image_ink_cells: np.ndarray, grid_origin: np.ndarray,
+               grid_shape: tuple[int, int], node_states: dict, ring_counts: dict) -> tuple[float, float, float]:
+        """(score, precision, recall) of `word` drawn with `paths` against the image ink outside the nodes."""
+        layout, elements = self._candidate_layout(word, paths)
+        model = layout_ink_points(layout, self.style)
+        model = model[self._outside_nodes(model)]
+        if not len(model): return 0.0, 0.0, 0.0
+        precision = float(sampler.lookup(sampler.ink_dilated, model).mean())
+        cells = np.floor(model - grid_origin).astype(np.intp)
+        inside = (cells[:, 0] >= 0) & (cells[:, 0] < grid_shape[1]) & (cells[:, 1] >= 0) & (cells[:, 1] < grid_shape[0])
+        model_grid = np.zeros(grid_shape, dtype=bool); model_grid[cells[inside, 1], cells[inside, 0]] = True
+        model_grid = _dilate(model_grid, INK_MATCH_TOLERANCE)
+        recall = float(model_grid[image_ink_cells[:, 1], image_ink_cells[:, 0]].mean()) if len(image_ink_cells) else 1.0
+        score = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        expected_rings = {node['name']: len(node['ring_radii']) for node in layout['nodes']}
+        score *= RING_MISMATCH_PENALTY ** sum(1 for name, count in expected_rings.items() if count != ring_counts.get(name, 0))
+        null_modifier_node = layout['null_modifier']['node_name'] if layout['null_modifier'] else None
+        empty_nodes = {name for name, state in node_states.items() if state == NODE_EMPTY}
+        if empty_nodes != ({null_modifier_node} if null_modifier_node else set()): score *= NULL_MODIFIER_MISMATCH_PENALTY
+        return score, precision, recall
+
+    def _outside_nodes(self, points: np.ndarray) -> np.ndarray:
+        distance = np.hypot(points[:, None, 0] - self.node_centers[None, :, 0], points[:, None, 1] - self.node_centers[None, :, 1]).min(axis=1)
+        return distance > self.config.node_radius + NODE_EXCLUSION_MARGIN
+
+    def recognize(self, image: np.ndarray) -> Recognition:
+        """Decodes one image: an (H, W) gray or (H, W, 3/4) RGB(A) array."""
+        gray = to_gray(image)
+        try:
+            transform = locate_board(gray, self.board, self.config.node_radius)
+        except ValueError:
+            return Recognition(text="")
+        sampler = _ImageSampler(image, gray, transform)
+        node_states = self.node_states(sampler); ring_counts = self.ring_counts(sampler)
+
+        # Image ink outside the node discs, as cells of a conceptual-unit grid over the image
+        ink_y, ink_x = np.nonzero(sampler.ink)
+        ink_points = transform.to_conceptual(np.column_stack((ink_x, ink_y)).astype(float))
+        ink_points = ink_points[self._outside_nodes(ink_points)]
+        corners = transform.to_conceptual(np.array([(0.0, 0.0), (sampler.width, sampler.height)]))
+        grid_origin = np.floor(corners.min(axis=0))
+        grid_shape = tuple(int(v) + 1 for v in np.ceil(corners.max(axis=0) - grid_origin)[::-1])
+        image_ink_cells = np.unique(np.floor(ink_points - grid_origin).astype(np.intp), axis=0)
+
+        states = [_DecodeState(0.0, plan_word(letter, self.board), (), ()) for name, letter in self._node_letter.items() if node_states[name] != NODE_EMPTY]
+        finished = {}
+        for _ in range(MAX_DECODED_TRACES + 1):
+            for state in states:
+                readings = self._finish(sampler, state)
+                if readings: finished.setdefault(''.join(options[0] for options in readings), (state, readings))
+            states = sorted((extension for state in states for extension in self._extensions(sampler, state, node_states)),
+                            key=lambda state: -state.score)[:self.beam_width]
+            if not states: break
+
+        def score(visits, paths):
+            return self._score(sampler, ''.join(visits), paths, image_ink_cells, grid_origin, grid_shape, node_states, ring_counts)
+        best = None
+        for state, readings in finished.values():
+            visits = tuple(options[0] for options in readings)
+            result = score(visits, state.paths)
+            if best is None or result[0] > best[0][0]: best = (result, state, readings, visits)
+        if best is None:
+            return Recognition(text="", node_states=node_states, ring_counts=ring_counts, transform=transform)
+        (score_value, precision, recall), state, readings, visits = best
+
+        # Other readings of a visit's dots replace the first one where they explain the image better
+        for i, options in enumerate(readings):
+            for letters in options[1:]:
+                candidate = visits[:i] + (letters,) + visits[i + 1:]
+                result = score(candidate, state.paths)
+                if result[0] > score_value: (score_value, precision, recall), visits = result, candidate
+        # A dot chain can run on into another trace's dot lying on the path: drop trailing dots that the rest of
+        # the glyph already draws in the same place
+        node_sequence = state.plan.node_sequence
+        dots = self._dots(''.join(visits), state.paths); trimmed = False
+        while True:
+            best_trim = None
+            for i, letters in reversed(list(enumerate(visits))): # Ties go to the later trace, which is the one routed over the other's dot
+                shorter = self._trimmed(node_sequence[i], letters)
+                if shorter is None: continue
+                candidate = visits[:i] + (shorter,) + visits[i + 1:]
+                candidate_dots = self._dots(''.join(candidate), state.paths)
+                removed = dots[~np.isclose(dots[:, None, :], candidate_dots[None]).all(axis=2).any(axis=1)]
+                if len(removed) != 1 or not len(candidate_dots): continue
+                distance = np.hypot(*(candidate_dots - removed[0]).T).min()
+                if distance <= DOT_COINCIDENCE_TOLERANCE and (best_trim is None or distance < best_trim[0]): best_trim = (distance, candidate, candidate_dots)
+            if best_trim is None: break
+            _, visits, dots = best_trim; trimmed = True
+        if trimmed: score_value, precision, recall = score(visits, state.paths)
+        word = ''.join(visits)
+        plan = plan_word(word, self.board)
+        traces = tuple((trace.from_node_name, trace.to_node_name, letters) for trace, letters in zip(plan.traces, visits))
+        return Recognition(text=word, score=score_value, precision=precision, recall=recall, node_states=node_states, ring_counts=ring_counts,
+                           charge_node=plan.charge_node_name, ground_node=plan.ground_node_name, traces=traces, transform=transform)
+
+
+# --- Image files ---
+def read_netpbm(path: str) -> np.ndarray:
+    """Reads a binary PGM (P5) or PPM (P6) file, 8-bit, e.g. as written by usage_heatmap.write_ppm."""
+    with open(path, 'rb') as image_file: data = image_file.read()
+    fields = []; position = 0
+    while len(fields) < 4:
+        while data[position:position + 1].isspace(): position += 1
+        if data[position:position + 1] == b'#':
+            position = data.index(b'\n', position) + 1; continue
+        end = position
+        while not data[end:end + 1].isspace(): end += 1
+        fields.append(data[position:end]); position = end
+    magic, width, height, max_value = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+    if magic not in (b'P5', b'P6') or max_value > 255: raise ValueError(f"{path}: only 8-bit binary PGM/PPM is supported")
+    channels = 3 if magic == b'P6' else 1
+    pixels = np.frombuffer(data, dtype=np.uint8, count=width * height * channels, offset=position + 1)
+    return pixels.reshape((height, width, channels) if channels == 3 else (height, width))
+
+def load_image(path: str) -> np.ndarray:
+    """RGB (or gray) uint8 array of an image file. PGM/PPM are read directly; other formats (PNG, JPEG, ...)
+    need PyQt6, which is imported only then."""
+    if os.path.splitext(path)[1].lower() in ('.pgm', '.ppm', '.pnm'): return read_netpbm(path)
+    from PyQt6.QtGui import QImage # type: ignore
+    image = QImage(path)
+    if image.isNull(): raise ValueError(f"{path}: unreadable image")
+    image = image.convertToFormat(QImage.Format.Format_RGB888)
+    bits = image.constBits(); bits.setsize(image.sizeInBytes())
+    rows = np.frombuffer(bits, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * 3].reshape(image.height(), image.width(), 3).copy()
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.pgm', '.ppm', '.pnm')
+
+_worker_recognizer = None
+
+def _recognize_file(path: str) -> tuple[str, Recognition]:
+    global _worker_recognizer
+    if _worker_recognizer is None: _worker_recognizer = RasterGlyphRecognizer()
+    return path, _worker_recognizer.recognize(load_image(path))
+
+def recognize_folder(folder: str, workers: int | None = None):
+    """Yields (path, Recognition) for every image in `folder`, in name order, recognized by `workers` processes."""
+    paths = sorted(os.path.join(folder, name) for name in os.listdir(folder) if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS)
+    if workers == 1:
+        yield from map(_recognize_file, paths); return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(_recognize_file, paths, chunksize=4)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Decode a folder of Kohd glyph images back to text.")
+    parser.add_argument('folder')
+    parser.add_argument('--workers', type=int, default=None, help="recognizer processes (default: one per CPU)")
+    args = parser.parse_args()
+    start = time.perf_counter(); count = 0
+    for path, recognition in recognize_folder(args.folder, args.workers):
+        count += 1
+        print(f"{os.path.basename(path)}\t{recognition.text or '?'}\t{recognition.score:.3f}")
+    elapsed = time.perf_counter() - start
+    print(f"{count} images in {elapsed:.2f}s ({count / elapsed if elapsed else 0:.1f} images/s)")
@@ -0,0 +1,33 @@
+# kohd_translator/kohd_core/route_buffer.py
+#
+# All trace routes of one glyph packed into a single contiguous float64 buffer
+# (x0, y0, x1, y1, ...). Each trace refers to its points by a (start, end)
+# point-index span. Renderers take zero-copy memoryview slices of the buffer,
+# e.g. to fill a QPolygonF, instead of walking per-point Python tuples.
+# Buffers are only ever appended to, so a span stays valid for the buffer's
+# lifetime and glyphs extended or refined from one another can share one.
+from array import array
+
+
+class RouteBuffer:
+    def __init__(self):
+        self.coords = array('d')
+
+    def __len__(self) -> int:
+        return len(self.coords) // 2
+
+    def append(self, points) -> tuple[int, int]:
+        """Appends a path's (x, y) points and returns its point span."""
+        start = len(self)
+        for x, y in points:
+            self.coords.append(x); self.coords.append(y)
+        return start, len(self)
+
+    def view(self, span: tuple[int, int]) -> memoryview:
+        """Flat float64 view of a span's coordinates, sharing memory with the buffer."""
+        start, end = span
+        return memoryview(self.coords)[2 * start:2 * end]
+
+    def points(self, span: tuple[int, int]) -> list[tuple[float, float]]:
+        coords = self.view(span)
+        return [(coords[i], coords[i + 1]) for i in range(0, len(coords), 2)]
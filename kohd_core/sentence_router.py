@@ -0,0 +1,167 @@
+# kohd_translator/kohd_core/sentence_router.py
+#
+# Inter-word wiring for a sentence laid out by FlowLayout: the ground of each
+# word feeds the charge of the next. Every connection leaves its word's ground
+# down (or right, into the word gap) to the channel below its line, i.e. the
+# line gap the flow reserves, runs along a horizontal track there and rises or
+# drops to the next word's charge through the gap just left of that word.
+# Tracks are assigned per channel with the constrained left-edge algorithm:
+# nets sorted by left end, packed greedily into tracks from the top, a net
+# only taking a track once every net that must sit above it (shared pin
+# column, vertical constraint graph) is placed. Each channel is solved once
+# for all of its nets, so routing a sentence is O(n log n) in its length
+# rather than one search per connection. A FROM_TO or IF_THEN connector
+# between two words becomes a node on that net's trunk.
+from dataclasses import dataclass, field
+
+from .flow_layout import FlowLayout
+
+# Vertical distance between tracks in a channel, in conceptual units; squeezed when a channel overflows
+DEFAULT_TRACK_PITCH = 6.0
+# Horizontal space kept between nets sharing a track
+NET_SPACING = 4.0
+# Length of trunk a connector node needs
+CONNECTOR_NODE_SIZE = 12.0
+# Lexicon glyphs that sit on the connection between two words
+CONNECTOR_LEXICON_KEYS = ('FROM_TO', 'IF_THEN')
+
+
+@dataclass(frozen=True)
+class InterWordNet:
+    from_index: int                # Word whose ground the net leaves
+    to_index: int                  # Word whose charge it enters
+    channel: int                   # Line index the channel lies below
+    track: int = 0
+    points: tuple = ()             # Polyline from the ground port to the charge port
+    connector: str | None = None   # Lexicon key of a node on the trunk (FROM_TO, IF_THEN), if any
+    connector_point: tuple | None = None
+
+
+@dataclass
+class SentenceRouting:
+    nets: list[InterWordNet] = field(default_factory=list)
+    channel_tracks: dict[int, int] = field(default_factory=dict) # Tracks used per channel
+    overflowed_channels: int = 0   # Channels whose tracks had to be squeezed below the track pitch
+    track_pitch: float = DEFAULT_TRACK_PITCH
+
+    @property
+    def required_line_gap(self) -> float:
+        """Line gap that would fit the busiest channel at full track pitch."""
+        return (max(self.channel_tracks.values(), default=0) + 1) * self.track_pitch
+
+    @property
+    def wire_length(self) -> float:
+        return sum(abs(x2 - x1) + abs(y2 - y1) for net in self.nets for (x1, y1), (x2, y2) in zip(net.points[:-1], net.points[1:]))
+
+
+def left_edge_tracks(intervals: list[tuple[float, float]], above: dict[int, set[int]] | None = None) -> list[int]:
+    """Constrained left-edge track assignment. intervals[k] is net k's (left, right) extent; above[k] holds the
+    nets that must get a smaller track (sit higher) than k. Returns each net's track, 0 being the top."""
+    above = above or {}
+    order = sorted(range(len(intervals)), key=lambda k: intervals[k])
+    tracks = [-1] * len(intervals)
+    unplaced = order
+    track = 0
+    while unplaced:
+        right_end = -float('inf'); left_over = []; placed_any = False
+        for k in unplaced:
+            left, right = intervals[k]
+            if left > right_end + NET_SPACING and all(0 <= tracks[other] < track for other in above.get(k, ())):
+                tracks[k] = track; right_end = right; placed_any = True
+            else:
+                left_over.append(k)
+        if not placed_any: # Cyclic constraints: give the leftmost remaining net a track of its own (it will share a column)
+            tracks[left_over[0]] = track; left_over = left_over[1:]
+        unplaced = left_over; track += 1
+    return tracks
+
+
+def route_sentence(flow: FlowLayout, connectors: dict[int, str] | None = None, track_pitch: float = DEFAULT_TRACK_PITCH) -> SentenceRouting:
+    """Wires word i's ground to word i + 1's charge for the whole flow. connectors maps i to a lexicon key
+    (FROM_TO, IF_THEN) placed on that connection. Words without the needed port are not connected."""
+    connectors = connectors or {}
+    # One pass over the placed words: box, ports and line of each
+    words = []
+    for line_index, line in enumerate(flow.lines):
+        for index in range(line.start, line.end):
+            box = flow.boxes[index]
+            origin_x = line.x_offsets[index - line.start] - box.bounds[0]; origin_y = line.y - box.bounds[1]
+            ports = {name: (origin_x + point[0], origin_y + point[1]) if point else None for name, point in box.ports.items()}
+            words.append((line_index, origin_x + box.bounds[0], origin_x + box.bounds[2], origin_y + box.bounds[3], ports))
+
+    pending = {} # channel -> [(from_index, ground, exit_x, riser_x, charge, enters_from_below, connector)]
+    for index in range(len(words) - 1):
+        line_index, _, right, bottom, ports = words[index]
+        next_line_index, next_left, _, _, next_ports = words[index + 1]
+        ground, charge = ports['ground'], next_ports['charge']
+        if ground is None or charge is None: continue
+        # Leave the word through whichever box edge the ground is nearer, so the trace doesn't cross the word's own glyph
+        exit_x = ground[0] if bottom - ground[1] <= right - ground[0] else right + flow.word_gap / 2
+        riser_x = next_left - flow.word_gap / 2 # In the gap left of the next word's box
+        pending.setdefault(line_index, []).append((index, ground, exit_x, riser_x, charge, next_line_index > line_index, connectors.get(index)))
+
+    routing = SentenceRouting(track_pitch=track_pitch)
+    for channel, channel_nets in sorted(pending.items()):
+        intervals = []
+        for _, _, exit_x, riser_x, _, _, connector in channel_nets:
+            left, right = min(exit_x, riser_x), max(exit_x, riser_x)
+            if connector and right - left < CONNECTOR_NODE_SIZE: right = left + CONNECTOR_NODE_SIZE
+            intervals.append((left, right))
+        # Vertical constraints: where one net drops from the top of the channel and another rises from the bottom
+        # in the same column, the top one must be on a higher track
+        top_pins = {round(net[2], 3): k for k, net in enumerate(channel_nets)}
+        top_pins.update({round(net[3], 3): k for k, net in enumerate(channel_nets) if not net[5]})
+        above = {}
+        for k, net in enumerate(channel_nets):
+            other = top_pins.get(round(net[3], 3)) if net[5] else None
+            if other is not None and other != k: above.setdefault(k, set()).add(other)
+        tracks = left_edge_tracks(intervals, above)
+
+        line = flow.lines[channel]
+        channel_top = line.y + line.height
+        track_count = max(tracks) + 1
+        pitch = min(track_pitch, flow.line_gap / (track_count + 1))
+        if pitch < track_pitch: routing.overflowed_channels += 1
+        routing.channel_tracks[channel] = track_count
+        for k, (index, ground, exit_x, riser_x, charge, _, connector) in enumerate(channel_nets):
+            track_y = channel_top + pitch * (tracks[k] + 1)
+            if exit_x == riser_x and not connector: # Right exit into the gap the next word's charge rises from: no trunk needed
+                points = (ground, (exit_x, ground[1]), (riser_x, charge[1]), charge)
+            else:
+                points = (ground, (exit_x, ground[1]), (exit_x, track_y), (riser_x, track_y), (riser_x, charge[1]), charge)
+            points = tuple(point for n, point in enumerate(points) if not n or point != points[n - 1])
+            connector_point = ((intervals[k][0] + intervals[k][1]) / 2, track_y) if connector else None
+            routing.nets.append(InterWordNet(from_index=index, to_index=index + 1, channel=channel, track=tracks[k], points=points,
+                                             connector=connector, connector_point=connector_point))
+    routing.nets.sort(key=lambda net: net.from_index)
+    return routing
+
+
+def sentence_words_and_connectors(tokens) -> tuple[list[str], dict[int, str]]:
+    """Splits a token stream (kohd_core.tokenizer) into the words to lay out and the connectors between them:
+    a FROM_TO or IF_THEN lexicon token after word i becomes connectors[i]."""
+    from .tokenizer import TOKEN_WORD, TOKEN_LEXICON
+    words, connectors = [], {}
+    for token in tokens:
+        if token.kind == TOKEN_WORD: words.append(token.key)
+        elif token.kind == TOKEN_LEXICON and token.key in CONNECTOR_LEXICON_KEYS and words: connectors[len(words) - 1] = token.key
+    return words, connectors
+
+
+if __name__ == '__main__':
+    import time
+    import random
+    import string
+    rng = random.Random(0)
+    vocabulary = [''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(2, 9))) for _ in range(300)]
+    flow = FlowLayout(max_line_width=3000.0)
+    for length in (250, 1000, 4000, 16000):
+        words = [rng.choice(vocabulary) for _ in range(length)]
+        connectors = {i: rng.choice(CONNECTOR_LEXICON_KEYS) for i in range(0, length - 1, 7)}
+        flow.set_words(words) # Glyphs are built once per distinct word and cached by the flow
+        start = time.perf_counter()
+        routing = route_sentence(flow, connectors)
+        elapsed = time.perf_counter() - start
+        print(f"{length} words, {len(flow.lines)} lines: {len(routing.nets)} nets in {elapsed * 1e3:.1f} ms "
+              f"({elapsed / len(routing.nets) * 1e6:.1f} us/net), max {max(routing.channel_tracks.values())} tracks, "
+              f"{routing.overflowed_channels} overflowed channels, wire {routing.wire_length:.0f}")
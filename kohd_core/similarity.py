@@ -0,0 +1,170 @@
+# kohd_translator/kohd_core/similarity.py
+#
+# Visual fingerprints and a nearest-neighbour index for finding words whose
+# glyphs look alike. A glyph's distinguishing ink (traces, rings, subnode dots,
+# indicators, null modifier - the bare node grid is common to every glyph and
+# left out) is sampled into points, binned on a coarse blurred grid and
+# L2-normalized, so the dot product of two fingerprints is their cosine
+# similarity. SimilarityIndex buckets fingerprints with random-hyperplane LSH
+# over several tables and reranks the candidates exactly.
+import math
+
+import numpy as np
+
+from .glyph_builder import build_glyph, GlyphConfig, DEFAULT_GLYPH_CONFIG
+from .board import Board, DEFAULT_BOARD
+from .glyph_layout import GlyphStyle, layout_glyph
+
+FEATURE_GRID = 24                    # Cells per side of the ink grid
+FEATURE_MARGIN = 15.0                # Conceptual units the grid reaches past the board's extent, for indicators
+SAMPLE_STEP = 2.0                    # Conceptual units between ink samples along lines
+RING_FEATURE_WEIGHT = 0.5            # Weight of the per-node ring-count block relative to the ink grid
+
+DEFAULT_NUM_TABLES = 8
+DEFAULT_BITS_PER_TABLE = 14
+DEFAULT_PROBE_BITS = 3               # Least-certain bits flipped per table when probing neighbouring buckets
+
+
+def feature_dim(board: Board = DEFAULT_BOARD) -> int:
+    """Length of a fingerprint of a glyph on `board`: the ink grid plus one ring count per node."""
+    return FEATURE_GRID * FEATURE_GRID + board.num_nodes
+
+def _sample_polyline(points, step: float = SAMPLE_STEP) -> list[np.ndarray]:
+    samples = []
+    for (x1, y1), (x2, y2) in zip(points[:-1], points[1:]):
+        count = max(2, int(math.hypot(x2 - x1, y2 - y1) / step) + 1)
+        t = np.linspace(0.0, 1.0, count)
+        samples.append(np.column_stack((x1 + (x2 - x1) * t, y1 + (y2 - y1) * t)))
+    return samples
+
+def _sample_circle(center, radius: float, step: float = SAMPLE_STEP) -> np.ndarray:
+    count = max(8, int(2 * math.pi * radius / step))
+    theta = np.linspace(0.0, 2 * math.pi, count, endpoint=False)
+    return np.column_stack((center[0] + radius * np.cos(theta), center[1] + radius * np.sin(theta)))
+
+def layout_ink_points(layout: dict, style: GlyphStyle) -> np.ndarray:
+    """(M, 2) sample points along everything that distinguishes this glyph from the bare node grid."""
+    samples = []
+    for node in layout['nodes']:
+        samples += [_sample_circle(node['center'], ring_r) for ring_r in node['ring_radii']]
+    for trace in layout['traces'] + ([layout['ground_trace']] if layout['ground_trace'] else []):
+        samples += _sample_polyline(trace['points'])
+        samples += [_sample_circle(dot, style.subnode_dot_radius, SAMPLE_STEP / 2) for dot in trace['subnode_dots']]
+    if layout['charge_indicator']:
+        samples += _sample_polyline(list(layout['charge_indicator']['lead_line'])) + _sample_polyline(layout['charge_indicator']['zigzag_points'])
+    if layout['ground_indicator']:
+        for segment in layout['ground_indicator']['segments']: samples += _sample_polyline(list(segment))
+    null_modifier = layout['null_modifier']
+    if null_modifier:
+        samples.append(_sample_circle(null_modifier['center'], style.node_radius))
+        for segment in null_modifier['cross_lines']: samples += _sample_polyline(list(segment))
+    return np.concatenate(samples) if samples else np.empty((0, 2))
+
+def glyph_fingerprint(glyph_elements: list, active_node_name: str = None, is_finalized: bool = True,
+                      style: GlyphStyle | None = None, board: Board = DEFAULT_BOARD) -> np.ndarray:
+    """L2-normalized float32 feature vector of a glyph's appearance, feature_dim(board) long."""
+    style = style or GlyphStyle()
+    layout = layout_glyph(glyph_elements, active_node_name, is_finalized, style, board)
+    points = layout_ink_points(layout, style)
+    extent_x, extent_y = board.extent
+    grid, _, _ = np.histogram2d(points[:, 1], points[:, 0], bins=FEATURE_GRID,
+                                range=((-FEATURE_MARGIN, extent_y + FEATURE_MARGIN), (-FEATURE_MARGIN, extent_x + FEATURE_MARGIN)))
+    # [1, 2, 1] blur along both axes so strokes one cell apart still overlap
+    grid = np.pad(grid, 1)
+    grid = grid[:-2] + 2 * grid[1:-1] + grid[2:]
+    grid = grid[:, :-2] + 2 * grid[:, 1:-1] + grid[:, 2:]
+    grid = np.sqrt(grid).ravel() # Damp long strokes so short distinguishing marks still count
+    grid_norm = np.linalg.norm(grid)
+    if grid_norm > 0: grid /= grid_norm
+    ring_counts = {node['name']: len(node['ring_radii']) for node in layout['nodes']}
+    rings = np.array([ring_counts.get(name, 0) for name in board.node_names], dtype=float) * RING_FEATURE_WEIGHT
+    features = np.concatenate((grid, rings)).astype(np.float32)
+    norm = np.linalg.norm(features)
+    return features / norm if norm > 0 else features
+
+def word_fingerprint(word: str, config: GlyphConfig = DEFAULT_GLYPH_CONFIG) -> np.ndarray:
+    glyph = build_glyph(word, config)
+    return glyph_fingerprint(list(glyph.elements), None, True, GlyphStyle(config.node_radius), config.board)
+
+
+class SimilarityIndex:
+    """Approximate nearest-neighbour search over word fingerprints (cosine similarity)."""
+    def __init__(self, num_tables: int = DEFAULT_NUM_TABLES, bits_per_table: int = DEFAULT_BITS_PER_TABLE,
+                 probe_bits: int = DEFAULT_PROBE_BITS, config: GlyphConfig = DEFAULT_GLYPH_CONFIG, seed: int = 0):
+        self.num_tables = num_tables; self.bits_per_table = bits_per_table; self.probe_bits = probe_bits
+        self.config = config
+        rng = np.random.default_rng(seed)
+        self.feature_dim = feature_dim(config.board)
+        self.hyperplanes = rng.standard_normal((num_tables * bits_per_table, self.feature_dim)).astype(np.float32)
+        self._bit_weights = (1 << np.arange(bits_per_table, dtype=np.int64))
+        self.words: list[str] = []
+        self.features = np.empty((0, self.feature_dim), dtype=np.float32)
+        self._tables: list[dict[int, np.ndarray]] = []
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _projections(self, features: np.ndarray) -> np.ndarray:
+        """(N, tables, bits) signed distances to each table's hyperplanes."""
+        return (features @ self.hyperplanes.T).reshape(len(features), self.num_tables, self.bits_per_table)
+
+    def _codes(self, projections: np.ndarray) -> np.ndarray:
+        return ((projections > 0) * self._bit_weights).sum(axis=-1)
+
+    def build(self, words, features: np.ndarray | None = None):
+        """Indexes `words`; pass precomputed fingerprints (N, feature_dim) to skip building glyphs."""
+        self.words = list(words)
+        self.features = features.astype(np.float32) if features is not None else \
+            np.stack([word_fingerprint(word, self.config) for word in self.words]) if self.words else np.empty((0, self.feature_dim), np.float32)
+        codes = self._codes(self._projections(self.features))
+        self._tables = []
+        for table in range(self.num_tables):
+            order = np.argsort(codes[:, table], kind='stable')
+            unique_codes, starts = np.unique(codes[order, table], return_index=True)
+            self._tables.append(dict(zip(unique_codes.tolist(), np.split(order, starts[1:]))))
+        return self
+
+    def _candidates(self, query: np.ndarray) -> np.ndarray:
+        projections = self._projections(query[None])[0]
+        codes = self._codes(projections)
+        found = []
+        for table in range(self.num_tables):
+            probe_codes = [int(codes[table])]
+            # Multi-probe: also visit buckets across the hyperplanes the query is closest to
+            for bit in np.argsort(np.abs(projections[table]))[:self.probe_bits]:
+                probe_codes.append(int(codes[table]) ^ (1 << int(bit)))
+            found += [self._tables[table][code] for code in probe_codes if code in self._tables[table]]
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def query_vector(self, query: np.ndarray, k: int = 10, exclude: set[str] | None = None, exact: bool = False) -> list[tuple[str, float]]:
+        """The k indexed words most similar to fingerprint `query`, as (word, cosine similarity), best first."""
+        candidates = np.arange(len(self.words)) if exact else self._candidates(query)
+        if exclude:
+            candidates = candidates[[self.words[i] not in exclude for i in candidates]] if len(candidates) else candidates
+        if len(candidates) < k and not exact: # Sparse buckets: fall back to a full scan
+            return self.query_vector(query, k, exclude, exact=True)
+        similarity = self.features[candidates] @ query
+        top = np.argsort(-similarity, kind='stable')[:k]
+        return [(self.words[candidates[i]], float(similarity[i])) for i in top]
+
+    def query(self, word: str, k: int = 10, include_self: bool = False, exact: bool = False) -> list[tuple[str, float]]:
+        """Indexed words whose glyphs look closest to `word`'s glyph."""
+        return self.query_vector(word_fingerprint(word, self.config), k, None if include_self else {word.upper()}, exact)
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    import random
+    import string
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding='utf-8') as wordlist_file:
+            vocabulary = sorted({line.strip().upper() for line in wordlist_file if line.strip().isalpha()})
+    else:
+        rng = random.Random(0)
+        vocabulary = sorted({''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(2, 8))) for _ in range(5000)})
+    start = time.perf_counter(); index = SimilarityIndex().build(vocabulary)
+    print(f"indexed {len(index)} words in {time.perf_counter() - start:.1f}s")
+    for word in vocabulary[:5]:
+        start = time.perf_counter(); neighbours = index.query(word, k=5)
+        print(f"{word}: {(time.perf_counter() - start) * 1e3:.2f} ms ->", ', '.join(f"{w} {s:.3f}" for w, s in neighbours))
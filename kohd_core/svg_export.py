@@ -0,0 +1,111 @@
+# kohd_translator/kohd_core/svg_export.py
+#
+# Headless SVG output for glyphs, drawn from the same layout as the Qt canvas.
+# Colours follow the Qt named colours the canvas uses. Indicator symbols are
+# written once into <defs> from the shared symbol templates and placed with <use>.
+from xml.sax.saxutils import escape
+
+from .board import Board, DEFAULT_BOARD
+from .glyph_layout import GlyphStyle, layout_glyph, symbol_templates
+
+NODE_FILL_COLOR = '#c0c0c0'        # Qt lightGray
+ACTIVE_NODE_FILL_COLOR = '#ffff00' # Qt yellow
+RING_COLOR = '#000080'             # Qt darkBlue
+NULL_MODIFIER_COLOR = '#808080'    # Qt darkGray
+INK_COLOR = '#000000'
+
+
+def _fmt(value: float) -> str:
+    return f"{value:.2f}".rstrip('0').rstrip('.')
+
+def _line(p1, p2, color: str, width: float) -> str:
+    return f'<line x1="{_fmt(p1[0])}" y1="{_fmt(p1[1])}" x2="{_fmt(p2[0])}" y2="{_fmt(p2[1])}" stroke="{color}" stroke-width="{_fmt(width)}"/>'
+
+def _circle(center, radius: float, fill: str, stroke: str | None = None, width: float = 0.0) -> str:
+    stroke_attrs = f' stroke="{stroke}" stroke-width="{_fmt(width)}"' if stroke else ''
+    return f'<circle cx="{_fmt(center[0])}" cy="{_fmt(center[1])}" r="{_fmt(radius)}" fill="{fill}"{stroke_attrs}/>'
+
+def _polyline(points, color: str, width: float, fill: str = 'none') -> str:
+    point_list = ' '.join(f"{_fmt(x)},{_fmt(y)}" for x, y in points)
+    return f'<polyline points="{point_list}" fill="{fill}" stroke="{color}" stroke-width="{_fmt(width)}"/>'
+
+def _symbol_def(name: str, template, color: str, width: float) -> str:
+    parts = [f'<g id="kohd-{name}">']
+    parts += [_polyline(points, color, width, fill=color) for points in template.fills]
+    parts += [_polyline(points, color, width) for points in template.strokes]
+    parts.append('</g>')
+    return ''.join(parts)
+
+def _use_symbol(name: str, anchor, angle_deg: float = 0.0) -> str:
+    rotation = f' rotate({_fmt(-angle_deg)})' if angle_deg else ''
+    return f'<use href="#kohd-{name}" transform="translate({_fmt(anchor[0])} {_fmt(anchor[1])}){rotation}"/>'
+
+
+def layout_to_svg(layout: dict, style: GlyphStyle | None = None, size_px: float | None = None, board: Board = DEFAULT_BOARD) -> str:
+    """SVG of a layout made on `board`; the viewBox is the board's extent and size_px its width in pixels."""
+    style = style or GlyphStyle()
+    node_radius = style.node_radius
+    width, height = board.extent
+    size_attrs = f' width="{_fmt(size_px)}" height="{_fmt(size_px * height / width)}"' if size_px else ''
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {_fmt(width)} {_fmt(height)}"{size_attrs}>',
+             f'<rect width="{_fmt(width)}" height="{_fmt(height)}" fill="#ffffff"/>']
+
+    indicator_width = style.trace_pen_width * 0.8
+    templates = symbol_templates(style)
+    symbol_defs = []
+    if layout['charge_indicator']: symbol_defs.append(_symbol_def('charge', templates['charge'], INK_COLOR, indicator_width))
+    if layout['ground_indicator']: symbol_defs.append(_symbol_def('ground', templates['ground'], INK_COLOR, indicator_width))
+    if layout['null_modifier']:
+        symbol_defs.append(_symbol_def('null_modifier_cross', templates['null_modifier_cross'], NULL_MODIFIER_COLOR, style.trace_pen_width * 0.9))
+    if symbol_defs: parts.append('<defs>' + ''.join(symbol_defs) + '</defs>')
+
+    for node in layout['nodes']:
+        parts.append(_circle(node['center'], node_radius, ACTIVE_NODE_FILL_COLOR if node['is_active'] else NODE_FILL_COLOR,
+                             INK_COLOR, style.node_outline_pen_width))
+        for ring_r in node['ring_radii']:
+            parts.append(_circle(node['center'], ring_r, 'none', RING_COLOR, style.ring_pen_width))
+
+    traces = layout['traces'] + ([layout['ground_trace']] if layout['ground_trace'] else [])
+    for trace in traces:
+        if len(trace['points']) >= 2:
+            parts.append(_polyline(trace['points'], INK_COLOR, style.trace_pen_width))
+        for dot in trace['subnode_dots']:
+            parts.append(_circle(dot, style.subnode_dot_radius, INK_COLOR, INK_COLOR, 1))
+
+    charge = layout['charge_indicator']
+    if charge:
+        parts.append(_use_symbol('charge', charge['anchor'], charge['angle_deg']))
+    ground = layout['ground_indicator']
+    if ground:
+        parts.append(_use_symbol('ground', ground['attach_point'], ground['angle_deg']))
+
+    null_modifier = layout['null_modifier']
+    if null_modifier:
+        parts.append(_circle(null_modifier['center'], node_radius, 'none', NULL_MODIFIER_COLOR, style.node_outline_pen_width))
+        parts.append(_use_symbol('null_modifier_cross', null_modifier['center']))
+        if null_modifier['pointer_line']:
+            parts.append(_line(null_modifier['pointer_line'][0], null_modifier['pointer_line'][1], NULL_MODIFIER_COLOR, style.ring_pen_width * 0.7))
+        if null_modifier['pointer_circle_center']:
+            parts.append(_circle(null_modifier['pointer_circle_center'], style.null_modifier_pointer_line_radius, 'none', NULL_MODIFIER_COLOR, style.ring_pen_width * 0.6))
+
+    font_px = style.font_size * 4 / 3 # Points to px at 96 DPI
+    for node in layout['nodes']:
+        cx, cy = node['center']
+        parts.append(f'<text x="{_fmt(cx)}" y="{_fmt(cy)}" font-size="{_fmt(font_px)}" text-anchor="middle" '
+                     f'dominant-baseline="central" font-family="sans-serif">{escape(node["name"])}</text>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+def glyph_to_svg(glyph_elements: list, active_node_name: str = None, is_finalized: bool = True,
+                 style: GlyphStyle | None = None, size_px: float | None = None, board: Board = DEFAULT_BOARD) -> str:
+    style = style or GlyphStyle()
+    return layout_to_svg(layout_glyph(glyph_elements, active_node_name, is_finalized, style, board), style, size_px, board)
+
+
+if __name__ == '__main__':
+    from .glyph_builder import KohdGlyphBuilder
+    demo_style = GlyphStyle()
+    builder = KohdGlyphBuilder(node_radius=demo_style.node_radius, get_ring_radius_method=demo_style.ring_radius)
+    for letter in "MOTHERBOARD": builder.add_letter(letter)
+    builder.finalize_word()
+    print(glyph_to_svg(builder.get_glyph_elements(), style=demo_style))
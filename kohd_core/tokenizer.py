@@ -0,0 +1,187 @@
+# kohd_translator/kohd_core/tokenizer.py
+#
+# Streaming tokenizer for running text. Input is Unicode-normalized (NFKD with
+# combining marks dropped, so "café" reads as "cafe") and split into words and
+# punctuation. Words are fed through an Aho-Corasick automaton over word ids
+# whose patterns are the lexicon phrases (LEXICON_PHRASES) and the articles,
+# so every phrase occurrence is found in one linear pass. Overlapping matches
+# are resolved leftmost-longest ("there exists exactly one" over "there
+# exists"); words are held back only while they could still start a match.
+# Punctuation ends any phrase in progress, hyphens and whitespace don't
+# ("if-then" is "if then"); any other character is dropped and also ends it.
+import re
+import unicodedata
+from typing import NamedTuple
+
+from .kohd_rules import LEXICON_PHRASES, ARTICLE_GLYPHS, PUNCTUATION_GLYPH_TYPES
+
+TOKEN_WORD = 'word'
+TOKEN_LEXICON = 'lexicon'
+TOKEN_ARTICLE = 'article'
+TOKEN_PUNCTUATION = 'punctuation'
+
+# One regex pass per chunk: a run of letters, a punctuation mark, or a run of anything that
+# breaks phrases (digits, symbols). Whitespace and hyphens are skipped between matches
+_PUNCTUATION_CLASS = re.escape(''.join(PUNCTUATION_GLYPH_TYPES))
+# Combining marks left by NFKD (diacritics, and their supplement/extended blocks)
+COMBINING_MARKS_PATTERN = re.compile("[\u0300-\u036f\u1ab0-\u1aff\u1dc0-\u1dff\u20d0-\u20ff\ufe20-\ufe2f]")
+TOKEN_PATTERN = re.compile(r"([^\W\d_]+(?:['’][^\W\d_]+)*)|([" + _PUNCTUATION_CLASS + r"])|([^\s\w\-‐-―" + _PUNCTUATION_CLASS + r"]+|[\d_]+)")
+
+
+class Token(NamedTuple): # A NamedTuple rather than a dataclass: batch mode creates millions
+    kind: str  # TOKEN_WORD, TOKEN_LEXICON, TOKEN_ARTICLE or TOKEN_PUNCTUATION
+    text: str  # Normalized surface text ("There is", "café" -> "cafe")
+    key: str   # Uppercase word, LEXICON_GLYPHS / ARTICLE_GLYPHS key, or punctuation glyph type
+
+
+def normalize_text(text: str) -> str:
+    """NFKD with combining marks removed, e.g. ligatures split and accents dropped."""
+    decomposed = unicodedata.normalize('NFKD', text)
+    if decomposed.isascii(): return decomposed
+    return COMBINING_MARKS_PATTERN.sub('', decomposed)
+
+
+class PhraseAutomaton:
+    """Aho-Corasick automaton over words. Patterns are tuples of casefolded words."""
+    def __init__(self, patterns: dict[tuple[str, ...], tuple[str, str]]):
+        self.word_ids: dict[str, int] = {}
+        self.goto: list[dict[int, int]] = [{}]
+        self.depth = [0]
+        self.fail = [0]
+        self.hold: list[int] = [] # Per state: words to hold back, the depth of the longest suffix that can still grow into a match
+        self.outputs: list[tuple[tuple[int, str, str], ...]] = [()] # (pattern length, kind, key) ending at each state
+        for words, (kind, key) in patterns.items():
+            state = 0
+            for word in words:
+                word_id = self.word_ids.setdefault(word, len(self.word_ids))
+                next_state = self.goto[state].get(word_id)
+                if next_state is None:
+                    next_state = self.goto[state][word_id] = len(self.goto)
+                    self.goto.append({}); self.depth.append(self.depth[state] + 1); self.fail.append(0); self.outputs.append(())
+                state = next_state
+            self.outputs[state] += ((len(words), kind, key),)
+        # Breadth-first fail links; outputs inherit those of their fail state
+        queue = list(self.goto[0].values())
+        for state in queue:
+            for word_id, next_state in self.goto[state].items():
+                fallback = self.fail[state]
+                while fallback and word_id not in self.goto[fallback]: fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(word_id, 0)
+                self.outputs[next_state] += self.outputs[self.fail[next_state]]
+                queue.append(next_state)
+        for state in range(len(self.goto)):
+            extensible = state
+            while extensible and not self.goto[extensible]: extensible = self.fail[extensible]
+            self.hold.append(self.depth[extensible])
+
+    def step(self, state: int, word: str) -> int:
+        word_id = self.word_ids.get(word)
+        if word_id is None: return 0 # Not in any pattern
+        while state and word_id not in self.goto[state]: state = self.fail[state]
+        return self.goto[state].get(word_id, 0)
+
+
+def _default_patterns() -> dict[tuple[str, ...], tuple[str, str]]:
+    patterns = {tuple(phrase.split()): (TOKEN_LEXICON, key) for phrase, key in LEXICON_PHRASES.items()}
+    patterns.update({(article.casefold(),): (TOKEN_ARTICLE, article) for article in ARTICLE_GLYPHS})
+    return patterns
+
+DEFAULT_AUTOMATON = PhraseAutomaton(_default_patterns())
+
+
+class Tokenizer:
+    """Incremental tokenizer: feed() text chunks in order, then flush(). Each returns the tokens now settled.
+    A word split across chunks is joined, so chunks may be cut anywhere."""
+    def __init__(self, automaton: PhraseAutomaton = DEFAULT_AUTOMATON):
+        self.automaton = automaton
+        self._carry = ""
+        self._state = 0
+        self._pending: list[str] = []         # Words that may still be part of a phrase
+        self._matches: dict[int, tuple] = {}  # Pending index -> longest (length, kind, key) match starting there
+
+    def feed(self, chunk: str) -> list[Token]:
+        text = self._carry + chunk
+        # Hold back a trailing partial word (or a base letter whose combining marks may follow)
+        cut = len(text)
+        while cut and not (text[cut - 1].isspace() or text[cut - 1] in PUNCTUATION_GLYPH_TYPES): cut -= 1
+        self._carry = text[cut:]
+        return self._tokenize(normalize_text(text[:cut])) if cut else []
+
+    def flush(self) -> list[Token]:
+        tokens = self._tokenize(normalize_text(self._carry)) if self._carry else []
+        self._carry = ""
+        self._settle(len(self._pending), tokens); self._state = 0
+        return tokens
+
+    def _tokenize(self, text: str) -> list[Token]:
+        tokens = []; append = tokens.append
+        automaton = self.automaton; word_ids = automaton.word_ids; pending = self._pending
+        for word, mark, other in TOKEN_PATTERN.findall(text):
+            if not word: # Punctuation or other characters end any phrase in progress
+                if pending: self._settle(len(pending), tokens)
+                self._state = 0
+                if mark: append(Token(TOKEN_PUNCTUATION, mark, PUNCTUATION_GLYPH_TYPES[mark]))
+                continue
+            folded = word.casefold()
+            if folded not in word_ids and not pending: # Fast path: a plain word with nothing pending
+                self._state = 0; append(Token(TOKEN_WORD, word, word.upper())); continue
+            state = self._state = automaton.step(self._state, folded)
+            pending.append(word)
+            end = len(pending)
+            for length, kind, key in automaton.outputs[state]:
+                start = end - length
+                if length > self._matches.get(start, (0,))[0]: self._matches[start] = (length, kind, key)
+            # Pending words before the longest phrase prefix that can still grow can no longer start a match
+            if end > automaton.hold[state]: self._settle(end - automaton.hold[state], tokens)
+        return tokens
+
+    def _settle(self, frontier: int, tokens: list[Token]):
+        """Emits pending words before index `frontier`, leftmost-longest matches taking precedence."""
+        pending = self._pending; matches = self._matches
+        i = 0
+        while i < frontier:
+            match = matches.get(i)
+            if match:
+                length, kind, key = match
+                tokens.append(Token(kind, ' '.join(pending[i:i + length]), key)); i += length
+            else:
+                tokens.append(Token(TOKEN_WORD, pending[i], pending[i].upper())); i += 1
+        if not i: return
+        del pending[:i]
+        if i > frontier: # A match ran into the phrase in progress: restart from the words left after it
+            self._state = 0
+            for word in pending: self._state = self.automaton.step(self._state, word.casefold())
+        self._matches = {start - i: match for start, match in matches.items() if start >= i}
+
+
+def tokenize(chunks, automaton: PhraseAutomaton = DEFAULT_AUTOMATON):
+    """Yields the tokens of an iterable of text chunks (lines, file blocks, ...), in order."""
+    tokenizer = Tokenizer(automaton)
+    for chunk in chunks:
+        yield from tokenizer.feed(chunk)
+    yield from tokenizer.flush()
+
+def tokenize_string(text: str) -> list[Token]:
+    return list(tokenize((text,)))
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    import random
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], encoding='utf-8') as text_file: corpus = text_file.read()
+    else:
+        rng = random.Random(0)
+        vocabulary = ["the", "a", "there", "is", "exists", "exactly", "one", "if", "then", "because", "cat", "naïve",
+                      "Café", "board", "mother", "from", "to", "you", "all", "signal", "ground", "trace"]
+        corpus = ''.join(rng.choice(vocabulary) + rng.choice([" ", " ", " ", ", ", ". ", "-", "\n"]) for _ in range(400_000))
+    print(' '.join(f"{t.key}:{t.kind[0]}" for t in tokenize_string("If-then the café; there exists exactly one, A cat!")))
+    block = 1 << 16
+    start = time.perf_counter()
+    counts = {}
+    for token in tokenize(corpus[i:i + block] for i in range(0, len(corpus), block)):
+        counts[token.kind] = counts.get(token.kind, 0) + 1
+    elapsed = time.perf_counter() - start
+    megabytes = len(corpus.encode('utf-8')) / 1e6
+    print(f"{megabytes:.1f} MB in {elapsed:.2f}s: {megabytes / elapsed:.2f} MB/s, {counts}")
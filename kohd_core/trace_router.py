@@ -1,21 +1,37 @@
 # kohd_translator/kohd_core/trace_router.py
 import math
 
+import numpy as np
+
+from .board import Board
+
 # Threshold for considering points equal
 POINT_CLOSE_TOLERANCE = 1e-3
 # Tolerance for alignment checks (e.g. H/V alignment)
 ALIGN_TOLERANCE = 0.1
 # Minimum acceptable stub length, to prevent zero or negative length stubs
 MIN_STUB_LENGTH_THRESHOLD_FACTOR = 0.05 # Factor of node_radius
-
-def _get_node_rc(node_name: str, node_layout: list[list[str]]) -> tuple[int | None, int | None]:
-    for r_idx, row in enumerate(node_layout):
-        try:
-            c_idx = row.index(node_name)
-            return r_idx, c_idx
-        except ValueError:
-            continue
-    return None, None
+# Slope of the main diagonal segment of a Kohd trace
+KOHD_SLOPE_MAGNITUDE = 2.5
+
+# --- Candidate routing cost model (see route_trace) ---
+ROUTE_COST_PER_UNIT_LENGTH = 1.0
+ROUTE_COST_PER_BEND = 5.0
+ROUTE_COST_PER_UNIT_INTRUSION = 50.0 # Per conceptual unit a segment comes inside an obstacle's clearance circle
+ROUTE_COST_PER_CROSSING = 100.0
+# Added to every candidate but the conventional shape, so it is only replaced when clearly worse
+ROUTE_COST_ALTERNATIVE_SHAPE = 40.0
+ROUTE_CLEARANCE_MARGIN_FACTOR = 0.25 # Extra clearance wanted around obstacle nodes, factor of node_radius
+DETOUR_OFFSET_FACTORS = (1.6, 2.2) # Distances of detour points from the obstacle center, factors of node_radius
+BEND_ANGLE_TOLERANCE_RAD = math.radians(1.0)
+CROSSING_EPSILON = 1e-6 # Cross-product products this close to zero are touches, not crossings
+
+# --- Routing quality levels (see route_trace), cheapest first ---
+ROUTE_QUALITY_DRAFT = 'draft'       # Conventional shape only, nothing scored: for glyphs rebuilt on every keystroke
+ROUTE_QUALITY_STANDARD = 'standard' # Base shapes scored; detours only when every shape runs through a node
+ROUTE_QUALITY_REFINED = 'refined'   # Detours around the first obstacle always, plus nested detours around a second one
+ROUTE_QUALITIES = (ROUTE_QUALITY_DRAFT, ROUTE_QUALITY_STANDARD, ROUTE_QUALITY_REFINED)
+REFINED_DETOUR_OFFSET_FACTORS = (1.6, 2.2, 2.8)
 
 def _sign(val: float) -> int:
     if abs(val) < 1e-9: 
@@ -78,15 +94,20 @@ def calculate_trace_path(
     start_ring_level: int,
     end_ring_level: int,
     all_node_positions: dict[str, tuple[float, float]],
-    node_layout: list[list[str]], 
+    node_layout: Board | list[list[str]], 
     node_radius: float,
     get_ring_radius_method: callable,
     obstacle_node_coords: list[tuple[float,float]] | None = None, 
     short_stub_length_factor: float = 0.5,
     start_offset_idx: int = 0,
     end_offset_idx: int = 0,
-    offset_factor: float = 0.25
+    offset_factor: float = 0.25,
+    stub_orientation: str | None = None,
+    slope_magnitude: float = KOHD_SLOPE_MAGNITUDE
 ) -> list[tuple[float, float]]:
+    """Routes one trace as stub, diagonal, stub (or a straight line for aligned nodes).
+    stub_orientation ('H' or 'V') overrides the stub direction of diagonal traces,
+    which otherwise follows the larger of dx and dy."""
 
     s_center_x, s_center_y = all_node_positions[start_node_name]
     e_center_x, e_center_y = all_node_positions[end_node_name]
@@ -185,7 +206,7 @@ def calculate_trace_path(
         path_points = [s_on_face, e_on_face]
 
     else: # --- Diagonal Case ---
-        s_stub_is_horizontal = abs(dx_centers) >= abs(dy_centers)
+        s_stub_is_horizontal = abs(dx_centers) >= abs(dy_centers) if stub_orientation is None else stub_orientation == 'H'
         # For diagonal, e_stub_is_horizontal usually mirrors s_stub_is_horizontal for parallel main segment
         e_stub_is_horizontal = s_stub_is_horizontal 
 
@@ -243,7 +264,7 @@ def calculate_trace_path(
                          e_on_face_no_offset[1] + cartesian_offset_e_vec[1])
             # u_e_stub_dir is already set based on e_stub_is_horizontal
         
-        kohd_slope_magnitude = 2.5 
+        kohd_slope_magnitude = slope_magnitude
         m_k: float
         if abs(dx_centers) < 1e-6 : 
             m_k = float('inf') 
@@ -372,6 +393,151 @@ def calculate_trace_path(
     return final_path_tuples
 
 
+
+def _detour_paths(path: list[tuple[float, float]], obstacle_centers: list[tuple[float, float]], node_radius: float,
+                  offset_factors: tuple[float, ...] = DETOUR_OFFSET_FACTORS) -> list[list[tuple[float, float]]]:
+    """For the first segment of `path` passing through an obstacle node, returns the path bent around it
+    on either side, at each of `offset_factors` (so a returning trace can nest outside an earlier one)."""
+    for i in range(len(path) - 1):
+        p1, p2 = path[i], path[i + 1]
+        # Box test first: on a large board most corridor nodes are nowhere near this segment
+        min_x, max_x = min(p1[0], p2[0]) - node_radius - 1e-6, max(p1[0], p2[0]) + node_radius + 1e-6
+        min_y, max_y = min(p1[1], p2[1]) - node_radius - 1e-6, max(p1[1], p2[1]) + node_radius + 1e-6
+        for center in obstacle_centers:
+            if not (min_x <= center[0] <= max_x and min_y <= center[1] <= max_y): continue
+            if not _segment_intersects_circle(p1, p2, center, node_radius): continue
+            seg_dx, seg_dy = p2[0] - p1[0], p2[1] - p1[1]
+            seg_len = math.hypot(seg_dx, seg_dy)
+            if seg_len < POINT_CLOSE_TOLERANCE: continue
+            normal = (-seg_dy / seg_len, seg_dx / seg_len)
+            return [path[:i + 1] + [(center[0] + side * normal[0] * node_radius * factor, center[1] + side * normal[1] * node_radius * factor)] + path[i + 1:]
+                    for factor in offset_factors for side in (1, -1)]
+    return []
+
+def route_candidates(start_node_name: str, end_node_name: str, start_ring_level: int, end_ring_level: int,
+                     all_node_positions: dict[str, tuple[float, float]], node_layout: Board | list[list[str]], node_radius: float,
+                     get_ring_radius_method: callable, start_offset_idx: int = 0, end_offset_idx: int = 0) -> list[list[tuple[float, float]]]:
+    """Base candidate shapes for one trace; the conventional calculate_trace_path shape is always first.
+    Diagonal traces also get the other stub orientation and the mirrored (1/slope) diagonal."""
+    route_args = (start_node_name, end_node_name, start_ring_level, end_ring_level, all_node_positions, node_layout, node_radius, get_ring_radius_method)
+    offsets = dict(start_offset_idx=start_offset_idx, end_offset_idx=end_offset_idx)
+    candidates = [calculate_trace_path(*route_args, **offsets)]
+    (s_x, s_y), (e_x, e_y) = all_node_positions[start_node_name], all_node_positions[end_node_name]
+    if abs(e_x - s_x) >= ALIGN_TOLERANCE and abs(e_y - s_y) >= ALIGN_TOLERANCE:
+        conventional_orientation = 'H' if abs(e_x - s_x) >= abs(e_y - s_y) else 'V'
+        for stub_orientation in ('H', 'V'):
+            for slope in (KOHD_SLOPE_MAGNITUDE, 1.0 / KOHD_SLOPE_MAGNITUDE):
+                if stub_orientation == conventional_orientation and slope == KOHD_SLOPE_MAGNITUDE: continue # Already candidates[0]
+                path = calculate_trace_path(*route_args, **offsets, stub_orientation=stub_orientation, slope_magnitude=slope)
+                if len(path) >= 2: candidates.append(path)
+    return candidates
+
+def score_route_candidates(candidates: list[list[tuple[float, float]]], obstacle_centers: list[tuple[float, float]], node_radius: float,
+                           existing_paths: list[list[tuple[float, float]]] | None = None) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """Scores all candidates in one vectorized pass. Returns (costs, metrics), each metric an array over candidates:
+    length, bends, min_clearance (gap between the path and the nearest obstacle node outline), intrusion and crossings."""
+    num_candidates = len(candidates)
+    max_points = max(len(path) for path in candidates)
+    # Pad every path to max_points by repeating its last point; the padding adds zero-length segments
+    points = np.array([path + [path[-1]] * (max_points - len(path)) for path in candidates], dtype=float) # (K, P, 2)
+    start_x, start_y = points[:, :-1, 0], points[:, :-1, 1]                                                   # (K, S)
+    seg_dx, seg_dy = points[:, 1:, 0] - start_x, points[:, 1:, 1] - start_y
+    seg_len = np.hypot(seg_dx, seg_dy)
+    is_real_segment = seg_len > POINT_CLOSE_TOLERANCE
+
+    length = seg_len.sum(axis=1)
+    headings = np.arctan2(seg_dy, seg_dx)
+    turn = np.abs((headings[:, 1:] - headings[:, :-1] + np.pi) % (2 * np.pi) - np.pi)
+    bends = (is_real_segment[:, 1:] & is_real_segment[:, :-1] & (turn > BEND_ANGLE_TOLERANCE_RAD)).sum(axis=1)
+
+    if obstacle_centers:
+        centers = np.asarray(obstacle_centers, dtype=float)
+        rel_x = centers[:, 0] - start_x[..., None]; rel_y = centers[:, 1] - start_y[..., None]          # (K, S, N)
+        dx, dy = seg_dx[..., None], seg_dy[..., None]
+        t = np.clip((rel_x * dx + rel_y * dy) / np.maximum(seg_len * seg_len, 1e-12)[..., None], 0.0, 1.0)
+        distance = np.hypot(rel_x - t * dx, rel_y - t * dy).min(axis=1)                                # (K, N), closest approach per obstacle
+        min_distance = distance.min(axis=1)
+        intrusion = np.maximum(node_radius * (1.0 + ROUTE_CLEARANCE_MARGIN_FACTOR) - distance, 0.0).sum(axis=1)
+    else:
+        min_distance = np.full(num_candidates, np.inf); intrusion = np.zeros(num_candidates)
+
+    crossings = np.zeros(num_candidates, dtype=int)
+    existing_segments = [(*path[i], *path[i + 1]) for path in existing_paths or () for i in range(len(path) - 1)]
+    if existing_segments:
+        q1_x, q1_y, q2_x, q2_y = np.asarray(existing_segments, dtype=float).T                              # (E,) each
+        e_dx, e_dy = q2_x - q1_x, q2_y - q1_y
+        sx, sy, dx, dy = start_x[..., None], start_y[..., None], seg_dx[..., None], seg_dy[..., None]
+        # Signs of the cross products: q1/q2 relative to each candidate segment and p1/p2 relative to each existing one
+        side_q1 = dx * (q1_y - sy) - dy * (q1_x - sx); side_q2 = dx * (q2_y - sy) - dy * (q2_x - sx)
+        side_p1 = e_dx * (sy - q1_y) - e_dy * (sx - q1_x); side_p2 = side_p1 + e_dx * dy - e_dy * dx
+        # Proper crossings only: segments that merely touch (e.g. at a shared node face) don't count
+        crossings = ((side_q1 * side_q2 < -CROSSING_EPSILON) & (side_p1 * side_p2 < -CROSSING_EPSILON) & is_real_segment[..., None]).sum(axis=(1, 2))
+
+    costs = (ROUTE_COST_PER_UNIT_LENGTH * length + ROUTE_COST_PER_BEND * bends +
+             ROUTE_COST_PER_UNIT_INTRUSION * intrusion + ROUTE_COST_PER_CROSSING * crossings)
+    costs[1:] += ROUTE_COST_ALTERNATIVE_SHAPE
+    metrics = {'length': length, 'bends': bends, 'min_clearance': min_distance - node_radius,
+               'intrusion': intrusion, 'crossings': crossings}
+    return costs, metrics
+
+def _obstacle_centers(all_node_positions: dict[str, tuple[float, float]], start_node_name: str, end_node_name: str,
+                      node_layout: Board | list[list[str]] | None = None) -> list[tuple[float, float]]:
+    """Nodes a route between the two nodes has to avoid: the board's corridor for the pair when
+    node_layout is a Board (so routing cost does not grow with board size), else every other node."""
+    if isinstance(node_layout, Board):
+        return node_layout.corridor(start_node_name, end_node_name)
+    return [pos for name, pos in all_node_positions.items() if name not in (start_node_name, end_node_name)]
+
+def refined_route_candidates(start_node_name: str, end_node_name: str, start_ring_level: int, end_ring_level: int,
+                             all_node_positions: dict[str, tuple[float, float]], node_layout: Board | list[list[str]], node_radius: float,
+                             get_ring_radius_method: callable, start_offset_idx: int = 0, end_offset_idx: int = 0) -> list[list[tuple[float, float]]]:
+    """route_candidates plus detours around the first obstacle of every shape, and detours of those around the next one."""
+    candidates = route_candidates(start_node_name, end_node_name, start_ring_level, end_ring_level, all_node_positions,
+                                  node_layout, node_radius, get_ring_radius_method, start_offset_idx, end_offset_idx)
+    if len(candidates[0]) < 2: return candidates
+    obstacle_centers = _obstacle_centers(all_node_positions, start_node_name, end_node_name, node_layout)
+    detours = [detour for path in candidates for detour in _detour_paths(path, obstacle_centers, node_radius, REFINED_DETOUR_OFFSET_FACTORS)]
+    nested_detours = [detour for path in detours for detour in _detour_paths(path, obstacle_centers, node_radius)]
+    return candidates + detours + nested_detours
+
+def _cheapest_route(costs: np.ndarray, metrics: dict[str, np.ndarray]) -> tuple[int, dict]:
+    best = int(np.argmin(costs))
+    chosen_metrics = {'candidates': len(costs), 'chosen': best, 'cost': float(costs[best])}
+    chosen_metrics.update((name, values[best].item()) for name, values in metrics.items())
+    return best, chosen_metrics
+
+def pick_route(candidates: list[list[tuple[float, float]]], obstacle_centers: list[tuple[float, float]], node_radius: float,
+               existing_paths: list[list[tuple[float, float]]] | None = None) -> tuple[int, dict]:
+    """Scores `candidates` and returns (index of the cheapest, its metrics)."""
+    return _cheapest_route(*score_route_candidates(candidates, obstacle_centers, node_radius, existing_paths))
+
+def route_trace(start_node_name: str, end_node_name: str, start_ring_level: int, end_ring_level: int,
+                all_node_positions: dict[str, tuple[float, float]], node_layout: Board | list[list[str]], node_radius: float,
+                get_ring_radius_method: callable, start_offset_idx: int = 0, end_offset_idx: int = 0,
+                existing_paths: list[list[tuple[float, float]]] | None = None,
+                quality: str = ROUTE_QUALITY_STANDARD) -> tuple[list[tuple[float, float]], dict]:
+    """Picks the cheapest candidate shape at the given quality level, avoiding other nodes and crossings with `existing_paths`.
+    Returns (path, metrics) where metrics describes the chosen candidate; draft routes are not scored,
+    so their metrics only carry 'quality', 'candidates' and 'chosen'."""
+    route_args = (start_node_name, end_node_name, start_ring_level, end_ring_level, all_node_positions,
+                  node_layout, node_radius, get_ring_radius_method, start_offset_idx, end_offset_idx)
+    if quality == ROUTE_QUALITY_DRAFT:
+        return calculate_trace_path(*route_args[:8], start_offset_idx=start_offset_idx, end_offset_idx=end_offset_idx), \
+            {'quality': quality, 'candidates': 1, 'chosen': 0}
+    if quality not in ROUTE_QUALITIES: raise ValueError(f"unknown route quality {quality!r}")
+    candidates = refined_route_candidates(*route_args) if quality == ROUTE_QUALITY_REFINED else route_candidates(*route_args)
+    if len(candidates[0]) < 2:
+        return candidates[0], {'quality': quality, 'candidates': 1, 'chosen': 0, 'cost': 0.0, 'length': 0.0, 'bends': 0,
+                               'min_clearance': math.inf, 'intrusion': 0.0, 'crossings': 0}
+    obstacle_centers = _obstacle_centers(all_node_positions, start_node_name, end_node_name, node_layout)
+    costs, metrics = score_route_candidates(candidates, obstacle_centers, node_radius, existing_paths)
+    if quality == ROUTE_QUALITY_STANDARD and (metrics['min_clearance'] < 0).all(): # Every shape runs through a node: add detours and rescore
+        candidates = candidates + [detour for path in candidates for detour in _detour_paths(path, obstacle_centers, node_radius)]
+        costs, metrics = score_route_candidates(candidates, obstacle_centers, node_radius, existing_paths)
+    best, chosen_metrics = _cheapest_route(costs, metrics)
+    return candidates[best], dict(chosen_metrics, quality=quality)
+
+
 if __name__ == '__main__':
     mock_node_positions = {
         'ABC': (50, 50), 'DEF': (150, 50), 'GHI': (250, 50),
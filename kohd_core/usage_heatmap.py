@@ -0,0 +1,204 @@
+# kohd_translator/kohd_core/usage_heatmap.py
+#
+# Corpus-scale usage statistics for tuning the router and board geometry.
+# Every distinct word of a corpus is planned and routed once; its per-word
+# records (face offset slots handed out by _next_offset_idx, trace ring levels,
+# node pairs joined, routed trace segments) are weighted by the word's count
+# and accumulated with np.bincount, so a corpus with millions of traces costs
+# one build per distinct word plus a few array passes. Results are written as
+# PGM/PPM heatmaps (no imaging library needed) and plain-text tables.
+import os
+from collections import Counter
+
+import numpy as np
+
+from .glyph_builder import plan_word, GlyphConfig, DEFAULT_GLYPH_CONFIG
+from .glyph_layout import CONCEPTUAL_SIZE
+from .trace_router import ROUTE_QUALITY_STANDARD
+from .tokenizer import tokenize, TOKEN_WORD
+
+FACES = ('N', 'E', 'S', 'W')
+# Offsets -MAX_OFFSET..MAX_OFFSET get their own bin; larger magnitudes share the two outermost bins
+MAX_OFFSET = 6
+MAX_RING_LEVEL = 4 # Deeper ring levels are counted in the last bin
+DEFAULT_DENSITY_RESOLUTION = 300 # Pixels per side of the trace density map, over the conceptual extent
+SLOT_CELL_PX = 12 # Pixel size of one cell in the slot and pair heatmaps
+TOP_ROWS = 15
+
+
+def corpus_word_counts(chunks) -> Counter:
+    """Counts of each word token (uppercased) in an iterable of text chunks."""
+    return Counter(token.key for token in tokenize(chunks) if token.kind == TOKEN_WORD)
+
+
+class UsageHeatmaps:
+    """Weighted histograms over the glyphs of a corpus. add_words() may be called repeatedly."""
+    def __init__(self, config: GlyphConfig = DEFAULT_GLYPH_CONFIG, quality: str = ROUTE_QUALITY_STANDARD,
+                 density_resolution: int = DEFAULT_DENSITY_RESOLUTION):
+        self.config = config; self.quality = quality
+        self.board = config.board
+        num_nodes = self.board.num_nodes
+        self.extent = max(CONCEPTUAL_SIZE, *self.board.extent)
+        self.density_resolution = density_resolution
+        self.slot_counts = np.zeros((num_nodes, len(FACES), 2 * MAX_OFFSET + 1))
+        self.ring_level_counts = np.zeros((num_nodes, MAX_RING_LEVEL + 1)) # Trace ends per node and ring level connected to
+        self.node_ring_counts = np.zeros((num_nodes, MAX_RING_LEVEL + 1))  # Final ring count of each visited node
+        self.pair_counts = np.zeros((num_nodes, num_nodes))                 # Traces from row node to column node
+        self.density = np.zeros((density_resolution, density_resolution))
+        self.words = 0; self.distinct_words = 0; self.traces = 0
+
+    def add_words(self, word_counts: dict[str, int]):
+        """Plans and routes each distinct word once and adds it to the histograms `count` times."""
+        node_id = self.board.node_id; face_id = {face: i for i, face in enumerate(FACES)}
+        slot_index, slot_weight = [], []
+        ring_index, ring_weight = [], []
+        node_ring_index, node_ring_weight = [], []
+        pair_index, pair_weight = [], []
+        segments, segment_weight = [], []
+        for word, count in word_counts.items():
+            plan = plan_word(word, self.board)
+            if not plan.word: continue
+            self.words += count; self.distinct_words += 1; self.traces += count * len(plan.traces)
+            for (node_name, face), offsets in plan.node_connection_manager.items():
+                base = (node_id[node_name] * len(FACES) + face_id[face]) * (2 * MAX_OFFSET + 1) + MAX_OFFSET
+                slot_index += [base + max(-MAX_OFFSET, min(MAX_OFFSET, offset)) for offset in offsets]; slot_weight += [count] * len(offsets)
+            for trace in plan.traces:
+                from_id, to_id = node_id[trace.from_node_name], node_id[trace.to_node_name]
+                ring_index += [from_id * (MAX_RING_LEVEL + 1) + min(trace.connect_from_ring_level, MAX_RING_LEVEL),
+                               to_id * (MAX_RING_LEVEL + 1) + min(trace.connect_to_ring_level, MAX_RING_LEVEL)]
+                ring_weight += [count, count]
+                pair_index.append(from_id * self.board.num_nodes + to_id); pair_weight.append(count)
+            for node_name, ring_count in plan.node_ring_counts:
+                node_ring_index.append(node_id[node_name] * (MAX_RING_LEVEL + 1) + min(ring_count, MAX_RING_LEVEL)); node_ring_weight.append(count)
+            if plan.traces:
+                glyph = plan.glyph(self.config, finalize=False, quality=self.quality)
+                for element in glyph.elements:
+                    if element['type'] != 'trace': continue
+                    path = element['path_points']
+                    segments += [(*p1, *p2) for p1, p2 in zip(path[:-1], path[1:])]; segment_weight += [count] * (len(path) - 1)
+
+        self.slot_counts += _bincount(slot_index, slot_weight, self.slot_counts.size).reshape(self.slot_counts.shape)
+        self.ring_level_counts += _bincount(ring_index, ring_weight, self.ring_level_counts.size).reshape(self.ring_level_counts.shape)
+        self.node_ring_counts += _bincount(node_ring_index, node_ring_weight, self.node_ring_counts.size).reshape(self.node_ring_counts.shape)
+        self.pair_counts += _bincount(pair_index, pair_weight, self.pair_counts.size).reshape(self.pair_counts.shape)
+        if segments: self._rasterize(np.asarray(segments, dtype=float), np.asarray(segment_weight, dtype=float))
+
+    def _rasterize(self, segments: np.ndarray, weights: np.ndarray):
+        """Adds segments (x1, y1, x2, y2) to the density map, sampled every half pixel and weighted by length."""
+        pixel = self.extent / self.density_resolution
+        lengths = np.hypot(segments[:, 2] - segments[:, 0], segments[:, 3] - segments[:, 1])
+        samples = np.maximum(1, np.ceil(lengths / (pixel * 0.5))).astype(np.int64)
+        owner = np.repeat(np.arange(len(segments)), samples)
+        # Midpoints of `samples` equal steps along each segment
+        first_sample = np.cumsum(samples) - samples
+        t = (np.arange(len(owner)) - first_sample[owner] + 0.5) / samples[owner]
+        x = segments[owner, 0] + t * (segments[owner, 2] - segments[owner, 0])
+        y = segments[owner, 1] + t * (segments[owner, 3] - segments[owner, 1])
+        col = np.clip((x / pixel).astype(np.int64), 0, self.density_resolution - 1)
+        row = np.clip((y / pixel).astype(np.int64), 0, self.density_resolution - 1)
+        sample_weight = (weights * lengths / samples)[owner] # Ink per sample, so a map sums to total trace length
+        self.density += np.bincount(row * self.density_resolution + col, sample_weight, self.density.size).reshape(self.density.shape)
+
+    # --- Tables ---
+    def summary(self) -> str:
+        names = self.board.node_names
+        lines = [f"{self.words} words ({self.distinct_words} distinct), {self.traces} traces, "
+                 f"{self.density.sum():.0f} units of trace", ""]
+        offsets = self.slot_counts.sum(axis=(0, 1))
+        lines.append("Offsets handed out (outer bins include larger magnitudes):")
+        lines.append("  " + "  ".join(f"{offset:+d}:{int(total)}" for offset, total in zip(range(-MAX_OFFSET, MAX_OFFSET + 1), offsets) if total))
+        lines += ["", "Busiest (node, face, offset) slots:"]
+        flat = self.slot_counts.ravel(); total_slots = flat.sum() or 1
+        for index in np.argsort(-flat, kind='stable')[:TOP_ROWS]:
+            if not flat[index]: break
+            node, face, offset = np.unravel_index(index, self.slot_counts.shape)
+            lines.append(f"  {names[node]:>6} {FACES[face]} {offset - MAX_OFFSET:+d}  {int(flat[index]):>10}  {flat[index] / total_slots:6.1%}")
+        lines += ["", "Faces per node (N E S W):"]
+        for node, name in enumerate(names):
+            lines.append(f"  {name:>6} " + " ".join(f"{int(total):>9}" for total in self.slot_counts[node].sum(axis=1)))
+        lines += ["", "Trace ends by ring level connected to (0 = node outline):"]
+        lines.append("  level  " + " ".join(f"{level:>9}" for level in range(MAX_RING_LEVEL + 1)))
+        lines.append("  all    " + " ".join(f"{int(total):>9}" for total in self.ring_level_counts.sum(axis=0)))
+        lines += ["", "Final ring count of visited nodes:"]
+        lines.append("  rings  " + " ".join(f"{level:>9}" for level in range(MAX_RING_LEVEL + 1)))
+        lines.append("  all    " + " ".join(f"{int(total):>9}" for total in self.node_ring_counts.sum(axis=0)))
+        lines += ["", "Busiest node pairs (either direction):"]
+        undirected = np.triu(self.pair_counts + self.pair_counts.T); total_pairs = undirected.sum() or 1
+        for index in np.argsort(-undirected.ravel(), kind='stable')[:TOP_ROWS]:
+            a, b = np.unravel_index(index, undirected.shape)
+            if not undirected[a, b]: break
+            lines.append(f"  {names[a]:>6} - {names[b]:<6} {int(undirected[a, b]):>10}  {undirected[a, b] / total_pairs:6.1%}")
+        peak = np.unravel_index(int(np.argmax(self.density)), self.density.shape)
+        pixel = self.extent / self.density_resolution
+        lines += ["", f"Trace density peak at ({(peak[1] + 0.5) * pixel:.0f}, {(peak[0] + 0.5) * pixel:.0f}) "
+                      f"with {self.density[peak]:.0f} units per {pixel:.2f}-unit pixel"]
+        return '\n'.join(lines)
+
+    # --- Images ---
+    def write_images(self, output_dir: str) -> list[str]:
+        """Writes the density map and the slot, ring-level and node-pair heatmaps. Returns the paths written."""
+        os.makedirs(output_dir, exist_ok=True)
+        images = {
+            'trace_density.ppm': self.density,
+            'offset_slots.ppm': _cells(self.slot_counts.reshape(-1, self.slot_counts.shape[2])), # Rows: node x face, columns: offset
+            'ring_levels.ppm': _cells(self.ring_level_counts),
+            'node_pairs.ppm': _cells(self.pair_counts),
+        }
+        paths = []
+        for filename, values in images.items():
+            path = os.path.join(output_dir, filename)
+            write_ppm(path, heat_colors(values)); paths.append(path)
+        return paths
+
+
+def _bincount(indices: list[int], weights: list[float], size: int) -> np.ndarray:
+    if not indices: return np.zeros(size)
+    return np.bincount(np.asarray(indices, dtype=np.int64), np.asarray(weights, dtype=float), size)
+
+def _cells(values: np.ndarray, cell_px: int = SLOT_CELL_PX) -> np.ndarray:
+    return np.repeat(np.repeat(values, cell_px, axis=0), cell_px, axis=1)
+
+def heat_colors(values: np.ndarray) -> np.ndarray:
+    """(H, W, 3) uint8 black-red-yellow-white colouring of log(1 + value), scaled to the maximum."""
+    scaled = np.log1p(np.maximum(values, 0.0))
+    peak = scaled.max()
+    level = scaled / peak if peak > 0 else scaled
+    rgb = np.stack((np.clip(level * 3, 0, 1), np.clip(level * 3 - 1, 0, 1), np.clip(level * 3 - 2, 0, 1)), axis=-1)
+    return (rgb * 255 + 0.5).astype(np.uint8)
+
+def write_ppm(path: str, rgb: np.ndarray):
+    """Binary PPM (P6); grayscale (H, W) arrays are written as PGM (P5)."""
+    height, width = rgb.shape[:2]
+    with open(path, 'wb') as image_file:
+        image_file.write(f"{'P6' if rgb.ndim == 3 else 'P5'}\n{width} {height}\n255\n".encode('ascii'))
+        image_file.write(np.ascontiguousarray(rgb, dtype=np.uint8).tobytes())
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    import random
+    import string
+    import argparse
+    parser = argparse.ArgumentParser(description="Accumulate face-offset, ring-level and trace-density heatmaps over a corpus.")
+    parser.add_argument('corpus', nargs='?', help="UTF-8 text; a random corpus is used if omitted")
+    parser.add_argument('--output-dir', default='usage_heatmaps')
+    parser.add_argument('--quality', default=ROUTE_QUALITY_STANDARD)
+    parser.add_argument('--resolution', type=int, default=DEFAULT_DENSITY_RESOLUTION)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.corpus:
+        with open(args.corpus, encoding='utf-8') as corpus_file: counts = corpus_word_counts(corpus_file)
+    else:
+        rng = random.Random(0)
+        vocabulary = [''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(2, 10))) for _ in range(5000)]
+        counts = Counter({word: max(1, int(2e5 / (rank + 1))) for rank, word in enumerate(vocabulary)}) # Zipf-like
+    heatmaps = UsageHeatmaps(quality=args.quality, density_resolution=args.resolution)
+    heatmaps.add_words(counts)
+    elapsed = time.perf_counter() - start
+    summary = heatmaps.summary()
+    paths = heatmaps.write_images(args.output_dir)
+    with open(os.path.join(args.output_dir, 'summary.txt'), 'w', encoding='utf-8') as summary_file: summary_file.write(summary + '\n')
+    print(summary)
+    print(f"\n{heatmaps.traces} traces in {elapsed:.1f}s; wrote {', '.join(paths)}", file=sys.stderr)
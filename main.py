@@ -1,15 +1,22 @@
 # kohd_translator/main.py
 import sys
+import argparse
 from PyQt6.QtWidgets import QApplication # type: ignore
 from gui.main_window import MainWindow
+from gui.sheet_renderer import iter_wordlist
 
 def main():
-    app = QApplication(sys.argv)
-    
-    window = MainWindow()
+    app = QApplication(sys.argv) # Takes Qt's own options (e.g. -platform) out of sys.argv
+
+    parser = argparse.ArgumentParser(description="Kohd Translator")
+    parser.add_argument('vocabulary', nargs='?', help="one-word-per-line vocabulary for the glyph browser")
+    parser.add_argument('--speculative', action='store_true', help="prebuild likely next letters while idle")
+    args = parser.parse_args(app.arguments()[1:])
+    vocabulary = list(iter_wordlist(args.vocabulary)) if args.vocabulary else None
+    window = MainWindow(vocabulary, speculative=args.speculative)
     window.show()
-    
+
     sys.exit(app.exec())
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,327 @@
+# kohd_translator/service/glyph_service.py
+#
+# Local glyph translation service: HTTP + WebSocket on asyncio streams.
+#   GET /glyph/<word>?format=json|svg   built glyph elements or an SVG image
+#   GET /stats                          cache and latency metrics
+#   /ws (WebSocket upgrade)             send a word (or {"word", "format"} JSON),
+#                                       receive the same payloads as HTTP
+# Builds run in a process pool. Concurrent requests for the same word share
+# one build, finished glyphs are kept in an LRU, and once too many builds are
+# pending new ones are refused with 503 instead of queueing without bound.
+# The server only binds to loopback addresses.
+import os
+import sys
+import json
+import time
+import base64
+import hashlib
+import asyncio
+import ipaddress
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from urllib.parse import urlsplit, parse_qs, unquote
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_SIZE = 4096
+DEFAULT_MAX_PENDING_BUILDS = 64
+LATENCY_SAMPLE_COUNT = 2048
+MAX_WORD_LENGTH = 64
+MAX_HEADER_LINES = 100
+MAX_WS_MESSAGE_BYTES = 64 * 1024
+
+WEBSOCKET_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+WS_OPCODE_CONTINUATION = 0x0
+WS_OPCODE_TEXT = 0x1
+WS_OPCODE_CLOSE = 0x8
+WS_OPCODE_PING = 0x9
+WS_OPCODE_PONG = 0xA
+
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class ServiceBusyError(Exception):
+    """Raised when the build queue is full; maps to HTTP 503."""
+
+
+def _build_glyph_payload(word: str, config) -> dict:
+    """Builds and finalizes one word; runs in the executor."""
+    from kohd_core.glyph_builder import build_glyph
+    from kohd_core.glyph_layout import GlyphStyle
+    from kohd_core.svg_export import glyph_to_svg
+    glyph = build_glyph(word, config)
+    elements = list(glyph.elements)
+    return {'word': word, 'elements': elements, 'svg': glyph_to_svg(elements, style=GlyphStyle(config.node_radius), board=config.board)}
+
+
+def normalize_word(word: str) -> str:
+    """Upper-cases and validates a requested word; raises ValueError if it can't be built."""
+    from kohd_core.kohd_rules import LETTER_TO_NODE_INFO
+    normalized = word.strip().upper()
+    if not normalized or len(normalized) > MAX_WORD_LENGTH:
+        raise ValueError(f"word must be 1-{MAX_WORD_LENGTH} letters")
+    if any(letter not in LETTER_TO_NODE_INFO for letter in normalized):
+        raise ValueError("word must contain only letters A-Z")
+    return normalized
+
+
+def _percentiles(samples) -> dict:
+    if not samples:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None, 'count': 0}
+    ordered = sorted(samples)
+    def nearest_rank(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, max(0, int(p / 100 * len(ordered) + 0.5) - 1))], 3)
+    return {'p50': nearest_rank(50), 'p95': nearest_rank(95), 'p99': nearest_rank(99), 'max': round(ordered[-1], 3), 'count': len(ordered)}
+
+
+class GlyphService:
+    def __init__(self, executor: Executor | None = None, cache_size: int = DEFAULT_CACHE_SIZE,
+                 max_pending_builds: int = DEFAULT_MAX_PENDING_BUILDS, workers: int | None = None, config=None):
+        from kohd_core.glyph_builder import DEFAULT_GLYPH_CONFIG
+        self.executor = executor or ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        self.config = config or DEFAULT_GLYPH_CONFIG
+        self.cache_size = cache_size
+        self.max_pending_builds = max_pending_builds
+        self._cache = OrderedDict() # word -> payload, most recently used last
+        self._in_flight = {}        # word -> asyncio.Future shared by coalesced requests
+        self._request_latencies_ms = deque(maxlen=LATENCY_SAMPLE_COUNT)
+        self._build_latencies_ms = deque(maxlen=LATENCY_SAMPLE_COUNT)
+        self.counters = {'requests': 0, 'cache_hits': 0, 'cache_misses': 0, 'coalesced': 0, 'rejected': 0, 'errors': 0}
+
+    async def get_glyph(self, word: str) -> dict:
+        """Returns the built payload for a normalized word, from cache when possible."""
+        request_start = time.perf_counter()
+        self.counters['requests'] += 1
+        try:
+            payload = self._cache.get(word)
+            if payload is not None:
+                self._cache.move_to_end(word)
+                self.counters['cache_hits'] += 1
+                return payload
+
+            in_flight = self._in_flight.get(word)
+            if in_flight is not None:
+                self.counters['coalesced'] += 1
+                return await asyncio.shield(in_flight)
+
+            if len(self._in_flight) >= self.max_pending_builds:
+                self.counters['rejected'] += 1
+                raise ServiceBusyError(f"{len(self._in_flight)} builds pending")
+
+            self.counters['cache_misses'] += 1
+            build_future = asyncio.ensure_future(self._build(word))
+            self._in_flight[word] = build_future
+            return await asyncio.shield(build_future)
+        finally:
+            self._request_latencies_ms.append((time.perf_counter() - request_start) * 1000.0)
+
+    async def _build(self, word: str) -> dict:
+        build_start = time.perf_counter()
+        try:
+            payload = await asyncio.get_running_loop().run_in_executor(self.executor, _build_glyph_payload, word, self.config)
+        except Exception:
+            self.counters['errors'] += 1
+            raise
+        finally:
+            self._in_flight.pop(word, None)
+        self._build_latencies_ms.append((time.perf_counter() - build_start) * 1000.0)
+        self._cache[word] = payload
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return payload
+
+    def stats(self) -> dict:
+        lookups = self.counters['cache_hits'] + self.counters['cache_misses'] + self.counters['coalesced']
+        return dict(self.counters,
+                    hit_rate=round(self.counters['cache_hits'] / lookups, 4) if lookups else None,
+                    cache_entries=len(self._cache), cache_capacity=self.cache_size,
+                    pending_builds=len(self._in_flight), max_pending_builds=self.max_pending_builds,
+                    latency_ms=_percentiles(self._request_latencies_ms), build_ms=_percentiles(self._build_latencies_ms))
+
+    async def _glyph_response(self, raw_word: str, output_format: str) -> tuple[int, str, bytes]:
+        if output_format not in ('json', 'svg'):
+            return 400, 'application/json', json.dumps({'error': "format must be 'json' or 'svg'"}).encode()
+        try:
+            payload = await self.get_glyph(normalize_word(raw_word))
+        except ValueError as exc:
+            return 400, 'application/json', json.dumps({'error': str(exc)}).encode()
+        except ServiceBusyError as exc:
+            return 503, 'application/json', json.dumps({'error': f"busy: {exc}"}).encode()
+        except Exception as exc: # A failed build (e.g. BrokenProcessPool) still gets a response
+            return 500, 'application/json', json.dumps({'error': f"build failed: {exc!r}"}).encode()
+        if output_format == 'svg':
+            return 200, 'image/svg+xml', payload['svg'].encode()
+        return 200, 'application/json', json.dumps({'word': payload['word'], 'elements': payload['elements']}).encode()
+
+    async def _dispatch(self, method: str, target: str) -> tuple[int, str, bytes]:
+        url = urlsplit(target)
+        if method != 'GET':
+            return 405, 'application/json', json.dumps({'error': 'only GET is supported'}).encode()
+        if url.path == '/stats':
+            return 200, 'application/json', json.dumps(self.stats()).encode()
+        if url.path.startswith('/glyph/'):
+            output_format = parse_qs(url.query).get('format', ['json'])[0]
+            return await self._glyph_response(unquote(url.path[len('/glyph/'):]), output_format)
+        return 404, 'application/json', json.dumps({'error': 'not found'}).encode()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info('peername')
+        try:
+            if peer and not ipaddress.ip_address(peer[0]).is_loopback:
+                return
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                request_parts = request_line.decode('latin-1').split()
+                if len(request_parts) != 3:
+                    break
+                method, target, version = request_parts
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    header_line = await reader.readline()
+                    if header_line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = header_line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                if urlsplit(target).path == '/ws' and headers.get('upgrade', '').lower() == 'websocket':
+                    await self._serve_websocket(reader, writer, headers)
+                    break
+
+                status, content_type, body = await self._dispatch(method, target)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                response_headers = [f"HTTP/1.1 {status} {HTTP_REASONS[status]}", f"Content-Type: {content_type}",
+                                    f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+                if status == 503:
+                    response_headers.append("Retry-After: 1")
+                writer.write(('\r\n'.join(response_headers) + '\r\n\r\n').encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _serve_websocket(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, headers: dict):
+        client_key = headers.get('sec-websocket-key', '')
+        accept_key = base64.b64encode(hashlib.sha1((client_key + WEBSOCKET_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept_key}\r\n\r\n").encode('latin-1'))
+        await writer.drain()
+
+        message_parts = []
+        while True:
+            opcode, is_final, payload = await _read_ws_frame(reader)
+            if opcode == WS_OPCODE_CLOSE:
+                writer.write(_ws_frame(WS_OPCODE_CLOSE, payload[:2]))
+                await writer.drain()
+                return
+            if opcode == WS_OPCODE_PING:
+                writer.write(_ws_frame(WS_OPCODE_PONG, payload))
+                await writer.drain()
+                continue
+            if opcode not in (WS_OPCODE_TEXT, WS_OPCODE_CONTINUATION):
+                continue
+            message_parts.append(payload)
+            if sum(len(part) for part in message_parts) > MAX_WS_MESSAGE_BYTES:
+                raise ValueError("websocket message too large")
+            if not is_final:
+                continue
+            message = b''.join(message_parts).decode('utf-8', errors='replace')
+            message_parts = []
+
+            writer.write(_ws_frame(WS_OPCODE_TEXT, json.dumps(await self._websocket_reply(message)).encode()))
+            await writer.drain()
+
+    async def _websocket_reply(self, message: str) -> dict:
+        try:
+            request = json.loads(message) if message.lstrip().startswith('{') else {'word': message}
+            word = normalize_word(str(request.get('word', '')))
+            output_format = request.get('format', 'json')
+            if output_format not in ('json', 'svg'):
+                raise ValueError("format must be 'json' or 'svg'")
+            payload = await self.get_glyph(word)
+        except (ValueError, ServiceBusyError) as exc:
+            return {'error': str(exc)}
+        except Exception as exc:
+            return {'error': f"build failed: {exc!r}"}
+        if output_format == 'svg':
+            return {'word': word, 'svg': payload['svg']}
+        return {'word': word, 'elements': payload['elements']}
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _read_ws_frame(reader: asyncio.StreamReader) -> tuple[int, bool, bytes]:
+    first_byte, second_byte = await reader.readexactly(2)
+    is_final = bool(first_byte & 0x80)
+    opcode = first_byte & 0x0F
+    payload_length = second_byte & 0x7F
+    if payload_length == 126:
+        payload_length = int.from_bytes(await reader.readexactly(2), 'big')
+    elif payload_length == 127:
+        payload_length = int.from_bytes(await reader.readexactly(8), 'big')
+    if payload_length > MAX_WS_MESSAGE_BYTES:
+        raise ValueError("websocket frame too large")
+    mask = await reader.readexactly(4) if second_byte & 0x80 else None
+    payload = await reader.readexactly(payload_length)
+    if mask and payload:
+        repeated_mask = (mask * (payload_length // 4 + 1))[:payload_length]
+        payload = (int.from_bytes(payload, 'big') ^ int.from_bytes(repeated_mask, 'big')).to_bytes(payload_length, 'big')
+    return opcode, is_final, payload
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    header = bytes([0x80 | opcode])
+    if len(payload) < 126:
+        header += bytes([len(payload)])
+    elif len(payload) < 1 << 16:
+        header += bytes([126]) + len(payload).to_bytes(2, 'big')
+    else:
+        header += bytes([127]) + len(payload).to_bytes(8, 'big')
+    return header + payload
+
+
+def _is_loopback_host(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+async def serve(service: GlyphService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+    """Starts the server; refuses anything but a loopback bind address."""
+    if not _is_loopback_host(host):
+        raise ValueError(f"refusing to bind to non-loopback address {host!r}")
+    return await asyncio.start_server(service.handle_connection, host, port)
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Local Kohd glyph service (HTTP + WebSocket, loopback only).")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE)
+    parser.add_argument('--max-pending', type=int, default=DEFAULT_MAX_PENDING_BUILDS)
+    args = parser.parse_args()
+
+    async def main():
+        service = GlyphService(cache_size=args.cache_size, max_pending_builds=args.max_pending, workers=args.workers)
+        server = await serve(service, args.host, args.port)
+        print(f"Kohd glyph service on http://{args.host}:{args.port} (pid {os.getpid()})", file=sys.stderr)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            service.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass